@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Usuario, Servicio, Empleado, Sede, Cita, Notificacion, Publicacion, Feedback, Disponibilidad, Bloqueo, EmpleadoServicio
+from .models import Usuario, Servicio, Empleado, Sede, Cita, Notificacion, Publicacion, Feedback, Disponibilidad, Bloqueo, EmpleadoServicio, AgendaDiaria, Eliminacion, CitaArchivada, BloqueoArchivado, NotificacionArchivada
 
 admin.site.register(Usuario)
 admin.site.register(Servicio)
@@ -12,3 +12,8 @@ admin.site.register(Feedback)
 admin.site.register(Disponibilidad)
 admin.site.register(Bloqueo)
 admin.site.register(EmpleadoServicio)
+admin.site.register(AgendaDiaria)
+admin.site.register(Eliminacion)
+admin.site.register(CitaArchivada)
+admin.site.register(BloqueoArchivado)
+admin.site.register(NotificacionArchivada)
@@ -0,0 +1,209 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AgendaDiaria, Bloqueo, Cita, Disponibilidad
+
+# Citas que no ocupan la agenda del empleado
+ESTADOS_LIBRES = ('rechazada', 'cancelada')
+
+MINUTOS_SLOT = AgendaDiaria.MINUTOS_SLOT
+SLOTS_POR_DIA = AgendaDiaria.SLOTS_POR_DIA
+BYTES_POR_DIA = SLOTS_POR_DIA // 8
+
+
+def horizonte_dias():
+    return getattr(settings, 'AGENDA_HORIZONTE_DIAS', 60)
+
+
+def ventana(hoy=None):
+    """
+    Fechas que se pueden consultar. Fuera de ``horizonte`` la agenda se calcula
+    en cada consulta sin guardarse, asi que la tabla solo crece con el horizonte.
+    """
+    hoy = hoy or timezone.localdate()
+    return (
+        hoy - timedelta(days=getattr(settings, 'AGENDA_CONSULTA_DIAS_ATRAS', 30)),
+        hoy + timedelta(days=getattr(settings, 'AGENDA_CONSULTA_DIAS_ADELANTE', 365)),
+    )
+
+
+def inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def fechas_entre(inicio, fin):
+    # Fechas locales que toca el intervalo [inicio, fin)
+    fecha = timezone.localtime(inicio).date()
+    ultima = timezone.localtime(fin - timedelta(microseconds=1)).date() if fin > inicio else fecha
+    fechas = [fecha]
+    # Se compara antes de sumar: date.max + 1 dia no existe
+    while fecha < ultima:
+        fecha += timedelta(days=1)
+        fechas.append(fecha)
+    return fechas
+
+
+def _marcar(bits, desde, hasta, libre):
+    for slot in range(max(desde, 0), min(hasta, SLOTS_POR_DIA)):
+        if libre:
+            bits[slot // 8] |= 1 << (slot % 8)
+        else:
+            bits[slot // 8] &= ~(1 << (slot % 8))
+
+
+def _slot(minutos, redondear_arriba=False):
+    if redondear_arriba:
+        return -(-minutos // MINUTOS_SLOT)
+    return minutos // MINUTOS_SLOT
+
+
+def calcular_slots(fecha, disponibilidades, ocupados):
+    """
+    ``disponibilidades``: pares (hora_inicio, hora_fin) del dia de la semana.
+    ``ocupados``: pares (inicio, fin) aware de citas y bloqueos que tocan la fecha.
+    """
+    bits = bytearray(BYTES_POR_DIA)
+    for hora_inicio, hora_fin in disponibilidades:
+        # Solo cuentan las franjas que caben completas en el horario
+        desde = _slot(hora_inicio.hour * 60 + hora_inicio.minute, redondear_arriba=True)
+        hasta = _slot(hora_fin.hour * 60 + hora_fin.minute)
+        _marcar(bits, desde, hasta, True)
+
+    inicio_dia = inicio_del_dia(fecha)
+    for inicio, fin in ocupados:
+        desde = (inicio - inicio_dia).total_seconds() // 60
+        hasta = (fin - inicio_dia).total_seconds() // 60
+        _marcar(bits, _slot(int(desde)), _slot(int(hasta), redondear_arriba=True), False)
+    return bytes(bits)
+
+
+def intervalos_libres(slots):
+    libres = []
+    inicio = None
+    for slot in range(SLOTS_POR_DIA + 1):
+        libre = slot < SLOTS_POR_DIA and slots[slot // 8] & (1 << (slot % 8))
+        if libre and inicio is None:
+            inicio = slot
+        elif not libre and inicio is not None:
+            libres.append((_hora(inicio), _hora(slot)))
+            inicio = None
+    return libres
+
+
+def _hora(slot):
+    minutos = slot * MINUTOS_SLOT
+    if minutos >= 24 * 60:
+        return '24:00'
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def calcular(fechas, empleado_ids=None):
+    """
+    Calcula sin guardar la agenda de los empleados indicados (o de todos los
+    que tienen horario) en las fechas dadas, con tres consultas en total.
+    """
+    fechas = sorted(set(fechas))
+    if not fechas:
+        return []
+    inicio = inicio_del_dia(fechas[0])
+    fin = inicio_del_dia(fechas[-1] + timedelta(days=1))
+
+    # Solo se leen los horarios de los dias de la semana que aparecen en el rango
+    horarios = defaultdict(list)
+    disponibilidades = Disponibilidad.objects.filter(dia_semana__in={fecha.isoweekday() for fecha in fechas})
+    if empleado_ids is not None:
+        disponibilidades = disponibilidades.filter(empleado_id__in=empleado_ids)
+    for empleado_id, dia_semana, hora_inicio, hora_fin in disponibilidades.values_list(
+        'empleado_id', 'dia_semana', 'hora_inicio', 'hora_fin'
+    ):
+        horarios[(empleado_id, dia_semana)].append((hora_inicio, hora_fin))
+
+    ocupados = defaultdict(list)
+    citas = Cita.objects.exclude(estado__in=ESTADOS_LIBRES).filter(
+        fecha_inicio__lt=fin, fecha_inicio__gte=inicio - timedelta(days=1)
+    )
+    bloqueos = Bloqueo.objects.filter(fecha_inicio__lt=fin, fecha_fin__gt=inicio)
+    if empleado_ids is not None:
+        citas = citas.filter(empleado_id__in=empleado_ids)
+        bloqueos = bloqueos.filter(empleado_id__in=empleado_ids)
+    for empleado_id, fecha_inicio, duracion in citas.values_list(
+        'empleado_id', 'fecha_inicio', 'servicio__duracion_minutos'
+    ):
+        fecha_fin = fecha_inicio + timedelta(minutes=duracion)
+        for fecha in fechas_entre(fecha_inicio, fecha_fin):
+            ocupados[(empleado_id, fecha)].append((fecha_inicio, fecha_fin))
+    for empleado_id, fecha_inicio, fecha_fin in bloqueos.values_list('empleado_id', 'fecha_inicio', 'fecha_fin'):
+        for fecha in fechas_entre(fecha_inicio, fecha_fin):
+            ocupados[(empleado_id, fecha)].append((fecha_inicio, fecha_fin))
+
+    if empleado_ids is None:
+        empleado_ids = {empleado_id for empleado_id, _ in horarios}
+    return [
+        AgendaDiaria(
+            empleado_id=empleado_id,
+            fecha=fecha,
+            slots=calcular_slots(fecha, horarios.get((empleado_id, fecha.isoweekday()), []),
+                                 ocupados.get((empleado_id, fecha), [])),
+        )
+        for empleado_id in empleado_ids
+        for fecha in fechas
+    ]
+
+
+def reconstruir(fechas, empleado_ids=None):
+    """Recalcula y guarda la agenda; devuelve cuantas filas escribio."""
+    agendas = calcular(fechas, empleado_ids)
+    if not agendas:
+        return 0
+    AgendaDiaria.objects.bulk_create(
+        agendas,
+        update_conflicts=True,
+        unique_fields=['empleado', 'fecha'],
+        update_fields=['slots', 'actualizada'],
+    )
+    return len(agendas)
+
+
+def actualizar_fechas(empleado_id, fechas):
+    # Solo se recalculan las fechas del horizonte. Las demas no se guardan: se
+    # borran por si tenian foto y se calculan si alguien las pide
+    hoy = timezone.localdate()
+    limite = hoy + timedelta(days=horizonte_dias())
+    dentro = [fecha for fecha in fechas if hoy <= fecha <= limite]
+    fuera = [fecha for fecha in fechas if not hoy <= fecha <= limite]
+    if fuera:
+        AgendaDiaria.objects.filter(empleado_id=empleado_id, fecha__in=fuera).delete()
+    if dentro:
+        reconstruir(dentro, empleado_ids=[empleado_id])
+
+
+def actualizar_dia_semana(empleado_id, dia):
+    # Un cambio de horario semanal afecta a todas las fechas de ese dia
+    hoy = timezone.localdate()
+    limite = hoy + timedelta(days=horizonte_dias())
+    AgendaDiaria.objects.filter(empleado_id=empleado_id, fecha__gt=limite).delete()
+    if dia is None:
+        return
+    reconstruir([fecha for fecha in horizonte(hoy) if fecha.isoweekday() == dia], empleado_ids=[empleado_id])
+
+
+def agenda_de(empleado_id, fecha):
+    # Una lectura por indice; si la fecha aun no tiene foto se calcula y se
+    # guarda, salvo que este fuera del horizonte que se mantiene al dia
+    hoy = timezone.localdate()
+    if not hoy <= fecha <= hoy + timedelta(days=horizonte_dias()):
+        return bytes(calcular([fecha], empleado_ids=[empleado_id])[0].slots)
+    agenda = AgendaDiaria.objects.filter(empleado_id=empleado_id, fecha=fecha).first()
+    if agenda is None:
+        reconstruir([fecha], empleado_ids=[empleado_id])
+        agenda = AgendaDiaria.objects.get(empleado_id=empleado_id, fecha=fecha)
+    return bytes(agenda.slots)
+
+
+def horizonte(desde=None):
+    desde = desde or timezone.localdate()
+    return [desde + timedelta(days=n) for n in range(horizonte_dias() + 1)]
+
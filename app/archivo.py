@@ -0,0 +1,157 @@
+import calendar
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import agenda, sync
+from .models import (
+    Bloqueo, BloqueoArchivado, Cita, CitaArchivada, Feedback, Notificacion, NotificacionArchivada,
+)
+
+# Estados en los que una cita ya no cambia
+ESTADOS_TERMINADOS = ('concluida', 'cancelada', 'rechazada')
+
+
+def retencion_meses():
+    return getattr(settings, 'ARCHIVO_RETENCION_MESES', 12)
+
+
+def restar_meses(momento, meses):
+    mes = momento.month - 1 - meses
+    anio, mes = momento.year + mes // 12, mes % 12 + 1
+    dia = min(momento.day, calendar.monthrange(anio, mes)[1])
+    return momento.replace(year=anio, month=mes, day=dia)
+
+
+def corte(meses=None, ahora=None):
+    ahora = ahora or timezone.now()
+    return restar_meses(ahora, retencion_meses() if meses is None else meses)
+
+
+def _reclamar(queryset, lote):
+    # Con SKIP LOCKED dos ejecuciones simultaneas no se pisan y las filas que
+    # la app tiene bloqueadas se dejan para el siguiente lote
+    return list(queryset.select_for_update(skip_locked=True).order_by('pk').values_list('pk', flat=True)[:lote])
+
+
+def _borrar_sin_senales(queryset):
+    # Un DELETE por tabla. El borrado normal dispara post_delete fila por fila
+    # (lapida, lectura del servicio, agenda) con los bloqueos del lote tomados;
+    # aqui las lapidas se insertan juntas y la agenda se actualiza al terminar
+    queryset._raw_delete(queryset.db)
+
+
+def _actualizar_agenda(pares):
+    por_empleado = defaultdict(set)
+    for empleado_id, fecha in pares:
+        por_empleado[empleado_id].add(fecha)
+    for empleado_id, fechas in por_empleado.items():
+        agenda.actualizar_fechas(empleado_id, fechas)
+
+
+def archivar_lote_citas(fecha_corte, lote):
+    """Mueve un lote de citas terminadas anteriores a ``fecha_corte``; devuelve cuantas movio."""
+    with transaction.atomic():
+        ids = _reclamar(Cita.objects.filter(estado__in=ESTADOS_TERMINADOS, fecha_inicio__lt=fecha_corte), lote)
+        if not ids:
+            return 0
+        citas = list(Cita.objects.filter(pk__in=ids).values(
+            'id', 'fecha_inicio', 'estado', 'usuario_id', 'servicio_id', 'empleado_id', 'sede_id',
+            'servicio__duracion_minutos', 'feedback__rating', 'feedback__comentario',
+        ))
+        bloqueos = list(Bloqueo.objects.filter(cita_id__in=ids).values(
+            'id', 'empleado_id', 'cita_id', 'fecha_inicio', 'fecha_fin',
+        ))
+        CitaArchivada.objects.bulk_create([
+            CitaArchivada(
+                id=cita['id'], fecha_inicio=cita['fecha_inicio'], estado=cita['estado'],
+                usuario_id=cita['usuario_id'], servicio_id=cita['servicio_id'],
+                empleado_id=cita['empleado_id'], sede_id=cita['sede_id'],
+                rating=cita['feedback__rating'], comentario=cita['feedback__comentario'] or '',
+            )
+            for cita in citas
+        ])
+        BloqueoArchivado.objects.bulk_create([BloqueoArchivado(**bloqueo) for bloqueo in bloqueos])
+        # Los clientes se enteran por la sincronizacion incremental
+        sync.registrar_eliminaciones('cita', [(cita['id'], cita['usuario_id']) for cita in citas])
+        _borrar_sin_senales(Feedback.objects.filter(cita_id__in=ids))
+        _borrar_sin_senales(Bloqueo.objects.filter(cita_id__in=ids))
+        _borrar_sin_senales(Cita.objects.filter(pk__in=ids))
+
+    # Fuera de la transaccion, una vez por lote: los bloqueos de filas ya se soltaron
+    pares = set()
+    for cita in citas:
+        fin = cita['fecha_inicio'] + timedelta(minutes=cita['servicio__duracion_minutos'])
+        pares.update((cita['empleado_id'], fecha) for fecha in agenda.fechas_entre(cita['fecha_inicio'], fin))
+    for bloqueo in bloqueos:
+        pares.update(
+            (bloqueo['empleado_id'], fecha) for fecha in agenda.fechas_entre(bloqueo['fecha_inicio'], bloqueo['fecha_fin'])
+        )
+    _actualizar_agenda(pares)
+    return len(ids)
+
+
+def archivar_lote_notificaciones(fecha_corte, lote):
+    with transaction.atomic():
+        ids = _reclamar(Notificacion.objects.filter(leida=True, fecha__lt=fecha_corte), lote)
+        if not ids:
+            return 0
+        notificaciones = list(Notificacion.objects.filter(pk__in=ids).values(
+            'id', 'tipo', 'mensaje', 'fecha', 'leida', 'usuario_id',
+        ))
+        NotificacionArchivada.objects.bulk_create([
+            NotificacionArchivada(**notificacion) for notificacion in notificaciones
+        ])
+        sync.registrar_eliminaciones(
+            'notificacion', [(notificacion['id'], notificacion['usuario_id']) for notificacion in notificaciones]
+        )
+        _borrar_sin_senales(Notificacion.objects.filter(pk__in=ids))
+    return len(ids)
+
+
+def resumen_citas(desde=None, hasta=None, sede_id=None, incluir_archivo=False):
+    """
+    Citas por mes, sede y estado con el rating promedio. Con
+    ``incluir_archivo`` suma las filas del historico a las vigentes.
+    """
+    fuentes = [(Cita.objects.all(), 'feedback__rating')]
+    if incluir_archivo:
+        fuentes.append((CitaArchivada.objects.all(), 'rating'))
+
+    filas = {}
+    for queryset, rating in fuentes:
+        if desde:
+            queryset = queryset.filter(fecha_inicio__gte=desde)
+        if hasta:
+            queryset = queryset.filter(fecha_inicio__lt=hasta)
+        if sede_id:
+            queryset = queryset.filter(sede_id=sede_id)
+        grupos = (
+            queryset.annotate(mes=TruncMonth('fecha_inicio'))
+            .values('mes', 'sede_id', 'estado')
+            .annotate(citas=Count('id'), suma_rating=Sum(rating), con_rating=Count(rating))
+        )
+        for grupo in grupos:
+            clave = (grupo['mes'], grupo['sede_id'], grupo['estado'])
+            fila = filas.setdefault(clave, {'citas': 0, 'suma_rating': 0, 'con_rating': 0})
+            fila['citas'] += grupo['citas']
+            fila['suma_rating'] += grupo['suma_rating'] or 0
+            fila['con_rating'] += grupo['con_rating']
+
+    return [
+        {
+            'mes': _mes(mes), 'sede': sede, 'estado': estado, 'citas': fila['citas'],
+            'rating_promedio': round(fila['suma_rating'] / fila['con_rating'], 2) if fila['con_rating'] else None,
+        }
+        for (mes, sede, estado), fila in sorted(filas.items(), key=lambda item: (_mes(item[0][0]), *item[0][1:]))
+    ]
+
+
+def _mes(mes):
+    # TruncMonth devuelve datetime en la zona local
+    return (mes.date() if isinstance(mes, datetime) else mes).strftime('%Y-%m')
@@ -0,0 +1,80 @@
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import NotAuthenticated, ValidationError
+from .authentication import ausuario_desde_request
+from .filters import filtrar
+from .models import Sede, Cita, Notificacion
+from .renderers import OrjsonRenderer
+from .serializers import SedeSerializer, CitaSerializer, NotificacionSerializer
+from . import views
+
+# Versiones async de las vistas de solo lectura para los workers ASGI.
+# Devuelven el mismo JSON que los viewsets equivalentes; los serializers se
+# ejecutan sobre instancias ya cargadas, asi que no tocan la base de datos.
+
+
+def respuesta_json(data, status=200, headers=None):
+    return HttpResponse(
+        OrjsonRenderer().render(data),
+        status=status,
+        content_type='application/json',
+        headers=headers,
+    )
+
+
+def no_autenticado():
+    return respuesta_json(
+        {'detail': NotAuthenticated.default_detail},
+        status=401,
+        headers={'WWW-Authenticate': 'Bearer'},
+    )
+
+
+@require_GET
+async def sedes(request):
+    queryset = Sede.objects.all()
+    ciudad = request.GET.get('ciudad')
+    if ciudad:
+        queryset = queryset.filter(ciudad__istartswith=ciudad)
+    sedes = [sede async for sede in queryset.aiterator()]
+    return respuesta_json(SedeSerializer(sedes, many=True).data)
+
+
+@require_GET
+async def citas(request):
+    user = await ausuario_desde_request(request)
+    if user is None:
+        return no_autenticado()
+    queryset = Cita.objects.select_related(
+        'usuario__imagen', 'servicio', 'empleado__sede', 'empleado__imagen', 'sede'
+    )
+    if not (user.rol == 'admin' or user.is_staff):
+        queryset = queryset.filter(usuario=user)
+    try:
+        queryset = filtrar(queryset, request.GET, views.CitaViewSet.filtros_igualdad, views.CitaViewSet.filtro_rango)
+    except ValidationError as exc:
+        return respuesta_json(exc.detail, status=400)
+    # Mismo criterio que OrderingFilter: se ignoran los campos fuera de la lista blanca
+    orden = [
+        campo.strip() for campo in request.GET.get('ordering', '').split(',')
+        if campo.strip().lstrip('-') in views.CitaViewSet.ordering_fields
+    ]
+    queryset = queryset.order_by(*(orden or views.CitaViewSet.ordering))
+    citas = [cita async for cita in queryset.aiterator()]
+    return respuesta_json(CitaSerializer(citas, many=True).data)
+
+
+@require_GET
+async def notificaciones(request):
+    user = await ausuario_desde_request(request)
+    if user is None:
+        return no_autenticado()
+    queryset = Notificacion.objects.select_related('usuario__imagen')
+    if not (user.rol == 'admin' or user.is_staff):
+        queryset = queryset.filter(usuario=user)
+    notificaciones = [notificacion async for notificacion in queryset.aiterator()]
+    no_leidas = await queryset.filter(leida=False).acount()
+    return respuesta_json(
+        NotificacionSerializer(notificaciones, many=True).data,
+        headers={'X-No-Leidas': str(no_leidas)},
+    )
@@ -0,0 +1,42 @@
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import authentication, exceptions
+
+User = get_user_model()
+
+
+def usuario_id_desde_header(header):
+    # Tokens "Bearer <jwt>" emitidos por LoginView (user_id) y RegisterUserView (id)
+    if not header:
+        return None
+    partes = header.split()
+    if len(partes) != 2 or partes[0].lower() != 'bearer':
+        return None
+    try:
+        payload = jwt.decode(partes[1], settings.JWT_SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    return payload.get('user_id', payload.get('id'))
+
+
+async def ausuario_desde_request(request):
+    usuario_id = usuario_id_desde_header(request.headers.get('Authorization'))
+    if usuario_id is None:
+        return None
+    return await User.objects.filter(pk=usuario_id, is_active=True).afirst()
+
+
+class TokenUsuarioAuthentication(authentication.BaseAuthentication):
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).decode('latin-1')
+        usuario_id = usuario_id_desde_header(header)
+        if usuario_id is None:
+            return None
+        user = User.objects.filter(pk=usuario_id, is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed('Usuario no encontrado o inactivo')
+        return (user, None)
+
+    def authenticate_header(self, request):
+        return 'Bearer'
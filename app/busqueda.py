@@ -0,0 +1,112 @@
+import time
+import unicodedata
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Empleado, EmpleadoServicio
+
+# Indice en memoria de empleados por sede, servicio y ciudad. Cada proceso
+# guarda su copia junto con la version con que la construyo; la version vive
+# en el cache "compartida" (Redis o la base, nunca el de cada proceso) y se
+# renueva cuando cambian empleados, sedes o la relacion empleado-servicio.
+# Cada worker la consulta a lo sumo cada BUSQUEDA_REVISION_SEGUNDOS, asi que
+# los demas workers reconstruyen su indice con ese retraso como maximo.
+CLAVE_VERSION = 'busqueda:empleados:version'
+
+_indice = {'version': None, 'revisada': None}
+
+
+def revision_segundos():
+    return getattr(settings, 'BUSQUEDA_REVISION_SEGUNDOS', 5)
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def invalidar():
+    global _indice
+    caches['compartida'].set(CLAVE_VERSION, uuid.uuid4().hex, None)
+    # El proceso que hizo el cambio lo ve en la siguiente busqueda
+    _indice = {**_indice, 'revisada': None}
+
+
+def construir():
+    empleados = {}
+    por_sede = defaultdict(set)
+    por_servicio = defaultdict(set)
+    por_ciudad = defaultdict(set)
+    for empleado in Empleado.objects.values('id', 'nombre', 'url_foto', 'sede_id', 'sede__ciudad'):
+        empleados[empleado['id']] = {
+            'id': empleado['id'],
+            'nombre': empleado['nombre'],
+            'url_foto': empleado['url_foto'],
+            'sede_id': empleado['sede_id'],
+            'ciudad': empleado['sede__ciudad'],
+            'servicios': [],
+            '_nombre': normalizar(empleado['nombre']),
+        }
+        por_sede[empleado['sede_id']].add(empleado['id'])
+        por_ciudad[normalizar(empleado['sede__ciudad'])].add(empleado['id'])
+    for empleado_id, servicio_id in EmpleadoServicio.objects.order_by('servicio_id').values_list(
+        'empleado_id', 'servicio_id'
+    ):
+        # El empleado pudo crearse entre las dos consultas; entra en la siguiente version
+        if empleado_id not in empleados:
+            continue
+        empleados[empleado_id]['servicios'].append(servicio_id)
+        por_servicio[servicio_id].add(empleado_id)
+    return {
+        'empleados': empleados,
+        'sede': dict(por_sede),
+        'servicio': dict(por_servicio),
+        'ciudad': dict(por_ciudad),
+    }
+
+
+def indice():
+    global _indice
+    actual = _indice
+    ahora = time.monotonic()
+    if actual['revisada'] is not None and ahora - actual['revisada'] < revision_segundos():
+        return actual
+    compartida = caches['compartida']
+    version = compartida.get(CLAVE_VERSION)
+    if version is None:
+        compartida.add(CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = compartida.get(CLAVE_VERSION)
+    if actual['version'] != version:
+        # Se reemplaza el dict completo para que otros hilos nunca vean uno a medias
+        actual = {**construir(), 'version': version, 'revisada': ahora}
+    else:
+        actual = {**actual, 'revisada': ahora}
+    _indice = actual
+    return actual
+
+
+def buscar(sede=None, servicio=None, ciudad=None, texto=None, limite=50):
+    datos = indice()
+    candidatos = None
+    for filtro, valor in (('sede', sede), ('servicio', servicio), ('ciudad', normalizar(ciudad) if ciudad else None)):
+        if valor is None:
+            continue
+        ids = datos[filtro].get(valor, set())
+        candidatos = ids if candidatos is None else candidatos & ids
+    if candidatos is None:
+        candidatos = datos['empleados'].keys()
+
+    palabras = normalizar(texto).split() if texto else []
+    resultados = []
+    for empleado_id in candidatos:
+        empleado = datos['empleados'][empleado_id]
+        if all(palabra in empleado['_nombre'] for palabra in palabras):
+            resultados.append(empleado)
+    resultados.sort(key=lambda empleado: (empleado['_nombre'], empleado['id']))
+    return [
+        {clave: valor for clave, valor in empleado.items() if not clave.startswith('_')}
+        for empleado in resultados[:limite]
+    ]
@@ -0,0 +1,152 @@
+import base64
+import binascii
+import uuid
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Max, Q
+
+from .models import Publicacion
+
+# El feed se arma con las publicaciones de cada dia, cacheadas por separado.
+# Cada dia tiene una version en el cache "compartida", que ven todos los
+# workers; escribir una publicacion solo invalida los dias que toca y el resto
+# de las paginas sigue saliendo de la cache. El contenido de cada dia se guarda
+# en la cache local bajo su version, asi que un worker nunca sirve un dia
+# invalidado en otro: la clave que buscaria ya no es la vigente.
+
+
+def cache_segundos():
+    return getattr(settings, 'FEED_CACHE_SEGUNDOS', 24 * 60 * 60)
+
+
+def _clave_version(fecha):
+    return f'feed:version:{fecha.isoformat()}'
+
+
+def invalidar(fechas):
+    caches['compartida'].delete_many([_clave_version(fecha) for fecha in set(fechas)])
+
+
+def codificar_cursor(fecha, pk, nuevas=None):
+    """
+    Cursor de la pagina siguiente. ``nuevas`` es el par (desde_id, hasta_id) de
+    una sincronizacion con ?since=, para que la pagina siguiente siga trayendo
+    solo publicaciones nuevas y no el feed completo.
+    """
+    partes = [fecha.isoformat(), str(pk), *(str(valor) for valor in nuevas or ())]
+    return base64.urlsafe_b64encode('|'.join(partes).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    # Devuelve (fecha, id, nuevas) o lanza ValueError
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        fecha, pk, *nuevas = texto.split('|')
+        if len(nuevas) not in (0, 2):
+            raise ValueError(cursor)
+        return date.fromisoformat(fecha), int(pk), tuple(int(valor) for valor in nuevas) or None
+    except (UnicodeDecodeError, binascii.Error) as exc:
+        raise ValueError(cursor) from exc
+
+
+def _serializar(publicaciones, request):
+    # Las señales importan este modulo al arrancar; los serializers (y DRF con
+    # ellos) se cargan recien con la primera peticion o en el master de gunicorn
+    from .serializers import PublicacionSerializer
+    return PublicacionSerializer(publicaciones, many=True, context={'request': request}).data
+
+
+def versiones(fechas):
+    """Version vigente de cada fecha; crea las que falten."""
+    if not fechas:
+        return {}
+    compartida = caches['compartida']
+    guardadas = compartida.get_many([_clave_version(fecha) for fecha in fechas])
+    faltantes = [_clave_version(fecha) for fecha in fechas if _clave_version(fecha) not in guardadas]
+    if faltantes:
+        # add no pisa la version que otro worker haya creado mientras tanto
+        for clave in faltantes:
+            compartida.add(clave, uuid.uuid4().hex, cache_segundos())
+        guardadas.update(compartida.get_many(faltantes))
+    return {fecha: guardadas[_clave_version(fecha)] for fecha in fechas}
+
+
+def firma(por_fecha):
+    # Identifica el contenido de los dias de una pagina sin serializarla: cada
+    # cambio en un dia le da otra version
+    return ','.join(f'{fecha.isoformat()}:{version}' for fecha, version in sorted(por_fecha.items()))
+
+
+def publicaciones_por_dia(fechas, request, por_fecha=None):
+    if not fechas:
+        return {}
+    por_fecha = por_fecha or versiones(fechas)
+
+    # Las URLs de las imagenes son absolutas, asi que la clave incluye el host
+    host = request.get_host()
+    claves = {fecha: f'feed:dia:{fecha.isoformat()}:{por_fecha[fecha]}:{host}' for fecha in fechas}
+    encontrados = cache.get_many(list(claves.values()))
+    dias = {fecha: encontrados[clave] for fecha, clave in claves.items() if clave in encontrados}
+
+    faltantes = [fecha for fecha in fechas if fecha not in dias]
+    if faltantes:
+        publicaciones = Publicacion.objects.filter(fecha__in=faltantes).select_related('imagen').order_by('-fecha', '-id')
+        for fecha in faltantes:
+            dias[fecha] = []
+        for publicacion, datos in zip(publicaciones, _serializar(publicaciones, request)):
+            dias[publicacion.fecha].append(dict(datos))
+        cache.set_many({claves[fecha]: dias[fecha] for fecha in faltantes}, cache_segundos())
+    return dias
+
+
+def pagina(request, cursor=None, limite=20):
+    """
+    Publicaciones ordenadas por (fecha, id) descendente, anteriores a ``cursor``.
+    Devuelve (resultados, cursor_siguiente, firma).
+    """
+    fechas = Publicacion.objects.order_by('-fecha').values_list('fecha', flat=True).distinct()
+    if cursor:
+        fechas = fechas.filter(fecha__lte=cursor[0])
+    # Cada dia tiene al menos una publicacion, salvo el del cursor, que puede
+    # no tener ninguna anterior a el: con limite + 2 dias hay limite + 1 resultados
+    fechas = list(fechas[:limite + 2])
+    por_fecha = versiones(fechas)
+    dias = publicaciones_por_dia(fechas, request, por_fecha)
+
+    resultados = []
+    for fecha in fechas:
+        for publicacion in dias[fecha]:
+            if cursor and (fecha, publicacion['id']) >= cursor:
+                continue
+            resultados.append(publicacion)
+    siguiente = None
+    if len(resultados) > limite:
+        resultados = resultados[:limite]
+        ultima = resultados[-1]
+        siguiente = codificar_cursor(date.fromisoformat(ultima['fecha']), ultima['id'])
+    return resultados, siguiente, firma(por_fecha)
+
+
+def nuevas(request, desde_id, hasta_id, limite=20, cursor=None):
+    """
+    Sincronizacion incremental: publicaciones con ``desde_id < id <= hasta_id``
+    en el orden del feed. ``hasta_id`` se fija en la primera pagina para que
+    las siguientes recorran el mismo conjunto. Devuelve (resultados,
+    cursor_siguiente, firma).
+    """
+    publicaciones = Publicacion.objects.filter(id__gt=desde_id, id__lte=hasta_id)
+    if cursor:
+        publicaciones = publicaciones.filter(Q(fecha__lt=cursor[0]) | Q(fecha=cursor[0], id__lt=cursor[1]))
+    publicaciones = list(publicaciones.select_related('imagen').order_by('-fecha', '-id')[:limite + 1])
+    siguiente = None
+    if len(publicaciones) > limite:
+        publicaciones = publicaciones[:limite]
+        siguiente = codificar_cursor(publicaciones[-1].fecha, publicaciones[-1].id, (desde_id, hasta_id))
+    por_fecha = versiones({publicacion.fecha for publicacion in publicaciones})
+    return _serializar(publicaciones, request), siguiente, firma(por_fecha)
+
+
+def ultimo_id():
+    return Publicacion.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
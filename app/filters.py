@@ -0,0 +1,106 @@
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+
+class FiltroIndexado(BaseFilterBackend):
+    """
+    Filtros declarados en la vista que solo se aceptan si algun indice del
+    modelo los cubre: los de igualdad (``filtros_igualdad``) deben ser el
+    prefijo del indice y el rango de fechas (``filtro_rango``), la columna
+    siguiente. ``?desde=``/``?hasta=`` filtran el rango y ``?dia=`` es el dia
+    local completo.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return filtrar(
+            queryset,
+            request.query_params,
+            getattr(view, 'filtros_igualdad', {}),
+            getattr(view, 'filtro_rango', None),
+        )
+
+
+def _indices(model):
+    indices = [tuple(campo.lstrip('-') for campo in indice.fields) for indice in model._meta.indexes]
+    indices += [(campo.name,) for campo in model._meta.fields if campo.db_index and not campo.primary_key]
+    return indices
+
+
+def cubierto(model, igualdad, rango):
+    if not igualdad and not rango:
+        return True
+    for indice in _indices(model):
+        prefijo = indice[:len(igualdad)]
+        if set(prefijo) != set(igualdad) or len(prefijo) != len(igualdad):
+            continue
+        if rango is None or indice[len(igualdad):len(igualdad) + 1] == (rango,):
+            return True
+    return False
+
+
+def _valor(model, campo, texto):
+    field = model._meta.get_field(campo)
+    if field.choices:
+        if texto not in dict(field.choices):
+            raise serializers.ValidationError({campo: f'Valor inválido: {texto}'})
+        return texto
+    if field.is_relation or field.get_internal_type() in ('IntegerField', 'BigIntegerField', 'BigAutoField'):
+        try:
+            return int(texto)
+        except ValueError:
+            raise serializers.ValidationError({campo: 'Debe ser un número.'})
+    return texto
+
+
+def _momento(nombre, texto, fin=False):
+    try:
+        if len(texto) == 10:
+            valor = datetime.combine(date.fromisoformat(texto), time.min)
+            if fin:
+                valor += timedelta(days=1)
+        else:
+            valor = datetime.fromisoformat(texto)
+    except ValueError:
+        raise serializers.ValidationError({nombre: 'Debe ser una fecha AAAA-MM-DD o fecha y hora ISO 8601.'})
+    return timezone.make_aware(valor) if timezone.is_naive(valor) else valor
+
+
+def filtrar(queryset, params, filtros_igualdad, filtro_rango=None):
+    model = queryset.model
+    igualdad = {}
+    for parametro, campo in filtros_igualdad.items():
+        texto = params.get(parametro)
+        if texto not in (None, ''):
+            igualdad[campo] = _valor(model, campo, texto)
+
+    rango = {}
+    if filtro_rango:
+        if params.get('dia'):
+            rango[f'{filtro_rango}__gte'] = _momento('dia', params['dia'])
+            rango[f'{filtro_rango}__lt'] = _momento('dia', params['dia'], fin=True)
+        if params.get('desde'):
+            rango[f'{filtro_rango}__gte'] = _momento('desde', params['desde'])
+        if params.get('hasta'):
+            # Con solo fecha, ?hasta= incluye ese dia completo
+            rango[f'{filtro_rango}__lt'] = _momento('hasta', params['hasta'], fin=True)
+
+    if not cubierto(model, tuple(igualdad), filtro_rango if rango else None):
+        raise serializers.ValidationError({
+            'filtros': 'Esta combinación de filtros no tiene un índice. Combinaciones permitidas: '
+                       + '; '.join(combinaciones(model, filtros_igualdad))
+        })
+    return queryset.filter(**igualdad, **rango)
+
+
+def combinaciones(model, filtros_igualdad):
+    parametros = {campo: parametro for parametro, campo in filtros_igualdad.items()}
+    resultado = set()
+    for indice in _indices(model):
+        for largo in range(1, len(indice) + 1):
+            if not all(campo in parametros for campo in indice[:largo]):
+                break
+            resultado.add(' + '.join(sorted(parametros[campo] for campo in indice[:largo])))
+    return sorted(resultado)
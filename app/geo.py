@@ -0,0 +1,100 @@
+import math
+
+# Geohash: cada caracter subdivide la celda anterior en 32. Las sedes
+# cercanas comparten prefijo, asi que buscarlas es un LIKE 'prefijo%' indexado.
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+RADIO_TIERRA_KM = 6371.0088
+
+
+def codificar(latitud, longitud, precision=PRECISION):
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    geohash = []
+    bits = 0
+    valor = 0
+    par = True
+    while len(geohash) < precision:
+        if par:
+            medio = (lon_min + lon_max) / 2
+            if longitud >= medio:
+                valor = (valor << 1) | 1
+                lon_min = medio
+            else:
+                valor <<= 1
+                lon_max = medio
+        else:
+            medio = (lat_min + lat_max) / 2
+            if latitud >= medio:
+                valor = (valor << 1) | 1
+                lat_min = medio
+            else:
+                valor <<= 1
+                lat_max = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            geohash.append(BASE32[valor])
+            bits = 0
+            valor = 0
+    return ''.join(geohash)
+
+
+def celda(geohash):
+    # (lat_min, lat_max, lon_min, lon_max) de la celda
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    par = True
+    for caracter in geohash:
+        valor = BASE32.index(caracter)
+        for desplazamiento in range(4, -1, -1):
+            bit = (valor >> desplazamiento) & 1
+            if par:
+                medio = (lon_min + lon_max) / 2
+                if bit:
+                    lon_min = medio
+                else:
+                    lon_max = medio
+            else:
+                medio = (lat_min + lat_max) / 2
+                if bit:
+                    lat_min = medio
+                else:
+                    lat_max = medio
+            par = not par
+    return lat_min, lat_max, lon_min, lon_max
+
+
+def vecinos(geohash):
+    # La celda y sus 8 vecinas (menos en los polos)
+    lat_min, lat_max, lon_min, lon_max = celda(geohash)
+    alto = lat_max - lat_min
+    ancho = lon_max - lon_min
+    centro_lat = (lat_min + lat_max) / 2
+    centro_lon = (lon_min + lon_max) / 2
+    celdas = set()
+    for d_lat in (-1, 0, 1):
+        latitud = centro_lat + d_lat * alto
+        if not -90 <= latitud <= 90:
+            continue
+        for d_lon in (-1, 0, 1):
+            longitud = (centro_lon + d_lon * ancho + 180) % 360 - 180
+            celdas.add(codificar(latitud, longitud, len(geohash)))
+    return celdas
+
+
+def radio_cubierto_km(geohash, latitud):
+    # Distancia minima desde cualquier punto de la celda central hasta fuera de
+    # sus 8 vecinas: todo lo que este mas cerca esta dentro del bloque de 3x3
+    lat_min, lat_max, lon_min, lon_max = celda(geohash)
+    alto_km = math.radians(lat_max - lat_min) * RADIO_TIERRA_KM
+    # El ancho se mide en la latitud mas alejada del ecuador que toca el bloque
+    latitud_extrema = min(abs(latitud) + (lat_max - lat_min) * 2, 90)
+    ancho_km = math.radians(lon_max - lon_min) * RADIO_TIERRA_KM * math.cos(math.radians(latitud_extrema))
+    return min(alto_km, ancho_km)
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
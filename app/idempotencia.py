@@ -0,0 +1,100 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from .renderers import OrjsonRenderer
+from .stores import get_store
+
+# Con Idempotency-Key, la primera peticion reserva la clave en el store
+# compartido de IDEMPOTENCIA_STORE (add es atomico en la tabla de TablaStore,
+# asi que entre reintentos concurrentes solo uno pasa, aunque lleguen a
+# workers distintos) y al terminar guarda la respuesta ya renderizada. Los
+# reintentos reciben esa respuesta sin volver a ejecutar la vista; mientras la
+# primera sigue en curso reciben 409.
+
+LARGO_MAXIMO = 255
+
+
+def ttl():
+    return getattr(settings, 'IDEMPOTENCIA_TTL_SEGUNDOS', 24 * 60 * 60)
+
+
+def ttl_en_curso():
+    # Si el worker muere a mitad de la peticion la reserva vence sola. Debe
+    # durar mas que el timeout de la peticion para que un reintento no corra
+    # mientras la original sigue en curso
+    return getattr(settings, 'IDEMPOTENCIA_EN_CURSO_SEGUNDOS', 60)
+
+
+def huella(request):
+    cuerpo = OrjsonRenderer().render(request.data) if request.data else b''
+    return hashlib.sha256(b'\n'.join([request.method.encode(), request.path.encode(), cuerpo])).hexdigest()
+
+
+def repetir(guardada):
+    response = HttpResponse(guardada['cuerpo'], status=guardada['status'], content_type=guardada['content_type'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def responder(request, vista):
+    llave = request.headers.get('Idempotency-Key')
+    if llave is None:
+        return vista()
+    if not llave or len(llave) > LARGO_MAXIMO:
+        return Response(
+            {'Idempotency-Key': f'Debe tener entre 1 y {LARGO_MAXIMO} caracteres.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    store = get_store('IDEMPOTENCIA_STORE')
+    # Por usuario, para que dos clientes no choquen con la misma clave
+    clave = f'idempotencia:{request.user.pk}:{hashlib.sha256(llave.encode()).hexdigest()}'
+    actual = huella(request)
+    if not store.add(clave, {'huella': actual}, ttl_en_curso()):
+        guardada = store.get(clave)
+        if guardada is None:
+            # Vencio entre add y get: se trata como una peticion nueva
+            return responder(request, vista)
+        if guardada['huella'] != actual:
+            return Response(
+                {'Idempotency-Key': 'Ya se uso con otra petición.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if 'status' not in guardada:
+            return Response(
+                {'Idempotency-Key': 'La petición original todavía está en curso.'},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Retry-After': '1'},
+            )
+        return repetir(guardada)
+
+    try:
+        response = vista()
+    except Exception:
+        store.delete(clave)
+        raise
+    if response.status_code >= 500:
+        # Un error del servidor puede ser transitorio; el reintento se ejecuta de nuevo
+        store.delete(clave)
+        return response
+    store.set(clave, {
+        'huella': actual,
+        'status': response.status_code,
+        'cuerpo': OrjsonRenderer().render(response.data) if response.data is not None else b'',
+        'content_type': 'application/json',
+    }, ttl())
+    return response
+
+
+def idempotente(metodo):
+    """Decorador para acciones de un ViewSet que aceptan Idempotency-Key."""
+
+    @functools.wraps(metodo)
+    def envoltura(self, request, *args, **kwargs):
+        return responder(request, lambda: metodo(self, request, *args, **kwargs))
+    return envoltura
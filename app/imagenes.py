@@ -0,0 +1,105 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import Imagen
+
+logger = logging.getLogger(__name__)
+
+# Pillow se importa dentro de las funciones que lo usan para no cargarlo al
+# arrancar los workers de la API, que solo necesitan armar los srcset.
+
+FORMATOS = {
+    'webp': {'formato': 'WEBP', 'extension': 'webp', 'opciones': {'quality': 80, 'method': 4}},
+    'jpeg': {'formato': 'JPEG', 'extension': 'jpg', 'opciones': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+
+
+def anchos():
+    return getattr(settings, 'IMAGENES_ANCHOS', (160, 480, 1080))
+
+
+def formatos():
+    return getattr(settings, 'IMAGENES_FORMATOS', ('webp', 'jpeg'))
+
+
+def _ruta_variante(imagen, ancho, extension):
+    base = os.path.splitext(os.path.basename(imagen.original.name))[0]
+    return f'imagenes/variantes/{imagen.pk}/{base}-{ancho}w.{extension}'
+
+
+def generar_variantes(imagen):
+    from PIL import Image, ImageOps
+
+    with imagen.original.open('rb') as archivo:
+        original = Image.open(archivo)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    # No se generan variantes mas anchas que el original; si es mas pequeño
+    # que todas, se genera una sola con su ancho
+    objetivos = sorted({min(ancho, original.width) for ancho in anchos()})
+    variantes = []
+    for ancho in objetivos:
+        alto = max(1, round(original.height * ancho / original.width))
+        redimensionada = original.resize((ancho, alto), Image.LANCZOS) if ancho != original.width else original
+        for nombre in formatos():
+            formato = FORMATOS[nombre]
+            salida = redimensionada
+            if formato['formato'] == 'JPEG' and salida.mode != 'RGB':
+                salida = salida.convert('RGB')
+            contenido = BytesIO()
+            salida.save(contenido, formato['formato'], **formato['opciones'])
+            ruta = _ruta_variante(imagen, ancho, formato['extension'])
+            if default_storage.exists(ruta):
+                default_storage.delete(ruta)
+            ruta = default_storage.save(ruta, ContentFile(contenido.getvalue()))
+            variantes.append({
+                'ruta': ruta, 'ancho': ancho, 'alto': alto, 'formato': nombre, 'bytes': contenido.tell(),
+            })
+    return variantes
+
+
+def procesar(imagen):
+    from PIL import Image
+
+    try:
+        imagen.variantes = generar_variantes(imagen)
+        imagen.estado = 'lista'
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception('No se pudieron generar las variantes de la imagen %s', imagen.pk)
+        imagen.estado = 'error'
+    imagen.save(update_fields=['variantes', 'estado'])
+    return imagen
+
+
+def procesar_pendientes(lote=20):
+    # Cada imagen se reclama con SKIP LOCKED para que varios workers no la repitan
+    procesadas = 0
+    while procesadas < lote:
+        with transaction.atomic():
+            imagen = (
+                Imagen.objects.select_for_update(skip_locked=True)
+                .filter(estado='pendiente').order_by('pk').first()
+            )
+            if imagen is None:
+                break
+            procesar(imagen)
+        procesadas += 1
+    return procesadas
+
+
+def srcset(imagen, url=None):
+    # {"webp": "url 160w, url 480w", "jpeg": "..."}
+    url = url or default_storage.url
+    resultado = {}
+    for variante in imagen.variantes:
+        resultado.setdefault(variante['formato'], []).append(f"{url(variante['ruta'])} {variante['ancho']}w")
+    return {formato: ', '.join(entradas) for formato, entradas in resultado.items()}
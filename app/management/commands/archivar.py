@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import archivo
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve al historico las citas terminadas (con sus bloqueos y feedback) y las '
+        'notificaciones leidas mas viejas que --meses, en lotes de una transaccion cada uno'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=None, help='Antiguedad minima (ARCHIVO_RETENCION_MESES)')
+        parser.add_argument('--lote', type=int, default=500, help='Filas por transaccion')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes')
+        parser.add_argument('--max-lotes', type=int, default=None, help='Detenerse despues de este numero de lotes')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+        if options['meses'] is not None and options['meses'] < 1:
+            raise CommandError('--meses debe ser mayor que cero')
+        fecha_corte = archivo.corte(options['meses'])
+        self.stdout.write(f'Archivando registros anteriores a {fecha_corte:%Y-%m-%d %H:%M}')
+
+        totales = {}
+        lotes = 0
+        for nombre, archivar in (
+            ('citas', archivo.archivar_lote_citas),
+            ('notificaciones', archivo.archivar_lote_notificaciones),
+        ):
+            totales[nombre] = 0
+            while options['max_lotes'] is None or lotes < options['max_lotes']:
+                # Cada lote es una transaccion corta: los bloqueos se sueltan entre lotes
+                movidas = archivar(fecha_corte, options['lote'])
+                if not movidas:
+                    break
+                totales[nombre] += movidas
+                lotes += 1
+                if options['pausa']:
+                    time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{totales['citas']} citas y {totales['notificaciones']} notificaciones archivadas en {lotes} lotes"
+        ))
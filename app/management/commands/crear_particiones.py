@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import particiones
+
+
+class Command(BaseCommand):
+    help = 'Crea por adelantado las particiones mensuales de citas y bloqueos (solo PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=None, help='Meses hacia adelante (PARTICIONES_MESES_ADELANTE)')
+        parser.add_argument('--desde', default=None, help='Mes inicial AAAA-MM (el actual por defecto)')
+
+    def handle(self, *args, **options):
+        if not particiones.disponible():
+            self.stdout.write('La base de datos no es PostgreSQL; las tablas no estan particionadas')
+            return
+        try:
+            desde = date.fromisoformat(f"{options['desde']}-01") if options['desde'] else None
+        except ValueError:
+            raise CommandError('--desde debe tener el formato AAAA-MM')
+        creadas = particiones.crear(desde, options['meses'])
+        for nombre in creadas:
+            self.stdout.write(f'  {nombre}')
+        self.stdout.write(self.style.SUCCESS(f'{len(creadas)} particiones creadas'))
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from app import middleware
+from app.models import Bloqueo, Cita
+from app.renderers import OrjsonRenderer
+from app.serializers import BloqueoSerializer, CitaSerializer
+
+LISTAS = {
+    'citas': (
+        Cita.objects.select_related('usuario__imagen', 'servicio', 'empleado__sede', 'empleado__imagen', 'sede'),
+        CitaSerializer,
+    ),
+    'bloqueos': (
+        Bloqueo.objects.select_related(
+            'empleado__sede', 'empleado__imagen', 'cita__usuario__imagen', 'cita__servicio',
+            'cita__empleado__sede', 'cita__empleado__imagen', 'cita__sede',
+        ),
+        BloqueoSerializer,
+    ),
+}
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, statistics.median(tiempos) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de render y los bytes enviados de las listas de citas y bloqueos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lista', choices=sorted(LISTAS), action='append', help='Por defecto, todas')
+        parser.add_argument('--limite', type=int, default=500, help='Filas por lista')
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        for nombre in options['lista'] or sorted(LISTAS):
+            queryset, serializer_class = LISTAS[nombre]
+            data = serializer_class(queryset.order_by('pk')[:options['limite']], many=True).data
+            if not data:
+                self.stdout.write(self.style.WARNING(f'{nombre}: no hay filas para medir'))
+                continue
+
+            drf, ms_drf = medir(lambda: JSONRenderer().render(data), options['repeticiones'])
+            rapido, ms_rapido = medir(lambda: OrjsonRenderer().render(data), options['repeticiones'])
+            gzip, ms_gzip = medir(lambda: middleware.comprimir(rapido, 'gzip'), options['repeticiones'])
+
+            self.stdout.write(f'{nombre}: {len(data)} filas, salida identica: {"si" if drf == rapido else "NO"}')
+            self.stdout.write(f'  render DRF     {ms_drf:>8.2f} ms')
+            self.stdout.write(f'  render orjson  {ms_rapido:>8.2f} ms  ({ms_drf / ms_rapido:.1f}x)')
+            self.stdout.write(f'  sin comprimir  {len(rapido):>8} bytes')
+            self.stdout.write(f'  gzip           {len(gzip):>8} bytes  {ms_gzip:>8.2f} ms')
+            if middleware.brotli is not None:
+                br, ms_br = medir(lambda: middleware.comprimir(rapido, 'br'), options['repeticiones'])
+                self.stdout.write(f'  brotli         {len(br):>8} bytes  {ms_br:>8.2f} ms')
+            else:
+                self.stdout.write('  brotli         no instalado')
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+MODULOS = {
+    'wsgi': 'config.wsgi',
+    'asgi': 'config.asgi',
+}
+
+# Importa las URLs (y con ellas las vistas y serializers) como en la primera peticion
+CALENTAR_URLS = 'from django.urls import get_resolver; get_resolver().url_patterns'
+
+
+class Command(BaseCommand):
+    help = 'Reporta el tiempo de importacion por modulo al arrancar config.wsgi o config.asgi'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modulo', choices=sorted(MODULOS), default='wsgi')
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument('--orden', choices=['acumulado', 'propio'], default='acumulado')
+        parser.add_argument(
+            '--sin-urls', action='store_true',
+            help='No importar el URLconf; mide solo el arranque de la aplicacion',
+        )
+
+    def handle(self, *args, **options):
+        codigo = f"import {MODULOS[options['modulo']]}"
+        if not options['sin_urls']:
+            codigo = f'{codigo}; {CALENTAR_URLS}'
+
+        env = os.environ.copy()
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', codigo],
+            capture_output=True, text=True, env=env,
+        )
+        if proceso.returncode != 0:
+            raise CommandError(proceso.stderr.strip().splitlines()[-1] if proceso.stderr else 'Error al importar')
+
+        tiempos = self.parsear(proceso.stderr)
+        if not tiempos:
+            raise CommandError('No se obtuvieron tiempos de importacion')
+
+        clave = 1 if options['orden'] == 'acumulado' else 0
+        total = sum(propio for propio, _ in tiempos.values())
+        self.stdout.write(f"Arranque de {MODULOS[options['modulo']]}: {total / 1000:.1f} ms en {len(tiempos)} modulos")
+        self.stdout.write(f"{'propio ms':>10} {'acumulado ms':>13}  modulo")
+        ordenados = sorted(tiempos.items(), key=lambda item: item[1][clave], reverse=True)
+        for modulo, (propio, acumulado) in ordenados[:options['top']]:
+            self.stdout.write(f'{propio / 1000:>10.1f} {acumulado / 1000:>13.1f}  {modulo}')
+
+        paquetes = {}
+        for modulo, (propio, _) in tiempos.items():
+            raiz = modulo.split('.')[0]
+            paquetes[raiz] = paquetes.get(raiz, 0) + propio
+        self.stdout.write('')
+        self.stdout.write(f"{'total ms':>10}  paquete")
+        for paquete, propio in sorted(paquetes.items(), key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'{propio / 1000:>10.1f}  {paquete}')
+
+    @staticmethod
+    def parsear(salida):
+        tiempos = {}
+        for linea in salida.splitlines():
+            if not linea.startswith('import time:') or 'self [us]' in linea:
+                continue
+            propio, acumulado, modulo = linea[len('import time:'):].split('|', 2)
+            tiempos[modulo.strip()] = (int(propio), int(acumulado))
+        return tiempos
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import imagenes
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas WebP/JPEG de las imagenes pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=20)
+        parser.add_argument('--continuo', action='store_true', help='Seguir esperando imagenes nuevas')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos entre revisiones en modo continuo')
+
+    def handle(self, *args, **options):
+        while True:
+            procesadas = imagenes.procesar_pendientes(options['lote'])
+            if procesadas:
+                self.stdout.write(f'{procesadas} imagenes procesadas')
+            if not options['continuo']:
+                break
+            if procesadas < options['lote']:
+                time.sleep(options['intervalo'])
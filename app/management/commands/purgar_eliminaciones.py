@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import sync
+
+
+class Command(BaseCommand):
+    help = 'Borra las lapidas de sincronizacion mas viejas que SYNC_RETENCION_DIAS'
+
+    def handle(self, *args, **options):
+        borradas = sync.purgar_eliminaciones()
+        self.stdout.write(self.style.SUCCESS(f'{borradas} lapidas eliminadas'))
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from app import agenda
+from app.models import AgendaDiaria, Empleado
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la agenda diaria de todos los empleados para el horizonte configurado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help='Dias hacia adelante (AGENDA_HORIZONTE_DIAS)')
+        parser.add_argument('--desde', default=None, help='Fecha inicial AAAA-MM-DD (hoy por defecto)')
+        parser.add_argument('--lote', type=int, default=200, help='Empleados por transaccion')
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options['desde']) if options['desde'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--desde debe tener el formato AAAA-MM-DD')
+        dias = options['dias'] if options['dias'] is not None else agenda.horizonte_dias()
+        fechas = agenda.horizonte(desde)[:dias + 1]
+
+        borradas, _ = AgendaDiaria.objects.filter(fecha__lt=desde).delete()
+        empleado_ids = list(Empleado.objects.order_by('pk').values_list('pk', flat=True))
+        total = 0
+        for i in range(0, len(empleado_ids), options['lote']):
+            with transaction.atomic():
+                total += agenda.reconstruir(fechas, empleado_ids=empleado_ids[i:i + options['lote']])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} agendas recalculadas ({len(empleado_ids)} empleados, {len(fechas)} dias); '
+            f'{borradas} agendas pasadas eliminadas'
+        ))
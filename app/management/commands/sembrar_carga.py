@@ -0,0 +1,107 @@
+import random
+from datetime import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import busqueda, geo
+from app.models import Disponibilidad, Empleado, EmpleadoServicio, Sede, Servicio, Usuario
+
+DOMINIO = 'carga.local'
+PREFIJO = 'Carga'
+CIUDADES = {
+    'Bogota': (4.65, -74.08),
+    'Medellin': (6.24, -75.58),
+    'Cali': (3.44, -76.52),
+}
+DIAS_LABORALES = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado']
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea sedes, servicios, empleados con horario, clientes y administradores para las '
+        'pruebas de carga de loadtests/escenario.py'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sedes', type=int, default=10)
+        parser.add_argument('--empleados-por-sede', type=int, default=5)
+        parser.add_argument('--servicios', type=int, default=8)
+        parser.add_argument('--clientes', type=int, default=200)
+        parser.add_argument('--admins', type=int, default=2)
+        parser.add_argument('--password', default='carga12345', help='Contraseña de todas las cuentas creadas')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--limpiar', action='store_true', help='Borra antes los datos de una siembra anterior')
+
+    def handle(self, *args, **options):
+        if options['limpiar']:
+            self.limpiar()
+        elif Usuario.objects.filter(email__endswith=f'@{DOMINIO}').exists():
+            raise CommandError(f'Ya hay datos de carga (@{DOMINIO}); use --limpiar para recrearlos')
+
+        azar = random.Random(options['semilla'])
+        with transaction.atomic():
+            servicios = Servicio.objects.bulk_create([
+                Servicio(
+                    nombre=f'{PREFIJO} servicio {n}', descripcion=f'Servicio de prueba {n}',
+                    precio=azar.choice([15000, 20000, 35000, 50000]), duracion_minutos=azar.choice([30, 45, 60]),
+                )
+                for n in range(1, options['servicios'] + 1)
+            ])
+
+            sedes = []
+            for n in range(1, options['sedes'] + 1):
+                ciudad = azar.choice(sorted(CIUDADES))
+                latitud, longitud = (c + azar.uniform(-0.05, 0.05) for c in CIUDADES[ciudad])
+                # bulk_create no pasa por Sede.save, asi que el geohash se calcula aqui
+                sedes.append(Sede(
+                    direccion=f'{PREFIJO} sede {n}', ciudad=ciudad,
+                    latitud=latitud, longitud=longitud, geohash=geo.codificar(latitud, longitud),
+                ))
+            sedes = Sede.objects.bulk_create(sedes)
+
+            empleados = Empleado.objects.bulk_create([
+                Empleado(nombre=f'{PREFIJO} empleado {sede.pk}-{n}', url_foto='https://example.com/empleado.jpg', sede=sede)
+                for sede in sedes
+                for n in range(1, options['empleados_por_sede'] + 1)
+            ])
+            EmpleadoServicio.objects.bulk_create([
+                EmpleadoServicio(empleado=empleado, servicio=servicio)
+                for empleado in empleados
+                for servicio in azar.sample(servicios, min(3, len(servicios)))
+            ])
+            Disponibilidad.objects.bulk_create([
+                Disponibilidad(
+                    empleado=empleado, dia=dia, dia_semana=Disponibilidad.numero_dia(dia),
+                    hora_inicio=time(8), hora_fin=time(18),
+                )
+                for empleado in empleados
+                for dia in DIAS_LABORALES
+            ], batch_size=500)
+
+            # Un solo hash para todas las cuentas: calcular miles de PBKDF2 tomaria minutos
+            password = make_password(options['password'])
+            Usuario.objects.bulk_create([
+                Usuario(email=f'admin{n}@{DOMINIO}', nombre=f'Admin {n}', rol='admin', password=password)
+                for n in range(options['admins'])
+            ] + [
+                Usuario(email=f'cliente{n}@{DOMINIO}', nombre=f'Cliente {n}', rol='cliente', password=password)
+                for n in range(options['clientes'])
+            ], batch_size=500)
+
+        # bulk_create tampoco dispara las señales: agenda e indice de busqueda a mano
+        call_command('reconstruir_agenda', stdout=self.stdout)
+        busqueda.invalidar()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(sedes)} sedes, {len(servicios)} servicios, {len(empleados)} empleados, "
+            f"{options['clientes']} clientes (cliente0@{DOMINIO}...) y {options['admins']} admins "
+            f"(admin0@{DOMINIO}...) con contraseña {options['password']!r}"
+        ))
+
+    def limpiar(self):
+        with transaction.atomic():
+            Usuario.objects.filter(email__endswith=f'@{DOMINIO}').delete()
+            Sede.objects.filter(direccion__startswith=f'{PREFIJO} sede ').delete()
+            Servicio.objects.filter(nombre__startswith=f'{PREFIJO} servicio ').delete()
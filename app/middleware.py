@@ -0,0 +1,97 @@
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_codificacion_re = _lazy_re_compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def codificaciones_aceptadas(cabecera):
+    # {"gzip": 1.0, "br": 0.5, ...} a partir de Accept-Encoding
+    aceptadas = {}
+    for parte in cabecera.split(','):
+        coincidencia = _codificacion_re.match(parte)
+        if not coincidencia:
+            continue
+        try:
+            calidad = float(coincidencia[2]) if coincidencia[2] is not None else 1.0
+        except ValueError:
+            continue
+        aceptadas[coincidencia[1].lower()] = calidad
+    return aceptadas
+
+
+def elegir_codificacion(cabecera):
+    aceptadas = codificaciones_aceptadas(cabecera)
+    disponibles = ['br', 'gzip'] if brotli is not None else ['gzip']
+    candidatas = [
+        (aceptadas.get(codificacion, aceptadas.get('*', 0)), -orden, codificacion)
+        for orden, codificacion in enumerate(disponibles)
+    ]
+    calidad, _, codificacion = max(candidatas)
+    return codificacion if calidad > 0 else None
+
+
+def comprimir(contenido, codificacion):
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=getattr(settings, 'COMPRESION_BROTLI_CALIDAD', 5))
+    # Bytes aleatorios en la cabecera gzip, como GZipMiddleware, contra BREACH
+    return compress_string(contenido, max_random_bytes=100)
+
+
+def refleja_entrada_con_credenciales(request):
+    # BREACH: quien ve el tamaño de las respuestas cifradas y puede meter texto
+    # suyo en ellas (query string, cuerpo) adivina los secretos que las
+    # acompañan byte a byte. Con credenciales de por medio esas respuestas no se
+    # comprimen; el relleno de gzip solo lo dificulta y brotli no tiene donde
+    # ponerlo
+    credenciales = 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES
+    entrada = bool(request.META.get('QUERY_STRING')) or request.method not in ('GET', 'HEAD', 'OPTIONS')
+    return credenciales and entrada
+
+
+class CompresionMiddleware(MiddlewareMixin):
+    """
+    Comprime con brotli (si esta instalado) o gzip segun Accept-Encoding las
+    respuestas de al menos COMPRESION_TAMANO_MINIMO bytes. Las respuestas
+    pequeñas se mandan tal cual: comprimirlas cuesta mas de lo que ahorra.
+    Tampoco se comprimen las respuestas a peticiones autenticadas que traen
+    entrada del cliente (ver ``refleja_entrada_con_credenciales``).
+    """
+
+    tipos = re.compile(r'^(application/(json|javascript|xml)|text/)')
+
+    def process_response(self, request, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < getattr(settings, 'COMPRESION_TAMANO_MINIMO', 1024)
+            or not self.tipos.match(response.get('Content-Type', ''))
+            or refleja_entrada_con_credenciales(request)
+        ):
+            return response
+        codificacion = elegir_codificacion(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacion is None:
+            return response
+
+        comprimido = comprimir(response.content, codificacion)
+        if len(comprimido) >= len(response.content):
+            return response
+
+        response.content = comprimido
+        response['Content-Length'] = str(len(comprimido))
+        response['Content-Encoding'] = codificacion
+        # El ETag fuerte describe los bytes sin comprimir
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
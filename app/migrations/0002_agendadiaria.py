@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgendaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('slots', models.BinaryField()),
+                ('actualizada', models.DateTimeField(auto_now=True)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.empleado')),
+            ],
+            options={
+                'unique_together': {('empleado', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:35
+
+import unicodedata
+
+from django.db import migrations, models
+
+DIAS = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+
+def numero_dia(dia):
+    normalizado = unicodedata.normalize('NFKD', (dia or '').strip().lower())
+    normalizado = ''.join(c for c in normalizado if not unicodedata.combining(c))
+    return DIAS.index(normalizado) + 1 if normalizado in DIAS else None
+
+
+def poblar_dia_semana(apps, schema_editor):
+    Disponibilidad = apps.get_model('app', 'Disponibilidad')
+    textos = Disponibilidad.objects.values_list('dia', flat=True).distinct()
+    for dia in list(textos):
+        numero = numero_dia(dia)
+        if numero is not None:
+            Disponibilidad.objects.filter(dia=dia).update(dia_semana=numero)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_agendadiaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disponibilidad',
+            name='dia_semana',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'lunes'), (2, 'martes'), (3, 'miércoles'), (4, 'jueves'), (5, 'viernes'), (6, 'sábado'), (7, 'domingo')], editable=False, null=True),
+        ),
+        migrations.RunPython(poblar_dia_semana, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='disponibilidad',
+            index=models.Index(fields=['empleado', 'dia_semana'], name='disponibilidad_emp_dia_idx'),
+        ),
+    ]
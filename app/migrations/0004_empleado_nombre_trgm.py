@@ -0,0 +1,16 @@
+from django.db import migrations
+
+# Creaba la extension pg_trgm y un indice trigram sobre Empleado.nombre, pero
+# la busqueda por nombre usa el indice en memoria de app.busqueda y ninguna
+# consulta lo aprovechaba. Se deja vacia para que las bases nuevas no
+# necesiten permisos de CREATE EXTENSION; la 0014 borra el indice donde ya se
+# habia creado.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_disponibilidad_dia_semana'),
+    ]
+
+    operations = []
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+def crear_indice_ciudad(apps, schema_editor):
+    # ciudad__istartswith se traduce a UPPER(ciudad) LIKE 'X%' en PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS sede_ciudad_prefijo_idx ON app_sede (UPPER(ciudad) text_pattern_ops)'
+    )
+
+
+def borrar_indice_ciudad(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS sede_ciudad_prefijo_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_empleado_nombre_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sede',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='sede',
+            name='latitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sede',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(crear_indice_ciudad, borrar_indice_ciudad),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_sede_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Imagen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.ImageField(height_field='alto', upload_to='imagenes/originales/%Y/%m/', width_field='ancho')),
+                ('ancho', models.PositiveIntegerField(blank=True, null=True)),
+                ('alto', models.PositiveIntegerField(blank=True, null=True)),
+                ('variantes', models.JSONField(blank=True, default=list)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('lista', 'Lista'), ('error', 'Error')], db_index=True, default='pendiente', max_length=10)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='imagen',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.imagen'),
+        ),
+        migrations.AddField(
+            model_name='publicacion',
+            name='imagen',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.imagen'),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='imagen',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.imagen'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_imagen'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['-fecha', '-id'], name='publicacion_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_publicacion_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cita',
+            name='actualizada',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='disponibilidad',
+            name='actualizada',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='actualizada',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('cita', 'Cita'), ('notificacion', 'Notificación'), ('disponibilidad', 'Disponibilidad')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('eliminada', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['modelo', 'eliminada'], name='eliminacion_modelo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['fecha_inicio'], name='cita_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['estado', 'fecha_inicio'], name='cita_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['empleado', 'fecha_inicio'], name='cita_empleado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['sede', 'fecha_inicio'], name='cita_sede_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['sede', 'estado', 'fecha_inicio'], name='cita_sede_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['usuario', 'fecha_inicio'], name='cita_usuario_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_cita_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CitaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_inicio', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('por aprobar', 'Por aprobar'), ('aprobada', 'Aprobada'), ('rechazada', 'Rechazada'), ('por cancelar', 'Por cancelar'), ('cancelada', 'Cancelada'), ('concluida', 'Concluida')], max_length=20)),
+                ('rating', models.PositiveSmallIntegerField(null=True)),
+                ('comentario', models.TextField(blank=True)),
+                ('archivada', models.DateTimeField(auto_now_add=True)),
+                ('empleado', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app.empleado')),
+                ('sede', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app.sede')),
+                ('servicio', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app.servicio')),
+                ('usuario', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BloqueoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_inicio', models.DateTimeField()),
+                ('fecha_fin', models.DateTimeField()),
+                ('empleado', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app.empleado')),
+                ('cita', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bloqueos', to='app.citaarchivada')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(max_length=50)),
+                ('mensaje', models.TextField()),
+                ('fecha', models.DateTimeField(db_index=True)),
+                ('leida', models.BooleanField(default=True)),
+                ('archivada', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='citaarchivada',
+            index=models.Index(fields=['fecha_inicio'], name='cita_archivada_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citaarchivada',
+            index=models.Index(fields=['sede', 'fecha_inicio'], name='cita_archivada_sede_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citaarchivada',
+            index=models.Index(fields=['usuario', 'fecha_inicio'], name='cita_archivada_usuario_idx'),
+        ),
+    ]
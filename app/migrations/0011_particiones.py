@@ -0,0 +1,148 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:58
+
+from datetime import date, datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Solo en PostgreSQL: reconstruye app_cita y app_bloqueo como tablas
+# particionadas por mes sobre fecha_inicio (ver app.particiones). Copia las
+# filas existentes, asi que en tablas grandes conviene correrla en una ventana
+# de mantenimiento. En otros motores solo cambia las llaves foraneas.
+#
+# El SQL esta copiado aqui a proposito: la migracion no debe cambiar si
+# app.particiones cambia despues. Los indices salen del modelo historico.
+
+TABLAS = {
+    'app_cita': 'fecha_inicio',
+    'app_bloqueo': 'fecha_inicio',
+}
+
+
+def sumar_meses(mes, meses):
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def limite(mes):
+    return timezone.make_aware(datetime(mes.year, mes.month, 1)).isoformat()
+
+
+def crear_particion(ejecutar, tabla, columna, mes):
+    particion = f'{tabla}_p{mes:%Y_%m}'
+    desde, hasta = limite(mes), limite(sumar_meses(mes, 1))
+    ejecutar(f'CREATE TABLE {particion} (LIKE {tabla} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    ejecutar(f"ALTER TABLE {tabla} ATTACH PARTITION {particion} FOR VALUES FROM ('{desde}') TO ('{hasta}')")
+
+
+def sentencias_indices(model):
+    tabla = model._meta.db_table
+    sentencias = []
+    for field in model._meta.local_concrete_fields:
+        if field.db_index and not field.primary_key:
+            sentencias.append(f'CREATE INDEX {tabla}_{field.column}_idx ON {tabla} ({field.column})')
+    for index in model._meta.indexes:
+        columnas = ', '.join(model._meta.get_field(nombre).column for nombre in index.fields)
+        sentencias.append(f'CREATE INDEX {index.name} ON {tabla} ({columnas})')
+    return sentencias
+
+
+def copiar_tabla(schema_editor, model, particionada):
+    tabla = model._meta.db_table
+    columna = TABLAS[tabla]
+    pk = model._meta.pk.column
+    antigua = f'{tabla}_antigua'
+    ejecutar = schema_editor.execute
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [tabla]
+        )
+        llave = cursor.fetchone()[0]
+        cursor.execute(f'SELECT MIN({columna}) FROM {tabla}')
+        minimo = cursor.fetchone()[0]
+
+    ejecutar(f'ALTER TABLE {tabla} RENAME TO {antigua}')
+    # Libera el nombre para que la llave nueva quede como {tabla}_pkey
+    ejecutar(f'ALTER TABLE {antigua} RENAME CONSTRAINT {llave} TO {antigua}_pkey')
+    if particionada:
+        ejecutar(
+            f'CREATE TABLE {tabla} (LIKE {antigua} INCLUDING CONSTRAINTS) PARTITION BY RANGE ({columna})'
+        )
+        ejecutar(f'ALTER TABLE {tabla} ADD CONSTRAINT {tabla}_pkey PRIMARY KEY ({pk}, {columna})')
+        ejecutar(f'CREATE TABLE {tabla}_default PARTITION OF {tabla} DEFAULT')
+        # Las particiones se crean vacias, antes de copiar, para no mover filas dos veces
+        desde = timezone.localdate(minimo) if minimo else timezone.localdate()
+        hasta = sumar_meses(timezone.localdate(), getattr(settings, 'PARTICIONES_MESES_ADELANTE', 3))
+        mes = date(desde.year, desde.month, 1)
+        while mes <= hasta:
+            crear_particion(ejecutar, tabla, columna, mes)
+            mes = sumar_meses(mes, 1)
+    else:
+        ejecutar(f'CREATE TABLE {tabla} (LIKE {antigua} INCLUDING CONSTRAINTS)')
+        ejecutar(f'ALTER TABLE {tabla} ADD CONSTRAINT {tabla}_pkey PRIMARY KEY ({pk})')
+    ejecutar(f'INSERT INTO {tabla} SELECT * FROM {antigua}')
+    # CASCADE borra la secuencia de la columna, los indices viejos y, de ida
+    # hacia atras, las particiones
+    ejecutar(f'DROP TABLE {antigua} CASCADE')
+
+    secuencia = f'{tabla}_{pk}_seq'
+    ejecutar(f'CREATE SEQUENCE {secuencia} OWNED BY {tabla}.{pk}')
+    ejecutar(f"ALTER TABLE {tabla} ALTER COLUMN {pk} SET DEFAULT nextval('{secuencia}')")
+    ejecutar(f"SELECT setval('{secuencia}', COALESCE((SELECT MAX({pk}) FROM {tabla}), 0) + 1, false)")
+
+    for sql in sentencias_indices(model):
+        ejecutar(sql)
+    for field in model._meta.local_concrete_fields:
+        if field.remote_field and field.db_constraint:
+            destino = field.target_field.model._meta.db_table
+            ejecutar(
+                f'ALTER TABLE {tabla} ADD CONSTRAINT {tabla}_{field.column}_fk '
+                f'FOREIGN KEY ({field.column}) REFERENCES {destino} ({field.target_field.column}) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre in ('Cita', 'Bloqueo'):
+        copiar_tabla(schema_editor, apps.get_model('app', nombre), particionada=True)
+
+
+def desparticionar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre in ('Cita', 'Bloqueo'):
+        copiar_tabla(schema_editor, apps.get_model('app', nombre), particionada=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_archivo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bloqueo',
+            name='cita',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='app.cita'),
+        ),
+        migrations.AlterField(
+            model_name='feedback',
+            name='cita',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='app.cita'),
+        ),
+        migrations.AddIndex(
+            model_name='bloqueo',
+            index=models.Index(fields=['fecha_inicio'], name='bloqueo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloqueo',
+            index=models.Index(fields=['empleado', 'fecha_inicio'], name='bloqueo_empleado_fecha_idx'),
+        ),
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -0,0 +1,25 @@
+from django.core.management import call_command
+from django.db import migrations
+
+# Tabla del cache "compartida" cuando no hay Redis (ver CACHES en settings)
+TABLA = 'app_cache_compartida'
+
+
+def crear_tabla(apps, schema_editor):
+    # createcachetable no hace nada si la tabla ya existe
+    call_command('createcachetable', TABLA, database=schema_editor.connection.alias, verbosity=0)
+
+
+def borrar_tabla(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {schema_editor.quote_name(TABLA)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_particiones'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tabla, borrar_tabla),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_cache_compartida'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaStore',
+            fields=[
+                ('clave', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('valor', models.BinaryField()),
+                ('vence', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
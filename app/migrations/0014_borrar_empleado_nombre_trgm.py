@@ -0,0 +1,22 @@
+from django.db import migrations
+
+# El indice trigram de la 0004 no lo usa ninguna consulta (la busqueda por
+# nombre es en memoria, app.busqueda). La extension pg_trgm se deja: borrarla
+# pide los mismos permisos que crearla.
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS empleado_nombre_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_entradastore'),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_borrar_empleado_nombre_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagen',
+            name='usuario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
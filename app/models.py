@@ -1,5 +1,8 @@
+import unicodedata
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from .geo import codificar
 
 class UserManager(BaseUserManager):
     def create_user(self, email, nombre, password=None, rol='cliente', **extra_fields):
@@ -28,6 +31,27 @@ class UserManager(BaseUserManager):
             
         return self.create_user(email, nombre, password, **extra_fields)
 
+class Imagen(models.Model):
+    # Original subida por el cliente; las miniaturas las genera app.imagenes
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('lista', 'Lista'),
+        ('error', 'Error'),
+    ]
+
+    original = models.ImageField(upload_to='imagenes/originales/%Y/%m/', width_field='ancho', height_field='alto')
+    ancho = models.PositiveIntegerField(null=True, blank=True)
+    alto = models.PositiveIntegerField(null=True, blank=True)
+    variantes = models.JSONField(default=list, blank=True)  # [{"ruta", "ancho", "alto", "formato"}]
+    estado = models.CharField(max_length=10, choices=ESTADOS, default='pendiente', db_index=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    # Quien la subio; solo ese usuario (o un admin) puede verla o adjuntarla
+    usuario = models.ForeignKey('Usuario', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    def __str__(self):
+        return self.original.name
+
+
 class Usuario(AbstractBaseUser, PermissionsMixin):
     ROLES = (
         ('admin', 'Administrador'),
@@ -38,6 +62,7 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     nombre = models.CharField(max_length=255)
     telefono = models.CharField(max_length=20, blank=True)
     url_foto = models.URLField(blank=True)
+    imagen = models.ForeignKey(Imagen, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
     rol = models.CharField(max_length=10, choices=ROLES, default='cliente')
 
     is_active = models.BooleanField(default=True)
@@ -81,6 +106,19 @@ class Servicio(models.Model):
 class Sede(models.Model):
     direccion = models.CharField(max_length=255)
     ciudad = models.CharField(max_length=100)
+    latitud = models.FloatField(null=True, blank=True)
+    longitud = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if self.latitud is not None and self.longitud is not None:
+            self.geohash = codificar(self.latitud, self.longitud)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitud', 'longitud'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.direccion}, {self.ciudad}"
@@ -89,6 +127,7 @@ class Sede(models.Model):
 class Empleado(models.Model):
     nombre = models.CharField(max_length=255)
     url_foto = models.URLField()
+    imagen = models.ForeignKey(Imagen, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
     sede = models.ForeignKey(Sede, on_delete=models.CASCADE)
 
     def __str__(self):
@@ -119,16 +158,63 @@ class Cita(models.Model):
     servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE)
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     sede = models.ForeignKey(Sede, on_delete=models.CASCADE)
+    actualizada = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Cada combinacion de filtros de CitaViewSet debe tener su indice (app.filters)
+        indexes = [
+            models.Index(fields=['fecha_inicio'], name='cita_fecha_idx'),
+            models.Index(fields=['estado', 'fecha_inicio'], name='cita_estado_fecha_idx'),
+            models.Index(fields=['empleado', 'fecha_inicio'], name='cita_empleado_fecha_idx'),
+            models.Index(fields=['sede', 'fecha_inicio'], name='cita_sede_fecha_idx'),
+            models.Index(fields=['sede', 'estado', 'fecha_inicio'], name='cita_sede_estado_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha_inicio'], name='cita_usuario_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.fecha_inicio} - {self.estado}"
 
 
 class Disponibilidad(models.Model):
+    # Numeracion ISO, igual que el lookup __iso_week_day de Django
+    DIAS = [
+        (1, 'lunes'),
+        (2, 'martes'),
+        (3, 'miércoles'),
+        (4, 'jueves'),
+        (5, 'viernes'),
+        (6, 'sábado'),
+        (7, 'domingo'),
+    ]
+
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     dia = models.CharField(max_length=15)  # ej: "lunes"
+    dia_semana = models.PositiveSmallIntegerField(choices=DIAS, null=True, editable=False)
     hora_inicio = models.TimeField()
     hora_fin = models.TimeField()
+    actualizada = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['empleado', 'dia_semana'], name='disponibilidad_emp_dia_idx'),
+        ]
+
+    @classmethod
+    def numero_dia(cls, dia):
+        # "Miércoles", "miercoles" -> 3; None si el texto no es un dia de la semana
+        normalizado = unicodedata.normalize('NFKD', (dia or '').strip().lower())
+        normalizado = ''.join(c for c in normalizado if not unicodedata.combining(c))
+        for numero, nombre in cls.DIAS:
+            if unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode() == normalizado:
+                return numero
+        return None
+
+    def save(self, *args, **kwargs):
+        self.dia_semana = self.numero_dia(self.dia)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'dia' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'dia_semana'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.empleado} - {self.dia}"
@@ -136,15 +222,28 @@ class Disponibilidad(models.Model):
 
 class Bloqueo(models.Model):
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
-    cita = models.ForeignKey(Cita, on_delete=models.CASCADE)
+    # Sin constraint: en PostgreSQL la tabla de citas esta particionada (app.particiones)
+    cita = models.ForeignKey(Cita, on_delete=models.CASCADE, db_constraint=False)
     fecha_inicio = models.DateTimeField()
     fecha_fin = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_inicio'], name='bloqueo_fecha_idx'),
+            models.Index(fields=['empleado', 'fecha_inicio'], name='bloqueo_empleado_fecha_idx'),
+        ]
+
 
 class Publicacion(models.Model):
     url_imagen = models.URLField()
+    imagen = models.ForeignKey(Imagen, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
     fecha = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-fecha', '-id'], name='publicacion_fecha_idx'),
+        ]
+
 
 class Notificacion(models.Model):
     TIPO_ADMIN = [
@@ -163,15 +262,116 @@ class Notificacion(models.Model):
     fecha = models.DateTimeField()
     leida = models.BooleanField(default=False)
     usuario = models.ForeignKey(Usuario, null=True, blank=True, on_delete=models.SET_NULL)
+    actualizada = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.mensaje
 
 
+class Eliminacion(models.Model):
+    # Lapida de un registro borrado, para que la sincronizacion incremental
+    # pueda avisar a los clientes; app.sync la crea y la purga
+    MODELOS = [
+        ('cita', 'Cita'),
+        ('notificacion', 'Notificación'),
+        ('disponibilidad', 'Disponibilidad'),
+    ]
+
+    modelo = models.CharField(max_length=20, choices=MODELOS)
+    objeto_id = models.BigIntegerField()
+    # Sin constraint: la lapida de una cita puede crearse mientras se borra su usuario
+    usuario = models.ForeignKey(
+        Usuario, null=True, blank=True, on_delete=models.CASCADE, related_name='+', db_constraint=False
+    )
+    eliminada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modelo', 'eliminada'], name='eliminacion_modelo_idx'),
+        ]
+
+
+class EntradaStore(models.Model):
+    # Entradas de app.stores.TablaStore (IDEMPOTENCIA_STORE). A diferencia de
+    # DatabaseCache no hay tope de filas: una entrada vigente nunca se descarta
+    clave = models.CharField(max_length=255, primary_key=True)
+    valor = models.BinaryField()
+    vence = models.DateTimeField(db_index=True)
+
+
 class Feedback(models.Model):
-    cita = models.OneToOneField(Cita, on_delete=models.CASCADE)
+    cita = models.OneToOneField(Cita, on_delete=models.CASCADE, db_constraint=False)
     rating = models.PositiveSmallIntegerField()
     comentario = models.TextField()
 
     def __str__(self):
-        return f"Feedback Cita {self.cita_id}"
\ No newline at end of file
+        return f"Feedback Cita {self.cita_id}"
+
+class AgendaDiaria(models.Model):
+    # Foto de la disponibilidad de un empleado en una fecha: un bit por cada
+    # franja de 5 minutos (1 = libre). Se mantiene desde app.agenda.
+    MINUTOS_SLOT = 5
+    SLOTS_POR_DIA = 24 * 60 // MINUTOS_SLOT
+
+    empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
+    fecha = models.DateField()
+    slots = models.BinaryField()
+    actualizada = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('empleado', 'fecha')
+
+    def __str__(self):
+        return f"{self.empleado_id} - {self.fecha}"
+
+
+# Historico: app.archivo mueve aqui las citas terminadas, sus bloqueos y las
+# notificaciones leidas mas viejas que el periodo de retencion. Se conservan
+# los ids originales; las relaciones no tienen constraint para que borrar un
+# usuario, empleado o sede no obligue a reescribir el historico.
+
+class CitaArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    fecha_inicio = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=Cita.ESTADOS)
+    usuario = models.ForeignKey(Usuario, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    servicio = models.ForeignKey(Servicio, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    empleado = models.ForeignKey(Empleado, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    sede = models.ForeignKey(Sede, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    # El Feedback de la cita se guarda en la misma fila
+    rating = models.PositiveSmallIntegerField(null=True)
+    comentario = models.TextField(blank=True)
+    archivada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_inicio'], name='cita_archivada_fecha_idx'),
+            models.Index(fields=['sede', 'fecha_inicio'], name='cita_archivada_sede_idx'),
+            models.Index(fields=['usuario', 'fecha_inicio'], name='cita_archivada_usuario_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha_inicio} - {self.estado}"
+
+
+class BloqueoArchivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    empleado = models.ForeignKey(Empleado, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    cita = models.ForeignKey(CitaArchivada, on_delete=models.CASCADE, related_name='bloqueos')
+    fecha_inicio = models.DateTimeField()
+    fecha_fin = models.DateTimeField()
+
+
+class NotificacionArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    tipo = models.CharField(max_length=50)
+    mensaje = models.TextField()
+    fecha = models.DateTimeField(db_index=True)
+    leida = models.BooleanField(default=True)
+    usuario = models.ForeignKey(
+        Usuario, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    archivada = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.mensaje
@@ -0,0 +1,93 @@
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+# En PostgreSQL las tablas de Cita y Bloqueo estan particionadas por rango
+# mensual sobre fecha_inicio (migracion 0011). Los limites de cada particion
+# son el primer dia del mes en la zona horaria del proyecto, asi que una
+# consulta por dia o por semana toca una o dos particiones. Las filas que no
+# caen en ninguna particion van a la particion DEFAULT; `crear_particiones`
+# las mueve cuando crea la particion de su mes.
+#
+# La llave primaria pasa a ser (id, fecha_inicio), como exige PostgreSQL, y
+# por eso las llaves foraneas hacia Cita no tienen constraint en la base.
+
+TABLAS = {
+    'app_cita': 'fecha_inicio',
+    'app_bloqueo': 'fecha_inicio',
+}
+
+
+def meses_adelante():
+    return getattr(settings, 'PARTICIONES_MESES_ADELANTE', 3)
+
+
+def disponible(conexion=None):
+    return (conexion or connection).vendor == 'postgresql'
+
+
+def sumar_meses(mes, meses):
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def meses_entre(desde, hasta):
+    mes = date(desde.year, desde.month, 1)
+    while mes <= hasta:
+        yield mes
+        mes = sumar_meses(mes, 1)
+
+
+def nombre_particion(tabla, mes):
+    return f'{tabla}_p{mes:%Y_%m}'
+
+
+def limite(mes):
+    return timezone.make_aware(datetime(mes.year, mes.month, 1)).isoformat()
+
+
+def sentencias_particion(tabla, columna, mes):
+    """
+    SQL para crear la particion de ``mes`` sin perder filas que ya esten en la
+    particion DEFAULT: se crea suelta, recibe esas filas y luego se adjunta.
+    """
+    particion = nombre_particion(tabla, mes)
+    desde, hasta = limite(mes), limite(sumar_meses(mes, 1))
+    rango = f"{columna} >= '{desde}' AND {columna} < '{hasta}'"
+    return [
+        f'CREATE TABLE {particion} (LIKE {tabla} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        f'WITH movidas AS (DELETE FROM {tabla}_default WHERE {rango} RETURNING *) '
+        f'INSERT INTO {particion} SELECT * FROM movidas',
+        f"ALTER TABLE {tabla} ATTACH PARTITION {particion} FOR VALUES FROM ('{desde}') TO ('{hasta}')",
+    ]
+
+
+def particiones(tabla, cursor):
+    cursor.execute(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE parent.relname = %s',
+        [tabla],
+    )
+    return {fila[0] for fila in cursor.fetchall()}
+
+
+def crear(desde=None, meses=None, conexion=None):
+    """Crea las particiones que falten desde el mes de ``desde``; devuelve sus nombres."""
+    conexion = conexion or connection
+    desde = desde or timezone.localdate()
+    hasta = sumar_meses(desde, meses_adelante() if meses is None else meses)
+    creadas = []
+    for tabla, columna in TABLAS.items():
+        for mes in meses_entre(desde, hasta):
+            with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+                if nombre_particion(tabla, mes) in particiones(tabla, cursor):
+                    continue
+                for sql in sentencias_particion(tabla, columna, mes):
+                    cursor.execute(sql)
+            creadas.append(nombre_particion(tabla, mes))
+    return creadas
+
@@ -0,0 +1,32 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - sin orjson se usa el renderer de DRF
+    orjson = None
+
+# Fechas, horas, decimales y timedelta pasan por el encoder de DRF para que la
+# salida sea identica a la de JSONRenderer (milisegundos, "Z", decimales como
+# float); orjson solo se encarga de recorrer la estructura y escribir los bytes.
+# Unica diferencia: NaN e infinitos salen como null, donde JSONRenderer lanza
+# ValueError.
+OPCIONES = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_encoder = JSONEncoder()
+
+
+class OrjsonRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Con indentacion (API navegable, ?indent=) o sin orjson, el renderer de DRF
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            contenido = orjson.dumps(data, default=_encoder.default, option=OPCIONES)
+        except orjson.JSONEncodeError:
+            # Enteros de mas de 64 bits y tipos que orjson no acepta
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que DRF: U+2028 y U+2029 escapados para poder incrustar el JSON en JS
+        return contenido.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -1,18 +1,77 @@
 from rest_framework import serializers
 from .models import (
     Usuario, Servicio, Sede, Empleado, EmpleadoServicio,
-    Cita, Disponibilidad, Bloqueo, Publicacion, Notificacion, Feedback
+    Cita, Disponibilidad, Bloqueo, Publicacion, Notificacion, Feedback, Imagen
 )
+from . import imagenes
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+class ImagenSerializer(serializers.ModelSerializer):
+    archivo = serializers.ImageField(source='original', write_only=True)
+    url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Imagen
+        fields = ['id', 'archivo', 'url', 'ancho', 'alto', 'estado', 'srcset']
+        read_only_fields = ['ancho', 'alto', 'estado']
+
+    def url_absoluta(self, ruta):
+        url = default_storage.url(ruta)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_url(self, obj):
+        return self.url_absoluta(obj.original.name)
+
+    def get_srcset(self, obj):
+        return imagenes.srcset(obj, url=self.url_absoluta)
+
+    def validate_archivo(self, value):
+        maximo = getattr(settings, 'IMAGENES_TAMANO_MAXIMO', 10 * 1024 * 1024)
+        if value.size > maximo:
+            raise serializers.ValidationError(f'La imagen no puede superar {maximo // (1024 * 1024)} MB.')
+        return value
+
+
+def es_admin(user):
+    return user.is_authenticated and (user.is_staff or user.rol == 'admin')
+
+
+class ImagenPropiaField(serializers.PrimaryKeyRelatedField):
+    # Solo deja adjuntar imagenes subidas por quien hace la peticion
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or es_admin(request.user):
+            return queryset
+        if not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(usuario=request.user)
+
+
+def imagen_id_field():
+    return ImagenPropiaField(
+        queryset=Imagen.objects.all(),
+        source='imagen',
+        write_only=True,
+        required=False,
+        allow_null=True
+    )
+
+
 class UsuarioSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
+    imagen = ImagenSerializer(read_only=True)
+    imagen_id = imagen_id_field()
     
     class Meta:
         model = Usuario
-        fields = ['id', 'email', 'nombre', 'telefono', 'url_foto', 'rol', 'password','is_active']
+        fields = ['id', 'email', 'nombre', 'telefono', 'url_foto', 'imagen', 'imagen_id', 'rol', 'password','is_active']
         extra_kwargs = {
             'password': {'write_only': True},
             'is_active': {'read_only': True}
@@ -40,9 +99,15 @@ class SedeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sede
         fields = '__all__'
+        extra_kwargs = {
+            'latitud': {'min_value': -90, 'max_value': 90},
+            'longitud': {'min_value': -180, 'max_value': 180},
+        }
 
 class EmpleadoSerializer(serializers.ModelSerializer):
     sede = SedeSerializer(read_only=True)
+    imagen = ImagenSerializer(read_only=True)
+    imagen_id = imagen_id_field()
     sede_id = serializers.PrimaryKeyRelatedField(
         queryset=Sede.objects.all(), 
         source='sede', 
@@ -73,10 +138,12 @@ class EmpleadoServicioSerializer(serializers.ModelSerializer):
 
 class CitaSerializer(serializers.ModelSerializer):
     usuario = UsuarioSerializer(read_only=True)
+    # Solo lo tienen en cuenta los administradores; para un cliente es el mismo
     usuario_id = serializers.PrimaryKeyRelatedField(
         queryset=Usuario.objects.all(),
         source='usuario',
-        write_only=True
+        write_only=True,
+        required=False
     )
     servicio = ServicioSerializer(read_only=True)
     servicio_id = serializers.PrimaryKeyRelatedField(
@@ -113,6 +180,13 @@ class DisponibilidadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Disponibilidad
         fields = '__all__'
+        read_only_fields = ['dia_semana']
+
+    def validate_dia(self, value):
+        numero = Disponibilidad.numero_dia(value)
+        if numero is None:
+            raise serializers.ValidationError('Debe ser un día de la semana, por ejemplo "lunes".')
+        return dict(Disponibilidad.DIAS)[numero]
 
 class BloqueoSerializer(serializers.ModelSerializer):
     empleado = EmpleadoSerializer(read_only=True)
@@ -133,6 +207,9 @@ class BloqueoSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class PublicacionSerializer(serializers.ModelSerializer):
+    imagen = ImagenSerializer(read_only=True)
+    imagen_id = imagen_id_field()
+
     class Meta:
         model = Publicacion
         fields = '__all__'
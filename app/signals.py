@@ -0,0 +1,190 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import agenda, busqueda, feed, sync
+from .models import (
+    Bloqueo, Cita, Disponibilidad, Empleado, EmpleadoServicio, Imagen, Notificacion, Publicacion, Sede, Servicio,
+)
+
+
+def _fechas_cita(empleado_id, fecha_inicio, duracion):
+    return {(empleado_id, fecha) for fecha in agenda.fechas_entre(fecha_inicio, fecha_inicio + timedelta(minutes=duracion))}
+
+
+def _fechas_bloqueo(empleado_id, fecha_inicio, fecha_fin):
+    return {(empleado_id, fecha) for fecha in agenda.fechas_entre(fecha_inicio, fecha_fin)}
+
+
+def _existentes(empleado_ids):
+    # Si el cambio viene de borrar el empleado o su sede, no hay agenda que recalcular
+    return set(Empleado.objects.filter(pk__in=empleado_ids).values_list('pk', flat=True))
+
+
+def _actualizar(pares):
+    por_empleado = {}
+    for empleado_id, fecha in pares:
+        por_empleado.setdefault(empleado_id, set()).add(fecha)
+
+    def actualizar():
+        existentes = _existentes(por_empleado)
+        for empleado_id, fechas in por_empleado.items():
+            if empleado_id in existentes:
+                agenda.actualizar_fechas(empleado_id, fechas)
+
+    transaction.on_commit(actualizar)
+
+
+@receiver(pre_save, sender=Cita)
+def cita_anterior(sender, instance, raw=False, **kwargs):
+    instance._agenda_anterior = set()
+    if raw or instance.pk is None:
+        return
+    anterior = Cita.objects.filter(pk=instance.pk).values_list(
+        'empleado_id', 'fecha_inicio', 'servicio__duracion_minutos'
+    ).first()
+    if anterior:
+        instance._agenda_anterior = _fechas_cita(*anterior)
+
+
+@receiver(post_save, sender=Cita)
+@receiver(post_delete, sender=Cita)
+def cita_cambiada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pares = _fechas_cita(instance.empleado_id, instance.fecha_inicio, instance.servicio.duracion_minutos)
+    _actualizar(pares | getattr(instance, '_agenda_anterior', set()))
+
+
+@receiver(pre_save, sender=Bloqueo)
+def bloqueo_anterior(sender, instance, raw=False, **kwargs):
+    instance._agenda_anterior = set()
+    if raw or instance.pk is None:
+        return
+    anterior = Bloqueo.objects.filter(pk=instance.pk).values_list('empleado_id', 'fecha_inicio', 'fecha_fin').first()
+    if anterior:
+        instance._agenda_anterior = _fechas_bloqueo(*anterior)
+
+
+@receiver(post_save, sender=Bloqueo)
+@receiver(post_delete, sender=Bloqueo)
+def bloqueo_cambiado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pares = _fechas_bloqueo(instance.empleado_id, instance.fecha_inicio, instance.fecha_fin)
+    _actualizar(pares | getattr(instance, '_agenda_anterior', set()))
+
+
+@receiver(pre_save, sender=Servicio)
+def servicio_anterior(sender, instance, raw=False, **kwargs):
+    instance._duracion_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._duracion_anterior = Servicio.objects.filter(pk=instance.pk).values_list(
+        'duracion_minutos', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Servicio)
+def servicio_cambiado(sender, instance, raw=False, created=False, **kwargs):
+    # Con otra duracion cada cita del servicio ocupa otros slots; se recalculan
+    # las fechas del horizonte que tocan, con la duracion mas larga de las dos
+    anterior = getattr(instance, '_duracion_anterior', None)
+    if raw or created or anterior is None or anterior == instance.duracion_minutos:
+        return
+    hoy = timezone.localdate()
+    citas = Cita.objects.exclude(estado__in=agenda.ESTADOS_LIBRES).filter(
+        servicio=instance,
+        fecha_inicio__gte=agenda.inicio_del_dia(hoy - timedelta(days=1)),
+        fecha_inicio__lt=agenda.inicio_del_dia(hoy + timedelta(days=agenda.horizonte_dias() + 1)),
+    )
+    duracion = max(anterior, instance.duracion_minutos)
+    pares = set()
+    for empleado_id, fecha_inicio in citas.values_list('empleado_id', 'fecha_inicio'):
+        pares |= _fechas_cita(empleado_id, fecha_inicio, duracion)
+    if pares:
+        _actualizar(pares)
+
+
+@receiver(pre_save, sender=Disponibilidad)
+def disponibilidad_anterior(sender, instance, raw=False, **kwargs):
+    instance._agenda_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._agenda_anterior = Disponibilidad.objects.filter(pk=instance.pk).values_list(
+        'empleado_id', 'dia_semana'
+    ).first()
+
+
+@receiver(post_save, sender=Disponibilidad)
+@receiver(post_delete, sender=Disponibilidad)
+def disponibilidad_cambiada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cambios = {(instance.empleado_id, instance.dia_semana)}
+    anterior = getattr(instance, '_agenda_anterior', None)
+    if anterior:
+        cambios.add(anterior)
+
+    def actualizar():
+        existentes = _existentes({empleado_id for empleado_id, _ in cambios})
+        for empleado_id, dia in cambios:
+            if empleado_id in existentes:
+                agenda.actualizar_dia_semana(empleado_id, dia)
+
+    transaction.on_commit(actualizar)
+
+
+@receiver(post_save, sender=Empleado)
+@receiver(post_delete, sender=Empleado)
+@receiver(post_save, sender=EmpleadoServicio)
+@receiver(post_delete, sender=EmpleadoServicio)
+@receiver(post_save, sender=Sede)
+@receiver(post_delete, sender=Sede)
+def indice_busqueda_cambiado(sender, **kwargs):
+    transaction.on_commit(busqueda.invalidar)
+
+
+@receiver(pre_save, sender=Publicacion)
+def publicacion_anterior(sender, instance, raw=False, **kwargs):
+    instance._fecha_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._fecha_anterior = Publicacion.objects.filter(pk=instance.pk).values_list('fecha', flat=True).first()
+
+
+@receiver(post_save, sender=Publicacion)
+@receiver(post_delete, sender=Publicacion)
+def publicacion_cambiada(sender, instance, **kwargs):
+    fechas = {instance.fecha}
+    if getattr(instance, '_fecha_anterior', None):
+        fechas.add(instance._fecha_anterior)
+    transaction.on_commit(lambda: feed.invalidar(fechas))
+
+
+@receiver(post_save, sender=Imagen)
+def imagen_cambiada(sender, instance, created=False, **kwargs):
+    # Cuando se generan las miniaturas cambia el srcset de las publicaciones
+    if created:
+        return
+    fechas = set(Publicacion.objects.filter(imagen=instance).values_list('fecha', flat=True))
+    if fechas:
+        transaction.on_commit(lambda: feed.invalidar(fechas))
+
+
+@receiver(post_delete, sender=Cita)
+def cita_eliminada(sender, instance, **kwargs):
+    sync.registrar_eliminacion('cita', instance.pk, instance.usuario_id)
+
+
+@receiver(post_delete, sender=Notificacion)
+def notificacion_eliminada(sender, instance, **kwargs):
+    sync.registrar_eliminacion('notificacion', instance.pk, instance.usuario_id)
+
+
+@receiver(post_delete, sender=Disponibilidad)
+def disponibilidad_eliminada(sender, instance, **kwargs):
+    sync.registrar_eliminacion('disponibilidad', instance.pk)
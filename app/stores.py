@@ -0,0 +1,238 @@
+import pickle
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Almacenes de contadores con vencimiento para throttling e idempotencia.
+# MemoryStore vive en el proceso: sirve con un solo worker y en las pruebas.
+# Con varios workers hay que compartir los contadores; CacheStore usa una
+# cache de Django, que puede ser RedisCache contra Redis o cualquier servidor
+# compatible (Valkey, KeyDB) levantado en la misma maquina, o DatabaseCache.
+# Idempotency-Key siempre usa un store compartido (IDEMPOTENCIA_STORE): un
+# reintento puede llegar a otro worker. Es TablaStore y no una cache porque
+# las caches descartan entradas vigentes cuando se llenan (MAX_ENTRIES en
+# DatabaseCache, maxmemory en Redis) y una respuesta descartada es una reserva
+# duplicada.
+
+
+class MemoryStore:
+    def __init__(self, barrido_cada=1000, **opciones):
+        self._datos = {}
+        self._lock = threading.Lock()
+        self._barrido_cada = barrido_cada
+        self._escrituras = 0
+
+    def _escribir(self, clave, valor, vence, ahora):
+        # Las claves vencidas se borran al leerlas y, cada tantas escrituras,
+        # en un barrido completo para que las que nadie vuelve a leer no se acumulen
+        self._datos[clave] = (valor, vence)
+        self._escrituras += 1
+        if self._escrituras >= self._barrido_cada:
+            self._escrituras = 0
+            for vencida in [c for c, (_, v) in self._datos.items() if v is not None and v <= ahora]:
+                del self._datos[vencida]
+
+    def _vigente(self, clave, ahora):
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+        valor, vence = entrada
+        if vence is not None and vence <= ahora:
+            del self._datos[clave]
+            return None
+        return entrada
+
+    def get_many(self, claves):
+        ahora = time.monotonic()
+        with self._lock:
+            entradas = {clave: self._vigente(clave, ahora) for clave in claves}
+        return {clave: entrada[0] for clave, entrada in entradas.items() if entrada is not None}
+
+    def get(self, clave, default=None):
+        return self.get_many([clave]).get(clave, default)
+
+    def set(self, clave, valor, ttl):
+        ahora = time.monotonic()
+        with self._lock:
+            self._escribir(clave, valor, ahora + ttl, ahora)
+
+    def add(self, clave, valor, ttl):
+        # Guarda solo si la clave no existe; devuelve si la guardo
+        ahora = time.monotonic()
+        with self._lock:
+            if self._vigente(clave, ahora) is not None:
+                return False
+            self._escribir(clave, valor, ahora + ttl, ahora)
+            return True
+
+    def incr(self, clave, ttl):
+        # El vencimiento se fija con el primer incremento y no se renueva
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._vigente(clave, ahora)
+            valor, vence = entrada if entrada is not None else (0, ahora + ttl)
+            self._escribir(clave, valor + 1, vence, ahora)
+            return valor + 1
+
+    def decr(self, clave):
+        # Deshace un incr; si la clave ya vencio no hay nada que deshacer
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._vigente(clave, ahora)
+            if entrada is not None:
+                self._datos[clave] = (entrada[0] - 1, entrada[1])
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+class CacheStore:
+    def __init__(self, alias='default', **opciones):
+        self.cache = caches[alias]
+
+    def get_many(self, claves):
+        return self.cache.get_many(claves)
+
+    def get(self, clave, default=None):
+        return self.cache.get(clave, default)
+
+    def set(self, clave, valor, ttl):
+        self.cache.set(clave, valor, ttl)
+
+    def add(self, clave, valor, ttl):
+        return self.cache.add(clave, valor, ttl)
+
+    def incr(self, clave, ttl):
+        # add + incr son atomicos en Redis/memcached; si la clave vencio entre
+        # los dos pasos se vuelve a crear
+        if self.cache.add(clave, 1, ttl):
+            return 1
+        try:
+            return self.cache.incr(clave)
+        except ValueError:
+            self.cache.add(clave, 1, ttl)
+            return 1
+
+    def decr(self, clave):
+        try:
+            self.cache.decr(clave)
+        except ValueError:
+            pass
+
+    def delete(self, clave):
+        self.cache.delete(clave)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class TablaStore:
+    """
+    Store en la tabla de EntradaStore, compartido por todos los workers. Solo
+    borra entradas vencidas, en un barrido cada tantas escrituras.
+    """
+
+    def __init__(self, barrido_cada=1000, **opciones):
+        self._barrido_cada = barrido_cada
+        self._escrituras = 0
+        self._lock = threading.Lock()
+
+    @property
+    def entradas(self):
+        from .models import EntradaStore
+        return EntradaStore.objects
+
+    def _escrita(self):
+        with self._lock:
+            self._escrituras += 1
+            barrer = self._escrituras >= self._barrido_cada
+            if barrer:
+                self._escrituras = 0
+        if barrer:
+            self.entradas.filter(vence__lte=timezone.now()).delete()
+
+    def get_many(self, claves):
+        filas = self.entradas.filter(clave__in=claves, vence__gt=timezone.now()).values_list('clave', 'valor')
+        return {clave: pickle.loads(valor) for clave, valor in filas}
+
+    def get(self, clave, default=None):
+        return self.get_many([clave]).get(clave, default)
+
+    def set(self, clave, valor, ttl):
+        self.entradas.update_or_create(
+            clave=clave, defaults={'valor': pickle.dumps(valor), 'vence': timezone.now() + timedelta(seconds=ttl)},
+        )
+        self._escrita()
+
+    def add(self, clave, valor, ttl):
+        # La llave primaria hace atomico el add entre workers; una entrada
+        # vencida se borra antes para que no cuente como existente
+        ahora = timezone.now()
+        self.entradas.filter(clave=clave, vence__lte=ahora).delete()
+        try:
+            with transaction.atomic():
+                self.entradas.create(clave=clave, valor=pickle.dumps(valor), vence=ahora + timedelta(seconds=ttl))
+        except IntegrityError:
+            return False
+        self._escrita()
+        return True
+
+    def _sumar(self, clave, delta):
+        with transaction.atomic():
+            entrada = self.entradas.select_for_update().filter(clave=clave, vence__gt=timezone.now()).first()
+            if entrada is None:
+                return None
+            valor = pickle.loads(entrada.valor) + delta
+            entrada.valor = pickle.dumps(valor)
+            entrada.save(update_fields=['valor'])
+            return valor
+
+    def incr(self, clave, ttl):
+        while True:
+            if self.add(clave, 1, ttl):
+                return 1
+            valor = self._sumar(clave, 1)
+            if valor is not None:
+                return valor
+
+    def decr(self, clave):
+        self._sumar(clave, -1)
+
+    def delete(self, clave):
+        self.entradas.filter(clave=clave).delete()
+
+    def clear(self):
+        self.entradas.all().delete()
+
+
+_stores = {}
+_store_lock = threading.Lock()
+
+
+def get_store(nombre='CONTADORES_STORE'):
+    """Store configurado en el setting ``nombre`` (CONTADORES_STORE o IDEMPOTENCIA_STORE)."""
+    store = _stores.get(nombre)
+    if store is None:
+        with _store_lock:
+            store = _stores.get(nombre)
+            if store is None:
+                configuracion = getattr(settings, nombre, {})
+                clase = import_string(configuracion.get('BACKEND', 'app.stores.MemoryStore'))
+                store = _stores[nombre] = clase(**configuracion.get('OPTIONS', {}))
+    return store
+
+
+def reset_store():
+    with _store_lock:
+        _stores.clear()
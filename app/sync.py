@@ -0,0 +1,106 @@
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Cita, Disponibilidad, Eliminacion, Notificacion
+
+# Campos planos (ids en vez de objetos anidados) que recibe el cliente
+CAMPOS = {
+    'citas': ('id', 'fecha_inicio', 'estado', 'usuario_id', 'servicio_id', 'empleado_id', 'sede_id', 'actualizada'),
+    'notificaciones': ('id', 'tipo', 'mensaje', 'fecha', 'leida', 'usuario_id', 'actualizada'),
+    'disponibilidades': ('id', 'empleado_id', 'dia', 'dia_semana', 'hora_inicio', 'hora_fin', 'actualizada'),
+}
+
+MODELOS = {
+    'citas': (Cita, 'cita'),
+    'notificaciones': (Notificacion, 'notificacion'),
+    'disponibilidades': (Disponibilidad, 'disponibilidad'),
+}
+
+
+def margen():
+    # Una transaccion larga puede confirmar filas con `actualizada` anterior al
+    # token que ya se entrego; el margen las vuelve a incluir en la siguiente
+    # sincronizacion. Los clientes aplican los cambios por id, asi que repetir es seguro.
+    return timedelta(seconds=getattr(settings, 'SYNC_MARGEN_SEGUNDOS', 30))
+
+
+def retencion():
+    return timedelta(days=getattr(settings, 'SYNC_RETENCION_DIAS', 30))
+
+
+def codificar_token(momento):
+    return base64.urlsafe_b64encode(momento.isoformat().encode()).decode().rstrip('=')
+
+
+def decodificar_token(token):
+    try:
+        texto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        momento = datetime.fromisoformat(texto)
+    except (UnicodeDecodeError, binascii.Error) as exc:
+        raise ValueError(token) from exc
+    if timezone.is_naive(momento):
+        raise ValueError(token)
+    return momento
+
+
+def registrar_eliminacion(modelo, objeto_id, usuario_id=None):
+    Eliminacion.objects.create(modelo=modelo, objeto_id=objeto_id, usuario_id=usuario_id)
+
+
+def registrar_eliminaciones(modelo, objetos):
+    # Lapidas de un borrado masivo en un solo INSERT; ``objetos`` son pares (id, usuario_id)
+    Eliminacion.objects.bulk_create([
+        Eliminacion(modelo=modelo, objeto_id=objeto_id, usuario_id=usuario_id) for objeto_id, usuario_id in objetos
+    ])
+
+
+def _querysets(user):
+    es_admin = user.rol == 'admin' or user.is_staff
+    citas = Cita.objects.all()
+    notificaciones = Notificacion.objects.all()
+    if not es_admin:
+        citas = citas.filter(usuario=user)
+        notificaciones = notificaciones.filter(usuario=user)
+    return {
+        'citas': citas,
+        'notificaciones': notificaciones,
+        'disponibilidades': Disponibilidad.objects.all(),
+    }, es_admin
+
+
+def cambios(user, desde=None):
+    """
+    Todo lo que cambio para ``user`` desde ``desde`` (un datetime aware), o la
+    foto completa si ``desde`` es None o es mas viejo que las lapidas guardadas.
+    """
+    ahora = timezone.now()
+    completo = desde is None or desde < ahora - retencion()
+    querysets, es_admin = _querysets(user)
+
+    data = {'completo': completo}
+    for nombre, queryset in querysets.items():
+        if not completo:
+            queryset = queryset.filter(actualizada__gte=desde)
+        data[nombre] = list(queryset.order_by('id').values(*CAMPOS[nombre]))
+
+    eliminados = {nombre: [] for nombre in MODELOS}
+    if not completo:
+        lapidas = Eliminacion.objects.filter(eliminada__gte=desde)
+        if not es_admin:
+            lapidas = lapidas.filter(Q(modelo='disponibilidad') | Q(usuario=user))
+        modelo_a_nombre = {modelo: nombre for nombre, (_, modelo) in MODELOS.items()}
+        for modelo, objeto_id in lapidas.order_by('id').values_list('modelo', 'objeto_id'):
+            eliminados[modelo_a_nombre[modelo]].append(objeto_id)
+    data['eliminados'] = eliminados
+    data['token'] = codificar_token(ahora - margen())
+    return data
+
+
+def purgar_eliminaciones():
+    borradas, _ = Eliminacion.objects.filter(eliminada__lt=timezone.now() - retencion()).delete()
+    return borradas
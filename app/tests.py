@@ -1,14 +1,51 @@
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory
 from rest_framework import status
 from django.urls import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers import base as handlers_base
+from io import BytesIO, StringIO
+from PIL import Image
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import tempfile
 from django.contrib.auth import get_user_model
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from django.utils import timezone as dj_timezone
+import time
 import jwt
 from django.conf import settings
+from django.core.cache import cache, caches
+from config import settings_api
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipIf, skipUnless
+
+from . import agenda, archivo, busqueda, feed, geo, imagenes, sync, views
+from .stores import CacheStore, MemoryStore, TablaStore, get_store, reset_store
+from rest_framework.renderers import JSONRenderer
+from .renderers import OrjsonRenderer
+from .throttling import LoginEmailThrottle, LoginIPThrottle
+from .serializers import DisponibilidadSerializer, PublicacionSerializer, UsuarioSerializer
+from .models import (
+    Sede, Servicio, Empleado, Cita, Notificacion, Disponibilidad, Bloqueo, AgendaDiaria, EmpleadoServicio, Imagen,
+    Publicacion, Feedback, Eliminacion, CitaArchivada, BloqueoArchivado, NotificacionArchivada, EntradaStore,
+)
 
 Usuario = get_user_model()
 
 class RegisterUserViewTest(APITestCase):
+    def setUp(self):
+        get_store().clear()
+
     def test_register_user_success(self):
         url = reverse('register')  # Asegúrate de que esta sea la URL correcta para tu vista
         data = {
@@ -106,6 +143,7 @@ class LoginViewTest(APITestCase):
             'password': 'loginpassword'
         }
         self.user = Usuario.objects.create_user(**self.user_data)
+        get_store().clear()
         self.login_url = reverse('login') # Asegúrate de que esta sea la URL correcta para tu vista
 
     def test_login_success(self):
@@ -171,4 +209,1434 @@ class LoginViewTest(APITestCase):
             'email': self.user_data['email']
         }
         response = self.client.post(self.login_url, data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class MiddlewareProfileTest(APITestCase):
+    # El costo por peticion de cada perfil se compara en loadtests/perfil_middleware.py
+    def test_api_profile_drops_session_middleware(self):
+        self.assertNotIn('django.contrib.sessions.middleware.SessionMiddleware', settings_api.MIDDLEWARE)
+        self.assertNotIn('django.middleware.csrf.CsrfViewMiddleware', settings_api.MIDDLEWARE)
+        self.assertNotIn('django.contrib.messages.middleware.MessageMiddleware', settings_api.MIDDLEWARE)
+        self.assertNotIn('django.contrib.admin', settings_api.INSTALLED_APPS)
+        self.assertNotIn('rest_framework.authtoken', settings_api.INSTALLED_APPS)
+
+    def test_api_profile_middleware(self):
+        self.assertEqual(settings_api.MIDDLEWARE, [
+            'django.middleware.security.SecurityMiddleware',
+            'app.middleware.CompresionMiddleware',
+            'corsheaders.middleware.CorsMiddleware',
+            'django.middleware.common.CommonMiddleware',
+        ])
+        # Mismo orden relativo que el stack completo
+        self.assertEqual(settings_api.MIDDLEWARE, [m for m in settings.MIDDLEWARE if m in settings_api.MIDDLEWARE])
+
+    def test_api_profile_settings(self):
+        self.assertEqual(settings_api.ROOT_URLCONF, 'config.urls_api')
+        self.assertEqual(settings_api.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'], ['app.renderers.OrjsonRenderer'])
+        self.assertEqual(
+            settings_api.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'],
+            settings.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'],
+        )
+        self.assertEqual(
+            settings_api.TEMPLATES[0]['OPTIONS']['context_processors'],
+            ['django.template.context_processors.request'],
+        )
+
+    def test_api_profile_serves_api(self):
+        with self.settings(MIDDLEWARE=settings_api.MIDDLEWARE, ROOT_URLCONF=settings_api.ROOT_URLCONF):
+            response = APIClient().get(reverse('usuario-sedes'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('sessionid', response.cookies)
+
+    def capas_recorridas(self, **ajustes):
+        # Envuelve cada capa que arma load_middleware y anota las que la
+        # peticion atraviesa; la ultima es la vista, no un middleware
+        recorridas = []
+        original = handlers_base.convert_exception_to_response
+
+        def contar(get_response):
+            envuelta = original(get_response)
+
+            def capa(request):
+                recorridas.append(get_response)
+                return envuelta(request)
+            return capa
+
+        with self.settings(**ajustes), mock.patch.object(handlers_base, 'convert_exception_to_response', contar):
+            response = APIClient().get(reverse('usuario-sedes'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [f'{type(capa).__module__}.{type(capa).__name__}' for capa in recorridas[:-1]]
+
+    def test_api_profile_recorre_menos_capas(self):
+        completo = self.capas_recorridas(MIDDLEWARE=settings.MIDDLEWARE)
+        api = self.capas_recorridas(MIDDLEWARE=settings_api.MIDDLEWARE, ROOT_URLCONF=settings_api.ROOT_URLCONF)
+        self.assertEqual(completo, settings.MIDDLEWARE)
+        self.assertEqual(api, settings_api.MIDDLEWARE)
+        self.assertEqual(len(api), 4)
+        self.assertLess(len(api), len(completo))
+
+
+class PerfilArranqueCommandTest(TestCase):
+    def test_reporta_tiempos_por_modulo(self):
+        salida = StringIO()
+        call_command('perfil_arranque', '--top', '5', stdout=salida)
+        self.assertIn('Arranque de config.wsgi', salida.getvalue())
+        self.assertIn('django', salida.getvalue())
+
+    def test_arranque_no_importa_serializers_ni_vistas(self):
+        # Se cargan con el URLconf: en la primera peticion o en el master con preload_app
+        codigo = (
+            'import sys, config.wsgi; '
+            "print(sorted(m for m in ('app.serializers', 'app.views', 'jwt') if m in sys.modules))"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'}
+        proceso = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, env=env)
+        self.assertEqual(proceso.returncode, 0, proceso.stderr)
+        self.assertEqual(proceso.stdout.strip(), '[]')
+
+
+def token_para(user):
+    payload = {
+        'user_id': user.id,
+        'email': user.email,
+        'rol': user.rol,
+        'exp': datetime.now(timezone.utc) + timedelta(days=1),
+        'iat': datetime.now(timezone.utc),
+    }
+    return f"Bearer {jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm='HS256')}"
+
+
+class AsyncReadViewsTest(APITestCase):
+    def setUp(self):
+        self.cliente = Usuario.objects.create_user(email='cliente@example.com', nombre='Cliente', password='clave12345')
+        self.otro = Usuario.objects.create_user(email='otro@example.com', nombre='Otro', password='clave12345')
+        self.admin = Usuario.objects.create_user(
+            email='admin@example.com', nombre='Admin', password='clave12345', rol='admin'
+        )
+        sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=sede)
+        for usuario in (self.cliente, self.otro):
+            Cita.objects.create(
+                fecha_inicio=datetime(2026, 1, 5, 15, 0, tzinfo=timezone.utc), estado='por aprobar',
+                usuario=usuario, servicio=servicio, empleado=empleado, sede=sede,
+            )
+            Notificacion.objects.create(
+                tipo='cita aprobada', mensaje='Aprobada', fecha=datetime(2026, 1, 5, tzinfo=timezone.utc), usuario=usuario
+            )
+
+    def get(self, nombre, user=None):
+        headers = {'HTTP_AUTHORIZATION': token_para(user)} if user else {}
+        return self.client.get(reverse(nombre), **headers)
+
+    def test_async_views_match_sync_views(self):
+        for nombre, user in [
+            ('usuario-sedes', None),
+            ('usuario-citas', self.cliente),
+            ('usuario-citas', self.admin),
+            ('usuario-notificaciones', self.cliente),
+        ]:
+            sincrona = self.get(nombre, user)
+            with self.settings(ROOT_URLCONF='config.urls_asgi'):
+                asincrona = self.get(nombre, user)
+            self.assertEqual(asincrona.status_code, status.HTTP_200_OK)
+            self.assertEqual(asincrona.json(), sincrona.json())
+            self.assertEqual(asincrona.get('X-No-Leidas'), sincrona.get('X-No-Leidas'))
+
+    def test_async_citas_scoped_to_user(self):
+        with self.settings(ROOT_URLCONF='config.urls_asgi'):
+            response = self.get('usuario-citas', self.cliente)
+            self.assertEqual([cita['usuario']['id'] for cita in response.json()], [self.cliente.id])
+            self.assertEqual(len(self.get('usuario-citas', self.admin).json()), 2)
+
+    def test_async_views_require_token(self):
+        with self.settings(ROOT_URLCONF='config.urls_asgi'):
+            self.assertEqual(self.get('usuario-citas').status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(self.get('usuario-notificaciones').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get('usuario-citas').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_perfil_asgi_se_elige_por_entorno(self):
+        # Sin DJANGO_SETTINGS_MODULE, config.asgi sirve el sitio completo como siempre
+        codigo = 'import config.asgi; from django.conf import settings; print(settings.ROOT_URLCONF)'
+        env = {clave: valor for clave, valor in os.environ.items() if clave != 'DJANGO_SETTINGS_MODULE'}
+        for modulo, urlconf in ((None, 'config.urls'), ('config.settings_asgi', 'config.urls_asgi')):
+            if modulo:
+                env['DJANGO_SETTINGS_MODULE'] = modulo
+            proceso = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, env=env)
+            self.assertEqual(proceso.returncode, 0, proceso.stderr)
+            self.assertEqual(proceso.stdout.strip(), urlconf)
+
+
+class AgendaDiariaTest(APITestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(email='agenda@example.com', nombre='Agenda', password='clave12345')
+        self.sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        self.servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=self.sede)
+        # El proximo lunes, dentro del horizonte que se mantiene guardado
+        hoy = dj_timezone.localdate()
+        self.lunes = hoy + timedelta(days=7 - hoy.weekday())
+        with self.captureOnCommitCallbacks(execute=True):
+            Disponibilidad.objects.create(empleado=self.empleado, dia='Lunes', hora_inicio=dt_time(9), hora_fin=dt_time(12))
+
+    def libres(self, fecha=None):
+        url = reverse('usuario-empleado-agenda', args=[self.empleado.pk])
+        response = self.client.get(url, {'fecha': (fecha or self.lunes).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['libres']
+
+    def crear_cita(self, hora, estado='por aprobar', fecha=None):
+        return Cita.objects.create(
+            fecha_inicio=dj_timezone.make_aware(datetime.combine(fecha or self.lunes, hora)), estado=estado,
+            usuario=self.usuario, servicio=self.servicio, empleado=self.empleado, sede=self.sede,
+        )
+
+    def test_agenda_refleja_disponibilidad(self):
+        self.assertEqual(self.libres(), [['09:00', '12:00']])
+        self.assertEqual(self.libres(), [['09:00', '12:00']])
+        self.assertEqual(AgendaDiaria.objects.filter(empleado=self.empleado, fecha=self.lunes).count(), 1)
+
+    def test_fechas_fuera_de_la_ventana(self):
+        url = reverse('usuario-empleado-agenda', args=[self.empleado.pk])
+        desde, hasta = agenda.ventana()
+        guardadas = AgendaDiaria.objects.count()
+        for fecha in ('0001-01-01', '9999-12-31', desde - timedelta(days=1), hasta + timedelta(days=1)):
+            response = self.client.get(url, {'fecha': str(fecha)})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, fecha)
+        self.assertEqual(AgendaDiaria.objects.count(), guardadas)
+
+    def test_fuera_del_horizonte_no_se_guarda(self):
+        pasado = self.lunes - timedelta(days=14)
+        lejano = self.lunes + timedelta(weeks=agenda.horizonte_dias() // 7 + 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_cita(dt_time(10), fecha=pasado)
+        self.assertEqual(self.libres(pasado), [['09:00', '10:00'], ['10:30', '12:00']])
+        self.assertEqual(self.libres(lejano), [['09:00', '12:00']])
+        self.assertFalse(AgendaDiaria.objects.filter(fecha__in=[pasado, lejano]).exists())
+
+    def test_reservas_fuera_del_horizonte(self):
+        lejano = self.lunes + timedelta(weeks=agenda.horizonte_dias() // 7 + 2)
+        # Una foto vieja de esa fecha, de antes de que saliera del horizonte
+        AgendaDiaria.objects.create(empleado=self.empleado, fecha=lejano, slots=bytes(agenda.BYTES_POR_DIA))
+        url = reverse('usuario-citas-reservar')
+        for fecha_inicio in (f'{lejano}T10:00:00-05:00', '9999-12-31T10:00:00-05:00'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, {
+                    'fecha_inicio': fecha_inicio, 'servicio_id': self.servicio.pk,
+                    'empleado_id': self.empleado.pk, 'sede_id': self.sede.pk,
+                }, format='json', HTTP_AUTHORIZATION=token_para(self.usuario))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, fecha_inicio)
+        self.assertFalse(AgendaDiaria.objects.filter(fecha__gt=self.lunes + timedelta(days=agenda.horizonte_dias())).exists())
+        self.assertEqual(self.libres(lejano), [['09:00', '10:00'], ['10:30', '12:00']])
+        self.assertEqual(agenda.fechas_entre(
+            dj_timezone.make_aware(datetime(9999, 12, 31, 10)), dj_timezone.make_aware(datetime(9999, 12, 31, 11))
+        ), [date(9999, 12, 31)])
+
+    def test_cambio_de_duracion_del_servicio(self):
+        self.libres()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_cita(dt_time(10))
+        self.assertEqual(self.libres(), [['09:00', '10:00'], ['10:30', '12:00']])
+        for duracion, libres in ((60, [['09:00', '10:00'], ['11:00', '12:00']]), (15, [['09:00', '10:00'], ['10:15', '12:00']])):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.servicio.duracion_minutos = duracion
+                self.servicio.save()
+            self.assertEqual(self.libres(), libres)
+        # Otro cambio del servicio no toca la agenda
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.servicio.precio = 25000
+            self.servicio.save()
+        self.assertEqual(callbacks, [])
+
+    def test_signals_actualizan_agenda(self):
+        self.libres()
+        with self.captureOnCommitCallbacks(execute=True):
+            cita = self.crear_cita(dt_time(10))
+        self.assertEqual(self.libres(), [['09:00', '10:00'], ['10:30', '12:00']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cita.fecha_inicio = dj_timezone.make_aware(datetime.combine(self.lunes, dt_time(11)))
+            cita.save()
+        self.assertEqual(self.libres(), [['09:00', '11:00'], ['11:30', '12:00']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Bloqueo.objects.create(
+                empleado=self.empleado, cita=cita,
+                fecha_inicio=dj_timezone.make_aware(datetime.combine(self.lunes, dt_time(9))),
+                fecha_fin=dj_timezone.make_aware(datetime.combine(self.lunes, dt_time(9, 15))),
+            )
+        self.assertEqual(self.libres(), [['09:15', '11:00'], ['11:30', '12:00']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cita.delete()
+        self.assertEqual(self.libres(), [['09:00', '12:00']])
+
+    def test_citas_rechazadas_no_ocupan(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_cita(dt_time(10), estado='rechazada')
+        self.assertEqual(self.libres(), [['09:00', '12:00']])
+
+    def test_borrar_empleado_no_reconstruye(self):
+        self.libres()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_cita(dt_time(10))
+            self.empleado.delete()
+        self.assertFalse(AgendaDiaria.objects.exists())
+
+    def test_comando_reconstruye_horizonte(self):
+        salida = StringIO()
+        call_command('reconstruir_agenda', '--desde', self.lunes.isoformat(), '--dias', '6', stdout=salida)
+        semana = (self.lunes, self.lunes + timedelta(days=6))
+        self.assertEqual(AgendaDiaria.objects.filter(empleado=self.empleado, fecha__range=semana).count(), 7)
+        self.assertEqual(self.libres(), [['09:00', '12:00']])
+        martes = AgendaDiaria.objects.get(empleado=self.empleado, fecha=self.lunes + timedelta(days=1))
+        self.assertEqual(agenda.intervalos_libres(bytes(martes.slots)), [])
+
+
+class DisponibilidadDiaSemanaTest(APITestCase):
+    def setUp(self):
+        sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=sede)
+
+    def test_numero_dia_acepta_nombres_en_espanol(self):
+        self.assertEqual(Disponibilidad.numero_dia('lunes'), 1)
+        self.assertEqual(Disponibilidad.numero_dia(' Miércoles '), 3)
+        self.assertEqual(Disponibilidad.numero_dia('sabado'), 6)
+        self.assertIsNone(Disponibilidad.numero_dia('feriado'))
+
+    def test_serializer_normaliza_dia(self):
+        serializer = DisponibilidadSerializer(data={
+            'empleado_id': self.empleado.pk, 'dia': 'MIERCOLES', 'hora_inicio': '09:00', 'hora_fin': '12:00',
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        disponibilidad = serializer.save()
+        self.assertEqual(disponibilidad.dia, 'miércoles')
+        self.assertEqual(disponibilidad.dia_semana, 3)
+        self.assertEqual(DisponibilidadSerializer(disponibilidad).data['dia_semana'], 3)
+
+    def test_serializer_rechaza_dia_invalido(self):
+        serializer = DisponibilidadSerializer(data={
+            'empleado_id': self.empleado.pk, 'dia': 'feriado', 'hora_inicio': '09:00', 'hora_fin': '12:00',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('dia', serializer.errors)
+
+    def test_filtro_por_dia_en_sql(self):
+        Disponibilidad.objects.create(empleado=self.empleado, dia='viernes', hora_inicio=dt_time(9), hora_fin=dt_time(12))
+        viernes = date(2030, 1, 11)
+        self.assertEqual(Disponibilidad.objects.filter(dia_semana=viernes.isoweekday()).count(), 1)
+
+
+class EmpleadoBusquedaTest(APITestCase):
+    def setUp(self):
+        busqueda.invalidar()
+        bogota = Sede.objects.create(direccion='Calle 1', ciudad='Bogotá')
+        medellin = Sede.objects.create(direccion='Carrera 2', ciudad='Medellín')
+        self.corte = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        self.tinte = Servicio.objects.create(nombre='Tinte', descripcion='Tinte', precio=50000, duracion_minutos=90)
+        self.ana = Empleado.objects.create(nombre='Ana María', url_foto='https://example.com/a.jpg', sede=bogota)
+        self.beto = Empleado.objects.create(nombre='Beto', url_foto='https://example.com/b.jpg', sede=bogota)
+        self.carla = Empleado.objects.create(nombre='Carla', url_foto='https://example.com/c.jpg', sede=medellin)
+        EmpleadoServicio.objects.create(empleado=self.ana, servicio=self.corte)
+        EmpleadoServicio.objects.create(empleado=self.ana, servicio=self.tinte)
+        EmpleadoServicio.objects.create(empleado=self.beto, servicio=self.tinte)
+        EmpleadoServicio.objects.create(empleado=self.carla, servicio=self.corte)
+        self.sede = bogota
+        self.url = reverse('usuario-empleados-buscar')
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [empleado['id'] for empleado in response.data]
+
+    def test_filtra_por_sede_servicio_ciudad_y_nombre(self):
+        self.assertEqual(self.ids(sede=self.sede.pk, servicio=self.corte.pk), [self.ana.pk])
+        self.assertEqual(self.ids(servicio=self.corte.pk), [self.ana.pk, self.carla.pk])
+        self.assertEqual(self.ids(ciudad='bogota'), [self.ana.pk, self.beto.pk])
+        self.assertEqual(self.ids(q='maria'), [self.ana.pk])
+        self.assertEqual(self.ids(ciudad='Medellín', servicio=self.tinte.pk), [])
+
+    def test_respuesta_compacta(self):
+        response = self.client.get(self.url, {'q': 'ana'})
+        self.assertEqual(response.data, [{
+            'id': self.ana.pk, 'nombre': 'Ana María', 'url_foto': 'https://example.com/a.jpg',
+            'sede_id': self.sede.pk, 'ciudad': 'Bogotá', 'servicios': [self.corte.pk, self.tinte.pk],
+        }])
+
+    def test_indice_se_reconstruye_al_cambiar(self):
+        self.assertEqual(self.ids(servicio=self.corte.pk), [self.ana.pk, self.carla.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            EmpleadoServicio.objects.create(empleado=self.beto, servicio=self.corte)
+        self.assertEqual(self.ids(servicio=self.corte.pk), [self.ana.pk, self.beto.pk, self.carla.pk])
+        with self.assertNumQueries(0):
+            busqueda.buscar(servicio=self.corte.pk)
+
+    def test_invalidacion_de_otro_worker(self):
+        self.assertEqual(self.ids(servicio=self.corte.pk), [self.ana.pk, self.carla.pk])
+        # Otro proceso agrega el servicio y renueva la version en el cache compartido
+        EmpleadoServicio.objects.create(empleado=self.beto, servicio=self.corte)
+        caches['compartida'].set(busqueda.CLAVE_VERSION, 'de-otro-worker', None)
+        self.assertEqual(self.ids(servicio=self.corte.pk), [self.ana.pk, self.carla.pk])
+        with self.settings(BUSQUEDA_REVISION_SEGUNDOS=0):
+            self.assertEqual(self.ids(servicio=self.corte.pk), [self.ana.pk, self.beto.pk, self.carla.pk])
+
+    def test_empleado_creado_entre_consultas(self):
+        # La segunda consulta ve una relacion de un empleado que la primera no vio
+        with mock.patch.object(Empleado.objects, 'values', return_value=[]):
+            datos = busqueda.construir()
+        self.assertEqual(datos['empleados'], {})
+        self.assertEqual(datos['servicio'], {})
+
+    def test_parametros_invalidos(self):
+        response = self.client.get(self.url, {'sede': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL')
+    def test_sin_indice_trigram(self):
+        # La busqueda por nombre no toca la base; el indice de la 0004 ya no existe
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM pg_indexes WHERE indexname = 'empleado_nombre_trgm_idx'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        busqueda.buscar()
+        with self.assertNumQueries(0):
+            busqueda.buscar(texto='ana')
+
+
+class SedesCercanasTest(APITestCase):
+    def setUp(self):
+        self.chapinero = Sede.objects.create(direccion='Calle 60', ciudad='Bogotá', latitud=4.6486, longitud=-74.0628)
+        self.usaquen = Sede.objects.create(direccion='Calle 119', ciudad='Bogotá', latitud=4.6951, longitud=-74.0304)
+        self.poblado = Sede.objects.create(direccion='Calle 10', ciudad='Medellín', latitud=6.2088, longitud=-75.5704)
+        self.cali = Sede.objects.create(direccion='Avenida 6', ciudad='Cali', latitud=3.4516, longitud=-76.5320)
+        Sede.objects.create(direccion='Sin ubicación', ciudad='Bogotá')
+        self.url = reverse('usuario-sedes-cercanas')
+
+    def test_geohash(self):
+        self.assertEqual(geo.codificar(42.6, -5.6, 5), 'ezs42')
+        self.assertEqual(len(geo.vecinos('ezs42')), 9)
+        self.assertTrue(self.chapinero.geohash.startswith(geo.codificar(4.6486, -74.0628, 6)))
+
+    def test_ordena_por_distancia(self):
+        response = self.client.get(self.url, {'lat': 4.65, 'lng': -74.06, 'limite': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([sede['id'] for sede in response.data], [self.chapinero.pk, self.usaquen.pk, self.poblado.pk])
+        self.assertLess(response.data[0]['distancia_km'], 1)
+
+    def test_amplia_busqueda_si_no_hay_sedes_cerca(self):
+        response = self.client.get(self.url, {'lat': 3.45, 'lng': -76.53, 'limite': 1})
+        self.assertEqual([sede['id'] for sede in response.data], [self.cali.pk])
+        response = self.client.get(self.url, {'lat': -33.45, 'lng': -70.66, 'limite': 10})
+        self.assertEqual(len(response.data), 4)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(self.url, {'lat': 'x', 'lng': 1}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'lat': 91, 'lng': 1}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filtro_por_prefijo_de_ciudad(self):
+        response = self.client.get(reverse('usuario-sedes'), {'ciudad': 'bog'})
+        self.assertEqual(len(response.data), 3)
+
+
+class ImagenPipelineTest(APITestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = self.settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.usuario = Usuario.objects.create_user(email='fotos@example.com', nombre='Fotos', password='clave12345')
+
+    def png(self, ancho=1600, alto=1200):
+        contenido = BytesIO()
+        Image.new('RGB', (ancho, alto), (200, 80, 40)).save(contenido, 'PNG')
+        return SimpleUploadedFile('foto.png', contenido.getvalue(), content_type='image/png')
+
+    def subir(self, archivo):
+        return self.client.post(
+            reverse('imagenes'), {'archivo': archivo}, format='multipart',
+            HTTP_AUTHORIZATION=token_para(self.usuario),
+        )
+
+    def test_subida_y_variantes(self):
+        response = self.subir(self.png())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['estado'], 'pendiente')
+        self.assertEqual((response.data['ancho'], response.data['alto']), (1600, 1200))
+        self.assertEqual(response.data['srcset'], {})
+
+        self.assertEqual(imagenes.procesar_pendientes(), 1)
+        imagen = Imagen.objects.get(pk=response.data['id'])
+        self.assertEqual(imagen.estado, 'lista')
+        self.assertEqual(sorted({v['ancho'] for v in imagen.variantes}), [160, 480, 1080])
+        self.assertEqual(sorted({v['formato'] for v in imagen.variantes}), ['jpeg', 'webp'])
+        miniatura = next(v for v in imagen.variantes if v['ancho'] == 160 and v['formato'] == 'webp')
+        with Image.open(os.path.join(self.media, miniatura['ruta'])) as archivo:
+            self.assertEqual(archivo.size, (160, 120))
+            self.assertEqual(archivo.format, 'WEBP')
+
+        publicacion = Publicacion.objects.create(url_imagen='https://example.com/p.jpg', fecha=date(2030, 1, 1), imagen=imagen)
+        data = PublicacionSerializer(publicacion).data
+        self.assertIn('160w', data['imagen']['srcset']['webp'])
+        self.assertIn('1080w', data['imagen']['srcset']['jpeg'])
+
+    def test_no_amplia_imagenes_pequenas(self):
+        response = self.subir(self.png(300, 200))
+        imagenes.procesar_pendientes()
+        imagen = Imagen.objects.get(pk=response.data['id'])
+        self.assertEqual(sorted({v['ancho'] for v in imagen.variantes}), [160, 300])
+
+    def test_rechaza_archivos_que_no_son_imagen(self):
+        archivo = SimpleUploadedFile('foto.png', b'no es una imagen', content_type='image/png')
+        self.assertEqual(self.subir(archivo).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requiere_autenticacion(self):
+        response = self.client.post(reverse('imagenes'), {'archivo': self.png()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_solo_el_dueno_ve_y_adjunta_su_imagen(self):
+        response = self.subir(self.png(300, 200))
+        imagen = Imagen.objects.get(pk=response.data['id'])
+        self.assertEqual(imagen.usuario, self.usuario)
+
+        otro = Usuario.objects.create_user(email='otro@example.com', nombre='Otro', password='clave12345')
+        admin = Usuario.objects.create_user(email='jefe@example.com', nombre='Jefe', password='clave12345', rol='admin')
+        url = reverse('imagenes-detail', args=[imagen.pk])
+        for usuario, esperado in ((self.usuario, 200), (otro, 404), (admin, 200)):
+            response = self.client.get(url, HTTP_AUTHORIZATION=token_para(usuario))
+            self.assertEqual(response.status_code, esperado, usuario.email)
+
+        factory = APIRequestFactory()
+        for usuario, valido in ((self.usuario, True), (otro, False), (admin, True)):
+            request = factory.patch('/')
+            request.user = usuario
+            serializer = UsuarioSerializer(
+                usuario, data={'imagen_id': imagen.pk}, partial=True, context={'request': request}
+            )
+            self.assertEqual(serializer.is_valid(), valido, usuario.email)
+            if not valido:
+                self.assertIn('imagen_id', serializer.errors)
+
+
+class PublicacionFeedTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('usuario-publicaciones-feed')
+        self.publicaciones = []
+        for dia in range(1, 6):
+            for _ in range(2):
+                self.publicaciones.append(
+                    Publicacion.objects.create(url_imagen='https://example.com/p.jpg', fecha=date(2030, 1, dia))
+                )
+
+    def ids(self, data):
+        return [publicacion['id'] for publicacion in data['resultados']]
+
+    def esperado(self):
+        return [p.id for p in sorted(self.publicaciones, key=lambda p: (p.fecha, p.id), reverse=True)]
+
+    def test_paginacion_por_cursor(self):
+        ids = []
+        cursor = None
+        while True:
+            response = self.client.get(self.url, {'limite': 3, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += self.ids(response.data)
+            cursor = response.data['siguiente']
+            if cursor is None:
+                break
+        self.assertEqual(ids, self.esperado())
+
+    def test_paginas_salen_de_la_cache(self):
+        self.client.get(self.url, {'limite': 4})
+        # Ultimo id, fechas del feed y versiones de los dias en el cache compartido
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'limite': 4})
+        self.assertEqual(self.ids(response.data), self.esperado()[:4])
+
+    def test_escritura_invalida_el_dia(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva = Publicacion.objects.create(url_imagen='https://example.com/n.jpg', fecha=date(2030, 1, 5))
+        response = self.client.get(self.url)
+        self.assertEqual(self.ids(response.data)[0], nueva.id)
+
+    def test_sincronizacion_incremental_y_etag(self):
+        response = self.client.get(self.url)
+        sync = response.data['sync']
+        response = self.client.get(self.url, {'since': sync})
+        self.assertEqual(response.data['resultados'], [])
+        etag = response['ETag']
+        response = self.client.get(self.url, {'since': sync}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        nueva = Publicacion.objects.create(url_imagen='https://example.com/n.jpg', fecha=date(2030, 1, 6))
+        response = self.client.get(self.url, {'since': sync}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(response.data), [nueva.id])
+        self.assertEqual(response.data['sync'], nueva.id)
+
+    def test_if_none_match_compara_etiquetas_completas(self):
+        etag = self.client.get(self.url)['ETag']
+        for cabecera in (etag, f'"otra", {etag}', f'W/{etag}', '*'):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=cabecera)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, cabecera)
+        # Antes bastaba con que la etiqueta apareciera dentro de la cabecera
+        for cabecera in (f'"x{etag[1:]}', f'"{etag}"', etag[1:-1]):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=cabecera)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, cabecera)
+
+    def test_etag_debil_de_la_respuesta_comprimida(self):
+        with self.settings(COMPRESION_TAMANO_MINIMO=0):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertTrue(response['ETag'].startswith('W/"'))
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cuerpo_se_serializa_una_vez(self):
+        datos = []
+
+        def espiar(original):
+            def render(renderer, data, *args, **kwargs):
+                datos.append(data)
+                return original(renderer, data, *args, **kwargs)
+            return render
+
+        with mock.patch.object(JSONRenderer, 'render', espiar(JSONRenderer.render)), \
+                mock.patch.object(OrjsonRenderer, 'render', espiar(OrjsonRenderer.render)):
+            response = self.client.get(self.url)
+            self.assertEqual(len(datos), 1)
+            datos.clear()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # El 304 no tiene cuerpo que serializar
+        self.assertEqual(datos, [None])
+
+    def test_cambio_en_un_dia_cambia_el_etag(self):
+        etag = self.client.get(self.url, {'limite': 3})['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Publicacion.objects.filter(pk=self.publicaciones[-1].pk).update(url_imagen='https://example.com/x.jpg')
+            feed.invalidar([self.publicaciones[-1].fecha])
+        response = self.client.get(self.url, {'limite': 3}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resultados'][0]['url_imagen'], 'https://example.com/x.jpg')
+
+    def test_invalidacion_llega_a_otros_workers(self):
+        self.client.get(self.url)
+        borrada = self.publicaciones[-1]
+        # Otro worker borra la publicacion: su invalidacion no toca la cache local de este
+        Publicacion.objects.filter(pk=borrada.pk).delete()
+        feed.invalidar([borrada.fecha])
+        response = self.client.get(self.url)
+        self.assertNotIn(borrada.id, self.ids(response.data))
+
+    def test_sincronizacion_paginada(self):
+        sync = self.client.get(self.url).data['sync']
+        nuevas = [
+            Publicacion.objects.create(url_imagen='https://example.com/n.jpg', fecha=date(2030, 1, dia))
+            for dia in (6, 3, 7, 1, 6)
+        ]
+        ids, params = [], {'since': sync, 'limite': 2}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += self.ids(response.data)
+            if response.data['siguiente'] is None:
+                break
+            # Hasta terminar, la proxima apertura debe volver a pedir todo el rango
+            self.assertEqual(response.data['sync'], sync)
+            Publicacion.objects.create(url_imagen='https://example.com/t.jpg', fecha=date(2030, 1, 8))
+            params = {'cursor': response.data['siguiente'], 'limite': 2}
+        self.assertEqual(ids, [p.id for p in sorted(nuevas, key=lambda p: (p.fecha, p.id), reverse=True)])
+        self.assertEqual(response.data['sync'], max(p.id for p in nuevas))
+
+    def test_cursor_invalido(self):
+        response = self.client.get(self.url, {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SyncTest(APITestCase):
+    def setUp(self):
+        self.cliente = Usuario.objects.create_user(email='sync@example.com', nombre='Sync', password='clave12345')
+        self.otro = Usuario.objects.create_user(email='otro@example.com', nombre='Otro', password='clave12345')
+        self.sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        self.servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=self.sede)
+        self.cita = self.crear_cita(self.cliente)
+        self.ajena = self.crear_cita(self.otro)
+        self.disponibilidad = Disponibilidad.objects.create(
+            empleado=self.empleado, dia='lunes', hora_inicio=dt_time(9), hora_fin=dt_time(12)
+        )
+        self.url = reverse('usuario-sync')
+
+    def crear_cita(self, usuario):
+        return Cita.objects.create(
+            fecha_inicio=datetime(2030, 1, 7, 15, 0, tzinfo=timezone.utc), estado='por aprobar',
+            usuario=usuario, servicio=self.servicio, empleado=self.empleado, sede=self.sede,
+        )
+
+    def sync(self, token=None):
+        params = {'token': token} if token else {}
+        response = self.client.get(self.url, params, HTTP_AUTHORIZATION=token_para(self.cliente))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_sincronizacion_completa(self):
+        data = self.sync()
+        self.assertTrue(data['completo'])
+        self.assertEqual([cita['id'] for cita in data['citas']], [self.cita.id])
+        self.assertEqual([d['id'] for d in data['disponibilidades']], [self.disponibilidad.id])
+        self.assertEqual(data['citas'][0]['sede_id'], self.sede.id)
+
+    def test_solo_cambios_desde_el_token(self):
+        token = sync.codificar_token(dj_timezone.now())
+        Cita.objects.filter(pk=self.cita.pk).update(actualizada=dj_timezone.now() - timedelta(hours=1))
+        Disponibilidad.objects.filter(pk=self.disponibilidad.pk).update(actualizada=dj_timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.sync(token)['citas'], [])
+
+        self.cita.estado = 'aprobada'
+        self.cita.save()
+        data = self.sync(token)
+        self.assertFalse(data['completo'])
+        self.assertEqual([(cita['id'], cita['estado']) for cita in data['citas']], [(self.cita.id, 'aprobada')])
+        self.assertEqual(data['disponibilidades'], [])
+
+    def test_lapidas_de_borrados(self):
+        token = sync.codificar_token(dj_timezone.now() - timedelta(seconds=1))
+        cita_id, ajena_id, disponibilidad_id = self.cita.id, self.ajena.id, self.disponibilidad.id
+        self.cita.delete()
+        self.ajena.delete()
+        self.disponibilidad.delete()
+        data = self.sync(token)
+        self.assertEqual(data['eliminados']['citas'], [cita_id])
+        self.assertNotIn(ajena_id, data['eliminados']['citas'])
+        self.assertEqual(data['eliminados']['disponibilidades'], [disponibilidad_id])
+
+    def test_borrar_usuario_con_citas(self):
+        self.otro.delete()
+        self.assertFalse(Cita.objects.filter(pk=self.ajena.pk).exists())
+
+    def test_token_viejo_devuelve_foto_completa(self):
+        token = sync.codificar_token(dj_timezone.now() - timedelta(days=365))
+        self.assertTrue(self.sync(token)['completo'])
+
+    def test_token_invalido_y_autenticacion(self):
+        response = self.client.get(self.url, {'token': 'x'}, HTTP_AUTHORIZATION=token_para(self.cliente))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CitaFiltrosTest(APITestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email='admin-filtros@example.com', nombre='Admin', password='clave12345', rol='admin'
+        )
+        self.cliente = Usuario.objects.create_user(email='filtros@example.com', nombre='Cliente', password='clave12345')
+        self.sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        self.otra_sede = Sede.objects.create(direccion='Calle 2', ciudad='Bogota')
+        servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=self.sede)
+        self.citas = {}
+        for nombre, dia, hora, estado, sede in [
+            ('hoy_temprano', 7, 9, 'aprobada', self.sede),
+            ('hoy_tarde', 7, 16, 'por aprobar', self.sede),
+            ('hoy_otra_sede', 7, 10, 'aprobada', self.otra_sede),
+            ('manana', 8, 9, 'aprobada', self.sede),
+        ]:
+            self.citas[nombre] = Cita.objects.create(
+                fecha_inicio=dj_timezone.make_aware(datetime(2030, 1, dia, hora)), estado=estado,
+                usuario=self.cliente, servicio=servicio, empleado=self.empleado, sede=sede,
+            )
+
+    def listar(self, user=None, **params):
+        return self.client.get(reverse('admin-citas-list'), params, HTTP_AUTHORIZATION=token_para(user or self.admin))
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [cita['id'] for cita in response.data]
+
+    def test_agenda_del_dia_en_una_consulta(self):
+        self.listar()
+        # Autenticacion (1) + citas con todas sus relaciones (1)
+        with self.assertNumQueries(2):
+            response = self.listar(dia='2030-01-07', sede=self.sede.pk)
+        self.assertEqual(self.ids(response), [self.citas['hoy_temprano'].id, self.citas['hoy_tarde'].id])
+
+    def test_filtros_y_orden(self):
+        self.assertEqual(
+            self.ids(self.listar(sede=self.sede.pk, estado='aprobada', ordering='-fecha_inicio')),
+            [self.citas['manana'].id, self.citas['hoy_temprano'].id],
+        )
+        self.assertEqual(
+            self.ids(self.listar(desde='2030-01-07T12:00:00', hasta='2030-01-08')),
+            [self.citas['hoy_tarde'].id, self.citas['manana'].id],
+        )
+        self.assertEqual(len(self.ids(self.listar(empleado=self.empleado.pk))), 4)
+
+    def test_rechaza_combinaciones_sin_indice(self):
+        response = self.listar(empleado=self.empleado.pk, estado='aprobada')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('filtros', response.data)
+
+    def test_valores_invalidos(self):
+        self.assertEqual(self.listar(estado='inventado').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.listar(dia='ayer').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.listar(sede='x').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_solo_admin(self):
+        self.assertEqual(self.listar(user=self.cliente).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_vista_async_aplica_los_mismos_filtros(self):
+        url = reverse('usuario-citas')
+        params = {'dia': '2030-01-07', 'sede': self.sede.pk, 'ordering': '-fecha_inicio'}
+        sincrona = self.client.get(url, params, HTTP_AUTHORIZATION=token_para(self.admin))
+        with self.settings(ROOT_URLCONF='config.urls_asgi'):
+            asincrona = self.client.get(url, params, HTTP_AUTHORIZATION=token_para(self.admin))
+            invalida = self.client.get(url, {'empleado': 1, 'estado': 'aprobada'}, HTTP_AUTHORIZATION=token_para(self.admin))
+        self.assertEqual(asincrona.json(), sincrona.json())
+        self.assertEqual(len(asincrona.json()), 2)
+        self.assertEqual(invalida.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LoginThrottlingTest(APITestCase):
+    def setUp(self):
+        get_store().clear()
+        self.user = Usuario.objects.create_user(email='throttle@example.com', nombre='Throttle', password='clave12345')
+        self.url = reverse('login')
+
+    def login(self, email='throttle@example.com', password='incorrecta', ip='10.0.0.1'):
+        return self.client.post(self.url, {'email': email, 'password': password}, format='json', REMOTE_ADDR=ip)
+
+    def test_rechaza_por_email_sin_consultar_la_base(self):
+        with mock.patch.dict(LoginEmailThrottle.THROTTLE_RATES, login_email='3/min'):
+            for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+                self.assertEqual(self.login(ip=ip).status_code, status.HTTP_400_BAD_REQUEST)
+            with self.assertNumQueries(0), mock.patch.object(Usuario, 'check_password') as check_password:
+                response = self.login(email=' THROTTLE@example.com', password='clave12345', ip='10.0.0.4')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn('Retry-After', response)
+            check_password.assert_not_called()
+            # Otro correo desde la misma IP sigue pasando
+            self.assertEqual(self.login(email='otro@example.com').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rechaza_por_ip(self):
+        with mock.patch.dict(LoginIPThrottle.THROTTLE_RATES, login_ip='2/min'):
+            self.login(email='a@example.com')
+            self.login(email='b@example.com')
+            self.assertEqual(self.login(email='c@example.com').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(self.login(email='c@example.com', ip='10.0.0.9').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ventana_deslizante(self):
+        reloj = [600.0]
+        with mock.patch.dict(LoginIPThrottle.THROTTLE_RATES, login_ip='2/min'), \
+                mock.patch.object(LoginIPThrottle, 'timer', lambda self: reloj[0]):
+            self.login()
+            self.login()
+            self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            # A mitad de la ventana siguiente la anterior pesa 2 * 0.5 = 1
+            reloj[0] = 690.0
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.login()
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response['Retry-After'], '1')
+            reloj[0] = 700.0
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rafaga_concurrente_no_supera_el_limite(self):
+        lectura = MemoryStore.get
+
+        def lectura_lenta(store, *args, **kwargs):
+            # Ensancha la ventana entre leer y contar, como un store remoto
+            valor = lectura(store, *args, **kwargs)
+            time.sleep(0.02)
+            return valor
+
+        request = mock.Mock(META={'REMOTE_ADDR': '10.0.0.1'})
+        barrera = threading.Barrier(20)
+
+        def intento():
+            barrera.wait()
+            return LoginIPThrottle().allow_request(request, None)
+
+        with mock.patch.dict(LoginIPThrottle.THROTTLE_RATES, login_ip='5/min'), \
+                mock.patch.object(MemoryStore, 'get', lectura_lenta), \
+                ThreadPoolExecutor(max_workers=20) as pool:
+            permitidas = list(pool.map(lambda _: intento(), range(20)))
+            self.assertEqual(permitidas.count(True), 5)
+            self.assertFalse(LoginIPThrottle().allow_request(request, None))
+
+    def test_registro_limitado_por_ip(self):
+        url = reverse('register')
+        with mock.patch.dict(LoginIPThrottle.THROTTLE_RATES, registro_ip='1/hour'):
+            self.client.post(url, {'nombre': 'Uno'}, format='json')
+            response = self.client.post(url, {'nombre': 'Dos'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_stores(self):
+        for store in (MemoryStore(), CacheStore('default'), TablaStore()):
+            store.clear()
+            self.assertEqual([store.incr('n', 60) for _ in range(3)], [1, 2, 3])
+            self.assertTrue(store.add('k', 'v', 60))
+            self.assertFalse(store.add('k', 'otro', 60))
+            self.assertEqual(store.get_many(['n', 'k', 'x']), {'n': 3, 'k': 'v'})
+            store.decr('n')
+            self.assertEqual(store.get('n'), 2)
+            store.delete('k')
+            self.assertIsNone(store.get('k'))
+        for store in (MemoryStore(), TablaStore()):
+            store.set('vence', 1, 0)
+            self.assertIsNone(store.get('vence'))
+            self.assertTrue(store.add('vence', 2, 60))
+
+    def test_contadores_en_redis_local(self):
+        # La rama CONTADORES_REDIS_URL de settings contra el servidor de loadtests/redis_local.py
+        raiz = settings.BASE_DIR
+        servidor = subprocess.Popen(
+            [sys.executable, str(raiz / 'loadtests' / 'redis_local.py'), '--puerto', '0'],
+            stdout=subprocess.PIPE, text=True,
+        )
+        self.addCleanup(servidor.wait)
+        self.addCleanup(servidor.kill)
+        puerto = servidor.stdout.readline().split(':')[-1].strip()
+        codigo = (
+            'import django; django.setup()\n'
+            'from django.conf import settings\n'
+            'from django.core.cache import caches\n'
+            'from app.stores import get_store\n'
+            "print(settings.CACHES['contadores']['BACKEND'], settings.CACHES['compartida']['BACKEND'])\n"
+            'store = get_store()\n'
+            'store.clear()\n'
+            "print([store.incr('n', 60) for _ in range(3)], store.add('k', 'v', 60), store.add('k', 'w', 60))\n"
+            "store.decr('n')\n"
+            "print(store.get_many(['n', 'k', 'x']))\n"
+            "caches['compartida'].set('version', 7, 60)\n"
+            "print(caches['compartida'].get('version'))\n"
+        )
+        env = {
+            **os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings',
+            'CONTADORES_REDIS_URL': f'redis://127.0.0.1:{puerto}/0',
+        }
+        proceso = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, env=env, cwd=raiz)
+        self.assertEqual(proceso.returncode, 0, proceso.stderr)
+        self.assertEqual(proceso.stdout.splitlines(), [
+            'django.core.cache.backends.redis.RedisCache django.core.cache.backends.redis.RedisCache',
+            '[1, 2, 3] True False',
+            "{'n': 2, 'k': 'v'}",
+            '7',
+        ])
+
+
+class IdempotenciaTest(APITestCase):
+    def setUp(self):
+        get_store('IDEMPOTENCIA_STORE').clear()
+        self.admin = Usuario.objects.create_user(
+            email='admin-idem@example.com', nombre='Admin', password='clave12345', rol='admin'
+        )
+        self.cliente = Usuario.objects.create_user(email='idem@example.com', nombre='Cliente', password='clave12345')
+        self.sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        self.servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=self.sede)
+        self.datos = {
+            'fecha_inicio': '2030-01-07T09:00:00-05:00', 'usuario_id': self.cliente.pk,
+            'servicio_id': self.servicio.pk, 'empleado_id': self.empleado.pk, 'sede_id': self.sede.pk,
+        }
+
+    def reservar(self, datos=None, llave='reserva-1', user=None):
+        headers = {'HTTP_AUTHORIZATION': token_para(user or self.cliente)}
+        if llave is not None:
+            headers['HTTP_IDEMPOTENCY_KEY'] = llave
+        return self.client.post(reverse('usuario-citas-reservar'), datos or self.datos, format='json', **headers)
+
+    def test_reintento_devuelve_la_misma_respuesta(self):
+        primera = self.reservar()
+        self.assertEqual(primera.status_code, status.HTTP_201_CREATED)
+        with mock.patch.object(views.CitaViewSet, 'perform_create') as perform_create:
+            segunda = self.reservar()
+        perform_create.assert_not_called()
+        self.assertEqual(segunda.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(Cita.objects.count(), 1)
+
+    def test_cliente_reserva_a_su_nombre(self):
+        otro = Usuario.objects.create_user(email='otro-idem@example.com', nombre='Otro', password='clave12345')
+        response = self.reservar({**self.datos, 'usuario_id': otro.pk}, llave=None)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        cita = Cita.objects.get()
+        self.assertEqual((cita.usuario, cita.estado), (self.cliente, 'por aprobar'))
+        self.assertEqual(response.data['estado'], 'por aprobar')
+
+        sin_usuario = {clave: valor for clave, valor in self.datos.items() if clave != 'usuario_id'}
+        response = self.reservar({**sin_usuario, 'fecha_inicio': '2030-01-07T10:00:00-05:00'}, llave=None)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Cita.objects.filter(usuario=self.cliente).count(), 2)
+
+    def test_admin_reserva_para_un_cliente(self):
+        response = self.reservar(llave=None, user=self.admin)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Cita.objects.get().usuario, self.cliente)
+
+    def test_reserva_compartida_entre_workers(self):
+        # La reserva vive en la base, no en la memoria del proceso
+        self.assertEqual(self.reservar().status_code, status.HTTP_201_CREATED)
+        reset_store()
+        self.assertEqual(self.reservar()['Idempotent-Replayed'], 'true')
+        self.assertEqual(Cita.objects.count(), 1)
+
+    def test_cache_compartida_llena_no_descarta_reservas(self):
+        self.assertEqual(self.reservar().status_code, status.HTTP_201_CREATED)
+        compartida = caches['compartida']
+        with mock.patch.object(compartida, '_max_entries', 20):
+            for n in range(60):
+                compartida.set(f'relleno-{n}', n, 3600)
+        # La cache si descarto entradas vigentes al pasar el tope...
+        self.assertLess(len(compartida.get_many([f'relleno-{n}' for n in range(60)])), 60)
+        # ...pero la respuesta guardada se sigue repitiendo
+        with mock.patch.object(views.CitaViewSet, 'perform_create') as perform_create:
+            segunda = self.reservar()
+        perform_create.assert_not_called()
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(Cita.objects.count(), 1)
+
+    def test_barrido_de_entradas_vencidas(self):
+        store = TablaStore(barrido_cada=3)
+        store.set('vieja', 1, 0)
+        store.set('vigente', 2, 60)
+        store.set('otra', 3, 60)
+        self.assertEqual(
+            set(EntradaStore.objects.values_list('clave', flat=True)), {'vigente', 'otra'}
+        )
+
+    def test_misma_llave_con_otro_cuerpo(self):
+        self.reservar()
+        response = self.reservar({**self.datos, 'fecha_inicio': '2030-01-08T09:00:00-05:00'})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Cita.objects.count(), 1)
+
+    def test_reintento_concurrente_recibe_409(self):
+        concurrentes = []
+        original = views.CitaViewSet.perform_create
+
+        def perform_create(viewset, serializer):
+            concurrentes.append(self.reservar())
+            original(viewset, serializer)
+
+        with mock.patch.object(views.CitaViewSet, 'perform_create', perform_create):
+            self.assertEqual(self.reservar().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(concurrentes[0].status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Cita.objects.count(), 1)
+
+    def test_llaves_por_usuario_y_sin_llave(self):
+        otro = Usuario.objects.create_user(email='otro-idem@example.com', nombre='Otro', password='clave12345')
+        self.reservar()
+        self.assertEqual(self.reservar({**self.datos, 'usuario_id': otro.pk}, user=otro).status_code, 201)
+        self.reservar(llave=None)
+        self.reservar(llave=None)
+        self.assertEqual(Cita.objects.count(), 4)
+        self.assertEqual(self.reservar(llave='x' * 256).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_error_de_servidor_no_se_guarda(self):
+        with mock.patch.object(views.CitaViewSet, 'perform_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.reservar()
+        self.assertEqual(self.reservar().status_code, status.HTTP_201_CREATED)
+
+    def test_aprobar_y_rechazar(self):
+        cita = Cita.objects.create(
+            fecha_inicio=dj_timezone.make_aware(datetime(2030, 1, 7, 9)), usuario=self.cliente,
+            servicio=self.servicio, empleado=self.empleado, sede=self.sede,
+        )
+        url = reverse('admin-citas-aprobar', args=[cita.pk])
+        headers = {'HTTP_AUTHORIZATION': token_para(self.admin), 'HTTP_IDEMPOTENCY_KEY': 'aprobar-1'}
+        self.assertEqual(self.client.post(url, **headers).status_code, status.HTTP_200_OK)
+        # El reintento autentica y lee la respuesta guardada; no vuelve a leer ni a guardar la cita
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(url, **headers)
+        self.assertFalse([q['sql'] for q in consultas.captured_queries if '"app_cita"' in q['sql']])
+        self.assertEqual(response.json(), {'status': 'cita aprobada'})
+        cita.refresh_from_db()
+        self.assertEqual(cita.estado, 'aprobada')
+
+        rechazar = reverse('admin-citas-rechazar', args=[cita.pk])
+        self.assertEqual(self.client.post(rechazar, **headers).status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        cliente = self.client.post(rechazar, HTTP_AUTHORIZATION=token_para(self.cliente))
+        self.assertEqual(cliente.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RespuestasTest(APITestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email='admin-respuestas@example.com', nombre='Admin', password='clave12345', rol='admin'
+        )
+        self.sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio='20000.50', duracion_minutos=30)
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=self.sede)
+        for hora in range(8, 18):
+            cita = Cita.objects.create(
+                fecha_inicio=dj_timezone.make_aware(datetime(2030, 1, 7, hora, 15, 30, 123456)), usuario=self.admin,
+                servicio=servicio, empleado=self.empleado, sede=self.sede,
+            )
+            Bloqueo.objects.create(
+                empleado=self.empleado, cita=cita,
+                fecha_inicio=cita.fecha_inicio, fecha_fin=cita.fecha_inicio + timedelta(minutes=30),
+            )
+
+    def test_renderer_igual_al_de_drf(self):
+        from decimal import Decimal
+        import uuid
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import OrjsonRenderer
+        from .serializers import BloqueoSerializer
+
+        data = {
+            'bloqueos': BloqueoSerializer(Bloqueo.objects.all(), many=True).data,
+            'momento': datetime(2030, 1, 7, 9, 0, 0, 123456, tzinfo=timezone.utc),
+            'local': dj_timezone.make_aware(datetime(2030, 1, 7, 9)),
+            'dia': date(2030, 1, 7), 'hora': dt_time(9, 30, 0, 500000),
+            'precio': Decimal('20000.50'), 'duracion': timedelta(minutes=90), 'id': uuid.uuid4(),
+            'texto': 'Peluquería línea \u2028 \u2029', 1: [None, True, 1.5],
+        }
+        self.assertEqual(OrjsonRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(OrjsonRenderer().render({'n': 2 ** 70}), JSONRenderer().render({'n': 2 ** 70}))
+        self.assertEqual(OrjsonRenderer().render(None), b'')
+
+    def test_orjson_nan_e_infinitos(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import OrjsonRenderer
+
+        data = {'nan': float('nan'), 'mas': float('inf'), 'menos': float('-inf'), 'lista': [1.5, float('nan')]}
+        self.assertEqual(OrjsonRenderer().render(data), b'{"nan":null,"mas":null,"menos":null,"lista":[1.5,null]}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+
+    def test_compresion_negociada(self):
+        import gzip
+        url = reverse('usuario-citas')
+        auth = token_para(self.admin)
+        plano = self.client.get(url, HTTP_AUTHORIZATION=auth)
+        self.assertFalse(plano.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plano['Vary'])
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=auth, HTTP_ACCEPT_ENCODING='br;q=0.9, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plano.content)
+        self.assertLess(int(response['Content-Length']), len(plano.content))
+
+        rechazada = self.client.get(url, HTTP_AUTHORIZATION=auth, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(rechazada.has_header('Content-Encoding'))
+        with self.settings(COMPRESION_TAMANO_MINIMO=len(plano.content) + 1):
+            pequena = self.client.get(url, HTTP_AUTHORIZATION=auth, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(pequena.has_header('Content-Encoding'))
+
+    def test_sin_compresion_si_refleja_entrada_autenticada(self):
+        url = reverse('usuario-citas')
+        auth = token_para(self.admin)
+        # BREACH: con credenciales y entrada del cliente no se comprime, con ninguna codificacion
+        for codificacion in ('gzip', 'br'):
+            response = self.client.get(url, {'ordering': 'fecha_inicio'}, HTTP_AUTHORIZATION=auth,
+                                       HTTP_ACCEPT_ENCODING=codificacion)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.has_header('Content-Encoding'), codificacion)
+        with self.settings(COMPRESION_TAMANO_MINIMO=0):
+            response = self.client.post(reverse('usuario-citas-reservar'), {}, format='json',
+                                        HTTP_AUTHORIZATION=auth, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertFalse(response.has_header('Content-Encoding'))
+            # Sin credenciales no hay secreto que filtrar
+            for dia in range(1, 6):
+                Publicacion.objects.create(url_imagen='https://example.com/p.jpg', fecha=date(2030, 1, dia))
+            anonima = self.client.get(reverse('usuario-publicaciones-feed'), {'limite': 5}, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(anonima['Content-Encoding'], 'gzip')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=auth, HTTP_ACCEPT_ENCODING='gzip')['Content-Encoding'], 'gzip')
+
+    def test_elegir_codificacion(self):
+        from . import middleware
+        self.assertEqual(middleware.elegir_codificacion('*'), 'gzip' if middleware.brotli is None else 'br')
+        self.assertIsNone(middleware.elegir_codificacion('identity'))
+        with mock.patch.object(middleware, 'brotli', object()):
+            self.assertEqual(middleware.elegir_codificacion('gzip, br'), 'br')
+            self.assertEqual(middleware.elegir_codificacion('gzip, br;q=0.5'), 'gzip')
+            self.assertEqual(middleware.elegir_codificacion('br;q=0, *'), 'gzip')
+        with mock.patch.object(middleware, 'brotli', None):
+            self.assertIsNone(middleware.elegir_codificacion('br'))
+
+    def test_comando_medir_respuestas(self):
+        salida = StringIO()
+        call_command('medir_respuestas', '--repeticiones', '2', stdout=salida)
+        self.assertIn('citas: 10 filas, salida identica: si', salida.getvalue())
+        self.assertIn('bloqueos: 10 filas, salida identica: si', salida.getvalue())
+
+
+class ArchivoTest(APITestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email='admin-archivo@example.com', nombre='Admin', password='clave12345', rol='admin'
+        )
+        self.cliente = Usuario.objects.create_user(email='archivo@example.com', nombre='Cliente', password='clave12345')
+        self.sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        self.servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=self.sede)
+        viejo = dj_timezone.now() - timedelta(days=400)
+        self.viejas = [self.cita(viejo + timedelta(hours=n), estado) for n, estado in enumerate(
+            ['concluida', 'cancelada', 'rechazada', 'concluida', 'concluida']
+        )]
+        self.pendiente_vieja = self.cita(viejo, 'aprobada')
+        self.reciente = self.cita(dj_timezone.now() - timedelta(days=10), 'concluida')
+        Feedback.objects.create(cita=self.viejas[0], rating=4, comentario='Bien')
+        Feedback.objects.create(cita=self.reciente, rating=2, comentario='Regular')
+        for cita in self.viejas:
+            Bloqueo.objects.create(
+                empleado=self.empleado, cita=cita,
+                fecha_inicio=cita.fecha_inicio, fecha_fin=cita.fecha_inicio + timedelta(minutes=30),
+            )
+        self.leida = Notificacion.objects.create(tipo='cita aprobada', mensaje='Vieja', fecha=viejo, leida=True, usuario=self.cliente)
+        self.no_leida = Notificacion.objects.create(tipo='cita aprobada', mensaje='Sin leer', fecha=viejo, usuario=self.cliente)
+
+    def cita(self, fecha, estado):
+        return Cita.objects.create(
+            fecha_inicio=fecha, estado=estado, usuario=self.cliente,
+            servicio=self.servicio, empleado=self.empleado, sede=self.sede,
+        )
+
+    def test_archiva_en_lotes(self):
+        salida = StringIO()
+        call_command('archivar', '--meses', '6', '--lote', '2', stdout=salida)
+        self.assertIn('5 citas y 1 notificaciones archivadas en 4 lotes', salida.getvalue())
+
+        self.assertEqual(set(Cita.objects.values_list('pk', flat=True)), {self.pendiente_vieja.pk, self.reciente.pk})
+        self.assertEqual(set(CitaArchivada.objects.values_list('pk', flat=True)), {c.pk for c in self.viejas})
+        self.assertFalse(Bloqueo.objects.exists())
+        self.assertEqual(BloqueoArchivado.objects.filter(cita__in=[c.pk for c in self.viejas]).count(), 5)
+        archivada = CitaArchivada.objects.get(pk=self.viejas[0].pk)
+        self.assertEqual((archivada.rating, archivada.comentario), (4, 'Bien'))
+        self.assertEqual(list(Feedback.objects.values_list('cita_id', flat=True)), [self.reciente.pk])
+        self.assertEqual(list(Notificacion.objects.values_list('pk', flat=True)), [self.no_leida.pk])
+        self.assertTrue(NotificacionArchivada.objects.filter(pk=self.leida.pk, mensaje='Vieja').exists())
+        # Los clientes se enteran por la sincronizacion incremental
+        self.assertEqual(
+            Eliminacion.objects.filter(modelo='cita').count() + Eliminacion.objects.filter(modelo='notificacion').count(), 6
+        )
+
+        call_command('archivar', '--meses', '6', stdout=StringIO())
+        self.assertEqual(CitaArchivada.objects.count(), 5)
+
+    def test_consultas_por_lote_no_dependen_del_tamano(self):
+        corte = archivo.corte(6)
+        consultas = []
+        for lote in (2, 3):
+            with CaptureQueriesContext(connection) as capturadas:
+                self.assertEqual(archivo.archivar_lote_citas(corte, lote), lote)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_agenda_de_las_fechas_archivadas(self):
+        fecha = dj_timezone.localdate(self.viejas[0].fecha_inicio)
+        AgendaDiaria.objects.create(empleado=self.empleado, fecha=fecha, slots=bytes(agenda.BYTES_POR_DIA))
+        archivo.archivar_lote_citas(archivo.corte(6), 10)
+        self.assertFalse(AgendaDiaria.objects.filter(fecha=fecha).exists())
+
+    def test_max_lotes(self):
+        call_command('archivar', '--meses', '6', '--lote', '2', '--max-lotes', '1', stdout=StringIO())
+        self.assertEqual(CitaArchivada.objects.count(), 2)
+
+    def test_reporte_con_y_sin_historico(self):
+        call_command('archivar', '--meses', '6', stdout=StringIO())
+        url = reverse('admin-reportes-citas')
+        auth = token_para(self.admin)
+
+        vivas = self.client.get(url, HTTP_AUTHORIZATION=auth)
+        self.assertEqual(vivas.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(fila['citas'] for fila in vivas.data['resultados']), 2)
+
+        todas = self.client.get(url, {'archivo': '1', 'sede': self.sede.pk}, HTTP_AUTHORIZATION=auth)
+        self.assertEqual(sum(fila['citas'] for fila in todas.data['resultados']), 7)
+        concluidas = [f for f in todas.data['resultados'] if f['estado'] == 'concluida' and f['rating_promedio']]
+        self.assertEqual(sorted(f['rating_promedio'] for f in concluidas), [2.0, 4.0])
+
+        hasta = (dj_timezone.localdate() - timedelta(days=300)).isoformat()
+        antiguas = self.client.get(url, {'archivo': 'true', 'hasta': hasta}, HTTP_AUTHORIZATION=auth)
+        self.assertEqual(sum(fila['citas'] for fila in antiguas.data['resultados']), 6)
+
+        self.assertEqual(self.client.get(url, {'desde': 'ayer'}, HTTP_AUTHORIZATION=auth).status_code, 400)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=token_para(self.cliente)).status_code, 403)
+
+    def test_restar_meses(self):
+        from .archivo import restar_meses
+        self.assertEqual(restar_meses(date(2030, 3, 31), 1), date(2030, 2, 28))
+        self.assertEqual(restar_meses(date(2030, 1, 15), 13), date(2028, 12, 15))
+
+
+class ParticionesTest(TestCase):
+    def test_sentencias_de_un_mes(self):
+        from . import particiones
+        crear, mover, adjuntar = particiones.sentencias_particion('app_cita', 'fecha_inicio', date(2030, 12, 1))
+        self.assertIn('CREATE TABLE app_cita_p2030_12 (LIKE app_cita', crear)
+        self.assertIn('DELETE FROM app_cita_default', mover)
+        self.assertIn('INSERT INTO app_cita_p2030_12', mover)
+        # Limites en la zona horaria del proyecto (America/Bogota)
+        self.assertIn("FROM ('2030-12-01T00:00:00-05:00') TO ('2031-01-01T00:00:00-05:00')", adjuntar)
+
+    def test_meses_entre(self):
+        from . import particiones
+        self.assertEqual(
+            list(particiones.meses_entre(date(2030, 11, 20), date(2031, 2, 1))),
+            [date(2030, 11, 1), date(2030, 12, 1), date(2031, 1, 1), date(2031, 2, 1)],
+        )
+
+    @skipIf(connection.vendor == 'postgresql', 'Solo fuera de PostgreSQL')
+    def test_comando_fuera_de_postgresql(self):
+        salida = StringIO()
+        call_command('crear_particiones', stdout=salida)
+        self.assertIn('no es PostgreSQL', salida.getvalue())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL')
+    def test_comando_mueve_filas_de_la_particion_default(self):
+        from . import particiones
+        cliente = Usuario.objects.create_user(email='particiones@example.com', nombre='Cliente', password='clave12345')
+        sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=sede)
+        fecha = dj_timezone.make_aware(datetime(2035, 1, 15, 10))
+        cita = Cita.objects.create(
+            fecha_inicio=fecha, estado='aprobada', usuario=cliente, servicio=servicio, empleado=empleado, sede=sede,
+        )
+        Bloqueo.objects.create(empleado=empleado, cita=cita, fecha_inicio=fecha, fecha_fin=fecha + timedelta(minutes=30))
+        self.assertEqual(filas_en('app_cita_default'), 1)
+
+        salida = StringIO()
+        call_command('crear_particiones', '--desde', '2035-01', '--meses', '1', stdout=salida)
+        self.assertIn('4 particiones creadas', salida.getvalue())
+        with connection.cursor() as cursor:
+            self.assertIn('app_cita_p2035_02', particiones.particiones('app_cita', cursor))
+        self.assertEqual(filas_en('app_cita_default'), 0)
+        self.assertEqual(filas_en('app_cita_p2035_01'), 1)
+        self.assertEqual(filas_en('app_bloqueo_p2035_01'), 1)
+        self.assertEqual(Bloqueo.objects.get(cita=cita).empleado, empleado)
+
+        # Correrlo otra vez no crea nada
+        salida = StringIO()
+        call_command('crear_particiones', '--desde', '2035-01', '--meses', '1', stdout=salida)
+        self.assertIn('0 particiones creadas', salida.getvalue())
+
+
+def filas_en(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {tabla}')
+        return cursor.fetchone()[0]
+
+
+def tipo_de_tabla(tabla):
+    # 'p' particionada, 'r' tabla normal
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE relname = %s', [tabla])
+        return cursor.fetchone()[0]
+
+
+def llave_primaria(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+            [tabla],
+        )
+        return cursor.fetchone()[0]
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL')
+class MigracionParticionesTest(TransactionTestCase):
+    antes = [('app', '0010_archivo')]
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(destino)
+
+    def setUp(self):
+        self.cliente = Usuario.objects.create_user(email='migracion@example.com', nombre='Cliente', password='clave12345')
+        self.sede = Sede.objects.create(direccion='Calle 1', ciudad='Bogota')
+        self.servicio = Servicio.objects.create(nombre='Corte', descripcion='Corte', precio=20000, duracion_minutos=30)
+        self.empleado = Empleado.objects.create(nombre='Ana', url_foto='https://example.com/ana.jpg', sede=self.sede)
+        # Un mes viejo, el actual y uno fuera del rango de particiones (DEFAULT)
+        self.fechas = [
+            dj_timezone.make_aware(datetime(2024, 3, 10, 9)),
+            dj_timezone.now().replace(microsecond=0),
+            dj_timezone.make_aware(datetime(2040, 6, 1, 9)),
+        ]
+        self.citas = [self.cita(fecha) for fecha in self.fechas]
+        for cita in self.citas:
+            Bloqueo.objects.create(
+                empleado=self.empleado, cita=cita,
+                fecha_inicio=cita.fecha_inicio, fecha_fin=cita.fecha_inicio + timedelta(minutes=30),
+            )
+        Feedback.objects.create(cita=self.citas[0], rating=5, comentario='Bien')
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def cita(self, fecha):
+        return Cita.objects.create(
+            fecha_inicio=fecha, estado='concluida', usuario=self.cliente, servicio=self.servicio,
+            empleado=self.empleado, sede=self.sede,
+        )
+
+    def test_ida_y_vuelta_conserva_las_filas(self):
+        self.assertEqual(tipo_de_tabla('app_cita'), 'p')
+        ids = sorted(cita.pk for cita in self.citas)
+
+        self.migrar(self.antes)
+        for tabla in ('app_cita', 'app_bloqueo'):
+            self.assertEqual(tipo_de_tabla(tabla), 'r')
+            self.assertEqual(llave_primaria(tabla), 'PRIMARY KEY (id)')
+            self.assertEqual(filas_en(tabla), 3)
+        self.assertEqual(sorted(Cita.objects.values_list('pk', flat=True)), ids)
+        self.assertEqual(Cita.objects.get(pk=self.citas[0].pk).feedback.rating, 5)
+        # La secuencia sigue despues del ultimo id
+        self.assertGreater(self.cita(self.fechas[1]).pk, ids[-1])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_constraint WHERE conrelid = 'app_bloqueo'::regclass "
+                "AND contype = 'f' AND confrelid = 'app_cita'::regclass"
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        for tabla in ('app_cita', 'app_bloqueo'):
+            self.assertEqual(tipo_de_tabla(tabla), 'p')
+            self.assertEqual(llave_primaria(tabla), 'PRIMARY KEY (id, fecha_inicio)')
+            self.assertEqual(filas_en(f'{tabla}_p2024_03'), 1)
+            self.assertEqual(filas_en(f'{tabla}_default'), 1)
+        self.assertEqual(filas_en('app_cita'), 4)
+        self.assertEqual(filas_en('app_bloqueo'), 3)
+        ultimo = max(Cita.objects.values_list('pk', flat=True))
+        self.assertGreater(self.cita(self.fechas[1]).pk, ultimo)
+        self.assertEqual(Bloqueo.objects.filter(cita__estado='concluida', empleado=self.empleado).count(), 3)
+        with connection.cursor() as cursor:
+            indices = {
+                nombre
+                for nombre, indice in connection.introspection.get_constraints(cursor, 'app_cita').items()
+                if indice['index']
+            }
+        self.assertTrue({'cita_fecha_idx', 'cita_sede_estado_fecha_idx', 'app_cita_actualizada_idx'} <= indices)
+
+
+class SembrarCargaTest(APITestCase):
+    def test_siembra_datos_utilizables(self):
+        call_command('sembrar_carga', '--sedes', '2', '--empleados-por-sede', '2', '--clientes', '3', stdout=StringIO())
+        self.assertEqual(Sede.objects.filter(direccion__startswith='Carga sede').exclude(geohash='').count(), 2)
+        self.assertEqual(Disponibilidad.objects.filter(dia_semana=3).count(), 4)
+        self.assertTrue(AgendaDiaria.objects.exists())
+        cliente = Usuario.objects.get(email='cliente2@carga.local')
+        self.assertTrue(cliente.check_password('carga12345'))
+        self.assertEqual(Usuario.objects.get(email='admin0@carga.local').rol, 'admin')
+
+        auth = token_para(cliente)
+        servicios = self.client.get(reverse('usuario-servicios'), HTTP_AUTHORIZATION=auth)
+        self.assertEqual(len(servicios.data), 8)
+        sede = Sede.objects.first()
+        empleados = self.client.get(reverse('usuario-empleados-buscar'), {'sede': sede.pk}, HTTP_AUTHORIZATION=auth)
+        self.assertEqual(len(empleados.data), 2)
+
+        with self.assertRaises(CommandError):
+            call_command('sembrar_carga', stdout=StringIO())
+        call_command('sembrar_carga', '--limpiar', '--sedes', '1', '--clientes', '1', stdout=StringIO())
+        self.assertEqual(Sede.objects.count(), 1)
+        self.assertEqual(Usuario.objects.filter(email__endswith='@carga.local').count(), 3)
@@ -0,0 +1,76 @@
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from .stores import get_store
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Ventana deslizante aproximada con dos contadores: el de la ventana actual y
+    el de la anterior, pesado por la parte de ella que todavia cae dentro del
+    periodo. Son una lectura y un incremento en el store, sin guardar la lista
+    de marcas de tiempo de cada peticion como SimpleRateThrottle.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        ident = self.get_cache_key(request, view)
+        if ident is None:
+            return True
+
+        self.now = self.timer()
+        ventana, transcurrido = divmod(self.now, self.duration)
+        ventana = int(ventana)
+        self.fraccion = transcurrido / self.duration
+        store = get_store()
+        actual_clave = f'{ident}:{ventana}'
+        self.anterior = store.get(f'{ident}:{ventana - 1}', 0)
+        # Se incrementa antes de decidir: el incremento es atomico, asi que en
+        # una rafaga concurrente cada peticion ve un valor distinto y solo las
+        # que caben en el limite pasan. ``actual`` son las peticiones previas
+        self.actual = store.incr(actual_clave, self.duration * 2) - 1
+        if self.anterior * (1 - self.fraccion) + self.actual >= self.num_requests:
+            # Las peticiones rechazadas no cuentan: el limite se libera al ritmo de la ventana
+            store.decr(actual_clave)
+            return False
+        return True
+
+    def wait(self):
+        restante = (1 - self.fraccion) * self.duration
+        if self.actual >= self.num_requests or not self.anterior:
+            return restante
+        # Momento en que el peso de la ventana anterior deja lugar a una peticion;
+        # Retry-After se da en segundos enteros, asi que al menos uno
+        fraccion_libre = 1 - (self.num_requests - self.actual) / self.anterior
+        return max(1.0, min(restante, (fraccion_libre - self.fraccion) * self.duration))
+
+    def clave(self, valor):
+        return f'throttle:{self.scope}:{valor}'
+
+
+class IPThrottle(SlidingWindowThrottle):
+    def get_cache_key(self, request, view):
+        return self.clave(self.get_ident(request))
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        # Hash para no guardar correos en el store y tener claves de largo fijo
+        return self.clave(hashlib.sha256(email.strip().lower().encode()).hexdigest())
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = 'login_email'
+
+
+class RegistroIPThrottle(IPThrottle):
+    scope = 'registro_ip'
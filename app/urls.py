@@ -1,6 +1,8 @@
 from django.urls import path, include
+from rest_framework import permissions
 from rest_framework.routers import DefaultRouter
 from . import views
+from .permissions import IsAdmin
 
 router = DefaultRouter()
 #router.register(r'usuarios', views.UsuarioViewSet)
@@ -28,11 +30,62 @@ sede_detail = views.SedeViewSet.as_view({
     'delete': 'destroy'
 })
 
+servicio_read = views.ServicioViewSet.as_view({
+    'get': 'list'
+})
+
+cita_list = views.CitaViewSet.as_view({
+    'get': 'list'
+})
+
+admin_cita_list = views.CitaViewSet.as_view({
+    'get': 'list'
+}, permission_classes=[permissions.IsAuthenticated, IsAdmin])
+
+cita_create = views.CitaViewSet.as_view({
+    'post': 'create'
+})
+
+cita_aprobar = views.CitaViewSet.as_view({
+    'post': 'aprobar'
+}, permission_classes=[permissions.IsAuthenticated, IsAdmin])
+
+cita_rechazar = views.CitaViewSet.as_view({
+    'post': 'rechazar'
+}, permission_classes=[permissions.IsAuthenticated, IsAdmin])
+
+notificacion_list = views.NotificacionViewSet.as_view({
+    'get': 'list'
+})
+
+imagen_create = views.ImagenViewSet.as_view({
+    'post': 'create'
+})
+
+imagen_detail = views.ImagenViewSet.as_view({
+    'get': 'retrieve'
+})
+
 urlpatterns = [
     #path('', include(router.urls)),    
     path('cliente/registrar/', views.RegisterUserView.as_view(), name='register'),
     path('usuario/login/', views.LoginView.as_view(), name='login'),
     path('usuario/sedes/', sede_read, name='usuario-sedes'),
+    path('usuario/sedes/cercanas/', views.SedesCercanasView.as_view(), name='usuario-sedes-cercanas'),
+    path('usuario/servicios/', servicio_read, name='usuario-servicios'),
     path('admin/sedes/', sede_list, name='admin-sedes-list'),
     path('admin/sedes/<int:pk>/', sede_detail, name='admin-sedes-detail'),
+    path('admin/citas/', admin_cita_list, name='admin-citas-list'),
+    path('admin/citas/<int:pk>/aprobar/', cita_aprobar, name='admin-citas-aprobar'),
+    path('admin/citas/<int:pk>/rechazar/', cita_rechazar, name='admin-citas-rechazar'),
+    path('admin/reportes/citas/', views.ReporteCitasView.as_view(), name='admin-reportes-citas'),
+    path('usuario/empleados/buscar/', views.EmpleadoBusquedaView.as_view(), name='usuario-empleados-buscar'),
+    path('usuario/empleados/<int:pk>/agenda/', views.AgendaEmpleadoView.as_view(), name='usuario-empleado-agenda'),
+    path('usuario/publicaciones/feed/', views.PublicacionFeedView.as_view(), name='usuario-publicaciones-feed'),
+    path('usuario/sync/', views.SyncView.as_view(), name='usuario-sync'),
+    path('imagenes/', imagen_create, name='imagenes'),
+    path('imagenes/<int:pk>/', imagen_detail, name='imagenes-detail'),
+    path('usuario/citas/', cita_list, name='usuario-citas'),
+    path('usuario/citas/reservar/', cita_create, name='usuario-citas-reservar'),
+    path('usuario/notificaciones/', notificacion_list, name='usuario-notificaciones'),
 ]
\ No newline at end of file
@@ -1,28 +1,40 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 from .models import (
     Servicio, Sede, Empleado, EmpleadoServicio,
     Cita, Disponibilidad, Bloqueo, Publicacion, 
-    Notificacion, Feedback
+    Notificacion, Feedback, Imagen
 )
 from .serializers import (
     UsuarioSerializer, ServicioSerializer, SedeSerializer,
     EmpleadoSerializer, EmpleadoServicioSerializer, CitaSerializer,
     DisponibilidadSerializer, BloqueoSerializer, PublicacionSerializer,
-    NotificacionSerializer, FeedbackSerializer
+    NotificacionSerializer, FeedbackSerializer, ImagenSerializer
 )
 from .permissions import IsAdminOrReadOnly, IsOwnerOrAdmin, IsAdmin
-from datetime import datetime, timedelta, timezone
+from .filters import FiltroIndexado
+from .idempotencia import idempotente
+from .throttling import LoginEmailThrottle, LoginIPThrottle, RegistroIPThrottle
+from . import agenda, archivo, busqueda, feed, geo, sync
+from datetime import date, datetime, timedelta, timezone
+import hashlib
 import jwt
 from django.conf import settings
 
 User = get_user_model()
 
 class RegisterUserView(APIView):
+    # Sin autenticacion para que el throttle sea lo primero que corre
+    authentication_classes = []
+    throttle_classes = [RegistroIPThrottle]
+
     def post(self, request):
         serializer = UsuarioSerializer(data=request.data)
         if serializer.is_valid():
@@ -42,7 +54,11 @@ class RegisterUserView(APIView):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class LoginView(APIView):    
+class LoginView(APIView):
+    # El throttle rechaza antes de consultar el usuario o calcular el hash
+    authentication_classes = []
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
     def authenticate_user(self, email, password):
         user = User.objects.get(email=email)
         if user.check_password(password):
@@ -70,6 +86,47 @@ class LoginView(APIView):
             return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)        
 
 
+class AgendaEmpleadoView(APIView):
+    def get(self, request, pk):
+        empleado = get_object_or_404(Empleado, pk=pk)
+        try:
+            fecha = date.fromisoformat(request.query_params.get('fecha', ''))
+        except ValueError:
+            return Response({"error": "fecha debe tener el formato AAAA-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        desde, hasta = agenda.ventana()
+        if not desde <= fecha <= hasta:
+            return Response(
+                {"error": f"fecha debe estar entre {desde.isoformat()} y {hasta.isoformat()}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        slots = agenda.agenda_de(empleado.pk, fecha)
+        return Response({
+            'empleado': empleado.pk,
+            'fecha': fecha.isoformat(),
+            'libres': [[inicio, fin] for inicio, fin in agenda.intervalos_libres(slots)],
+        })
+
+
+class EmpleadoBusquedaView(APIView):
+    def get(self, request):
+        filtros = {}
+        for campo in ('sede', 'servicio', 'limite'):
+            valor = request.query_params.get(campo)
+            if valor in (None, ''):
+                continue
+            try:
+                filtros[campo] = int(valor)
+            except ValueError:
+                return Response({"error": f"{campo} debe ser un número"}, status=status.HTTP_400_BAD_REQUEST)
+        filtros['limite'] = max(1, min(filtros.get('limite', 50), 200))
+        resultados = busqueda.buscar(
+            ciudad=request.query_params.get('ciudad') or None,
+            texto=request.query_params.get('q') or None,
+            **filtros,
+        )
+        return Response(resultados)
+
+
 class ServicioViewSet(viewsets.ModelViewSet):
     queryset = Servicio.objects.all()
     serializer_class = ServicioSerializer    
@@ -77,6 +134,13 @@ class ServicioViewSet(viewsets.ModelViewSet):
 class SedeViewSet(viewsets.ModelViewSet):
     queryset = Sede.objects.all()
     serializer_class = SedeSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        ciudad = self.request.query_params.get('ciudad')
+        if ciudad:
+            return queryset.filter(ciudad__istartswith=ciudad)
+        return queryset
     
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -86,8 +150,54 @@ class SedeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         ) 
 
+class SedesCercanasView(APIView):
+    PRECISION_INICIAL = 6
+
+    def get(self, request):
+        try:
+            latitud = float(request.query_params['lat'])
+            longitud = float(request.query_params['lng'])
+        except (KeyError, ValueError):
+            return Response({"error": "lat y lng son obligatorios"}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= latitud <= 90 and -180 <= longitud <= 180):
+            return Response({"error": "Coordenadas fuera de rango"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limite = max(1, min(int(request.query_params.get('limite', 5)), 20))
+        except ValueError:
+            return Response({"error": "limite debe ser un número"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Se amplia la celda hasta que haya `limite` sedes dentro del radio que
+        # el bloque de 3x3 celdas garantiza cubrir por completo
+        geohash = geo.codificar(latitud, longitud, self.PRECISION_INICIAL)
+        for precision in range(self.PRECISION_INICIAL, -1, -1):
+            if precision:
+                prefijos = geo.vecinos(geohash[:precision])
+                filtro = Q()
+                for prefijo in prefijos:
+                    filtro |= Q(geohash__startswith=prefijo)
+                sedes = Sede.objects.filter(filtro)
+                radio = geo.radio_cubierto_km(geohash[:precision], latitud)
+            else:
+                sedes = Sede.objects.exclude(geohash='')
+                radio = float('inf')
+            candidatas = sorted(
+                ((geo.distancia_km(latitud, longitud, sede.latitud, sede.longitud), sede) for sede in sedes),
+                key=lambda par: par[0],
+            )
+            dentro = [par for par in candidatas if par[0] <= radio]
+            if len(dentro) >= limite or precision == 0:
+                break
+
+        resultado = []
+        for distancia, sede in candidatas[:limite]:
+            datos = SedeSerializer(sede).data
+            datos['distancia_km'] = round(distancia, 3)
+            resultado.append(datos)
+        return Response(resultado)
+
+
 class EmpleadoViewSet(viewsets.ModelViewSet):
-    queryset = Empleado.objects.all()
+    queryset = Empleado.objects.select_related('sede', 'imagen')
     serializer_class = EmpleadoSerializer    
 
 class EmpleadoServicioViewSet(viewsets.ModelViewSet):
@@ -95,18 +205,46 @@ class EmpleadoServicioViewSet(viewsets.ModelViewSet):
     serializer_class = EmpleadoServicioSerializer    
 
 class CitaViewSet(viewsets.ModelViewSet):
-    queryset = Cita.objects.all()
+    queryset = Cita.objects.select_related(
+        'usuario__imagen', 'servicio', 'empleado__sede', 'empleado__imagen', 'sede'
+    )
     serializer_class = CitaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [FiltroIndexado, OrderingFilter]
+    filtros_igualdad = {'estado': 'estado', 'empleado': 'empleado', 'sede': 'sede'}
+    filtro_rango = 'fecha_inicio'
+    ordering_fields = ['fecha_inicio', 'id']
+    ordering = ['fecha_inicio', 'id']
     
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
         if user.rol == 'admin' or user.is_staff:
-            return self.queryset
+            return queryset
         elif user.rol == 'cliente':
-            return self.queryset.filter(usuario=user)
-        return self.queryset.none()
-    
+            return queryset.filter(usuario=user)
+        return queryset.none()
+
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def es_admin(self):
+        return self.request.user.rol == 'admin' or self.request.user.is_staff
+
+    def perform_create(self, serializer):
+        # Un cliente solo reserva a su nombre, sin importar el usuario_id que mande
+        usuario = serializer.validated_data.get('usuario') if self.es_admin() else None
+        serializer.save(usuario=usuario or self.request.user, estado='por aprobar')
+
+    def perform_update(self, serializer):
+        if self.es_admin():
+            serializer.save()
+        else:
+            serializer.save(usuario=serializer.instance.usuario)
+
     @action(detail=True, methods=['post'])
+    @idempotente
     def aprobar(self, request, pk=None):
         cita = self.get_object()
         cita.estado = 'aprobada'
@@ -114,6 +252,7 @@ class CitaViewSet(viewsets.ModelViewSet):
         return Response({'status': 'cita aprobada'})
     
     @action(detail=True, methods=['post'])
+    @idempotente
     def rechazar(self, request, pk=None):
         cita = self.get_object()
         cita.estado = 'rechazada'
@@ -127,14 +266,111 @@ class DisponibilidadViewSet(viewsets.ModelViewSet):
 class BloqueoViewSet(viewsets.ModelViewSet):
     queryset = Bloqueo.objects.all()
     serializer_class = BloqueoSerializer
+    filter_backends = [FiltroIndexado, OrderingFilter]
+    filtros_igualdad = {'empleado': 'empleado'}
+    filtro_rango = 'fecha_inicio'
+    ordering_fields = ['fecha_inicio', 'id']
+    ordering = ['fecha_inicio', 'id']
+
+class ImagenViewSet(viewsets.ModelViewSet):
+    queryset = Imagen.objects.all()
+    serializer_class = ImagenSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.rol == 'admin' or user.is_staff:
+            return self.queryset
+        return self.queryset.filter(usuario=user)
+
+    def perform_create(self, serializer):
+        serializer.save(usuario=self.request.user)
 
 class PublicacionViewSet(viewsets.ModelViewSet):
-    queryset = Publicacion.objects.all()
+    queryset = Publicacion.objects.select_related('imagen')
     serializer_class = PublicacionSerializer
 
+class PublicacionFeedView(APIView):
+    # ?cursor= pagina hacia atras; ?since=<sync> trae solo lo publicado despues
+    # de la ultima apertura. Con If-None-Match una apertura sin cambios es un 304.
+    def get(self, request):
+        try:
+            limite = max(1, min(int(request.query_params.get('limite', 20)), 50))
+            since = request.query_params.get('since')
+            since = int(since) if since else None
+            cursor = request.query_params.get('cursor')
+            cursor = feed.decodificar_cursor(cursor) if cursor else None
+        except ValueError:
+            return Response({"error": "Parámetros de paginación inválidos"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if cursor and cursor[2] or since is not None and cursor is None:
+            # Sincronizacion; las paginas siguientes traen su rango de ids en el cursor
+            desde, hasta = cursor[2] if cursor else (since, feed.ultimo_id())
+            resultados, siguiente, firma = feed.nuevas(request, desde, hasta, limite, cursor[:2] if cursor else None)
+            # sync solo avanza cuando se devolvio todo el rango; mientras queden
+            # paginas el cliente sigue sincronizando desde el mismo punto
+            sync_id = desde if siguiente else hasta
+        else:
+            # Se lee antes que la pagina para no anunciar publicaciones posteriores
+            sync_id = feed.ultimo_id()
+            resultados, siguiente, firma = feed.pagina(request, cursor[:2] if cursor else None, limite)
+
+        # El ETag sale de las versiones de los dias de la pagina y de los
+        # parametros, no del cuerpo: la respuesta se serializa una sola vez
+        etag = hashlib.md5(
+            '\n'.join([request.get_host(), request.get_full_path(), firma, str(siguiente), str(sync_id)]).encode()
+        ).hexdigest()
+        etag = f'"{etag}"'
+        if etag_coincide(etag, request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response({'resultados': resultados, 'siguiente': siguiente, 'sync': sync_id}, headers={'ETag': etag})
+
+
+def etag_coincide(etag, if_none_match):
+    # Comparacion debil (RFC 9110): W/"x" coincide con "x". CompresionMiddleware
+    # devuelve el ETag como debil cuando comprime
+    if if_none_match.strip() == '*':
+        return True
+    sin_w = etag.removeprefix('W/')
+    return any(candidato.removeprefix('W/') == sin_w for candidato in parse_etags(if_none_match))
+
+
+class SyncView(APIView):
+    # Cambios en citas, notificaciones y disponibilidades desde ?token=
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        token = request.query_params.get('token')
+        try:
+            desde = sync.decodificar_token(token) if token else None
+        except ValueError:
+            return Response({"error": "Token de sincronización inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sync.cambios(request.user, desde))
+
+class ReporteCitasView(APIView):
+    # Citas por mes, sede y estado; ?archivo=1 incluye el historico
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        try:
+            desde = request.query_params.get('desde')
+            desde = agenda.inicio_del_dia(date.fromisoformat(desde)) if desde else None
+            hasta = request.query_params.get('hasta')
+            hasta = agenda.inicio_del_dia(date.fromisoformat(hasta) + timedelta(days=1)) if hasta else None
+            sede = request.query_params.get('sede')
+            sede = int(sede) if sede else None
+        except ValueError:
+            return Response({"error": "Parámetros del reporte inválidos"}, status=status.HTTP_400_BAD_REQUEST)
+        incluir_archivo = request.query_params.get('archivo') in ('1', 'true')
+        return Response({
+            'archivo': incluir_archivo,
+            'resultados': archivo.resumen_citas(desde, hasta, sede, incluir_archivo),
+        })
+
 class NotificacionViewSet(viewsets.ModelViewSet):
     queryset = Notificacion.objects.all()
     serializer_class = NotificacionSerializer
+    permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         user = self.request.user
@@ -142,6 +378,11 @@ class NotificacionViewSet(viewsets.ModelViewSet):
             return self.queryset
         return self.queryset.filter(usuario=user)
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response['X-No-Leidas'] = str(self.get_queryset().filter(leida=False).count())
+        return response
+
 class FeedbackViewSet(viewsets.ModelViewSet):
     queryset = Feedback.objects.all()
     serializer_class = FeedbackSerializer
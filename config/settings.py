@@ -2,6 +2,7 @@ from pathlib import Path
 from decouple import config
 import dj_database_url
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -24,7 +25,6 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'rest_framework.authtoken',
     'corsheaders',
     'app',
 ]
@@ -33,6 +33,7 @@ AUTH_USER_MODEL = 'app.Usuario'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.CompresionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,10 +85,60 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'app.authentication.TokenUsuarioAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Proxies delante de la app; con 0 la IP del throttling es REMOTE_ADDR y
+    # no se puede falsear con X-Forwarded-For
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': config('THROTTLE_LOGIN_IP', default='30/min'),
+        'login_email': config('THROTTLE_LOGIN_EMAIL', default='10/min'),
+        'registro_ip': config('THROTTLE_REGISTRO_IP', default='20/hour'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Lo que todos los workers deben ver igual (versiones del indice de
+    # busqueda y del feed). Sin Redis es una tabla de la base (migracion 0012)
+    'compartida': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'app_cache_compartida',
+        # Una version por dia del feed; con el limite por defecto (300) se
+        # descartarian versiones vigentes
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+# Con CONTADORES_REDIS_URL los contadores de throttling se comparten entre
+# workers en un Redis (o servidor compatible; para pruebas locales sirve
+# loadtests/redis_local.py); si no, viven en cada proceso
+if config('CONTADORES_REDIS_URL', default=''):
+    CACHES['contadores'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CONTADORES_REDIS_URL'),
+        'KEY_PREFIX': 'contadores',
+    }
+    CACHES['compartida'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CONTADORES_REDIS_URL'),
+        'KEY_PREFIX': 'compartida',
+    }
+    CONTADORES_STORE = {'BACKEND': 'app.stores.CacheStore', 'OPTIONS': {'alias': 'contadores'}}
+else:
+    CONTADORES_STORE = {'BACKEND': 'app.stores.MemoryStore'}
+
+# Cada worker revisa la version del indice de busqueda en el cache compartido
+# a lo sumo con esta frecuencia
+BUSQUEDA_REVISION_SEGUNDOS = 5
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=365*5),
     'REFRESH_TOKEN_LIFETIME': None,
@@ -105,11 +156,75 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = 'media/'
+
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
+# Originales y miniaturas van al storage "default"; se puede cambiar por uno
+# remoto (S3, GCS...) con MEDIA_STORAGE_BACKEND sin tocar el codigo.
+STORAGES = {
+    'default': {
+        'BACKEND': config('MEDIA_STORAGE_BACKEND', default='django.core.files.storage.FileSystemStorage'),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+IMAGENES_ANCHOS = (160, 480, 1080)
+
+IMAGENES_TAMANO_MAXIMO = 10 * 1024 * 1024
+
+FEED_CACHE_SEGUNDOS = 24 * 60 * 60
+
+# Las lapidas de registros borrados se guardan este tiempo; un cliente con un
+# token mas viejo recibe la foto completa
+SYNC_RETENCION_DIAS = 30
+
+SYNC_MARGEN_SEGUNDOS = 30
+
+# Las citas terminadas y las notificaciones leidas mas viejas que esto se
+# mueven al historico con `manage.py archivar`
+ARCHIVO_RETENCION_MESES = 12
+
+# En PostgreSQL, meses por adelantado con particion creada para citas y
+# bloqueos; `manage.py crear_particiones` deberia correr al menos una vez al mes
+PARTICIONES_MESES_ADELANTE = 3
+
+# Respuestas mas pequeñas que esto se mandan sin comprimir
+COMPRESION_TAMANO_MINIMO = 1024
+
+# Tiempo maximo de una peticion; gunicorn.conf.py usa el mismo valor como
+# timeout de los workers
+TIMEOUT_PETICION_SEGUNDOS = config('TIMEOUT_PETICION', default=30, cast=int)
+
+# Respuestas guardadas para reintentos con Idempotency-Key, en una tabla de
+# la base para que un reintento que llega a otro worker las encuentre. No va
+# en el cache compartido: ese descarta entradas vigentes al llenarse
+IDEMPOTENCIA_STORE = {'BACKEND': 'app.stores.TablaStore'}
+
+IDEMPOTENCIA_TTL_SEGUNDOS = 24 * 60 * 60
+
+# La reserva de una peticion en curso dura mas que la peticion misma: vence
+# solo si el worker murio
+IDEMPOTENCIA_EN_CURSO_SEGUNDOS = TIMEOUT_PETICION_SEGUNDOS + 10
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Dias hacia adelante que se mantienen precalculados en AgendaDiaria
+AGENDA_HORIZONTE_DIAS = config('AGENDA_HORIZONTE_DIAS', default=60, cast=int)
+
+# Rango de fechas que acepta la consulta publica de agenda; fuera del
+# horizonte se calcula al vuelo sin guardarse
+AGENDA_CONSULTA_DIAS_ATRAS = 30
+
+AGENDA_CONSULTA_DIAS_ADELANTE = 365
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8081",
     "http://127.0.0.1:8081",
     config('FRONTEND_PROD_DOMAIN', default=""),
     config('FRONTEND_DEV_DOMAIN', default=""),
 ]
+
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
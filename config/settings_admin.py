@@ -0,0 +1,12 @@
+"""
+Perfil para los workers que sirven el admin de Django.
+
+Mantiene sesiones, mensajes y CSRF, que el admin necesita, y solo enruta
+``/admin/``. La API se sirve desde los workers con ``config.settings_api``.
+
+Uso: DJANGO_SETTINGS_MODULE=config.settings_admin
+"""
+
+from .settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'config.urls_admin'
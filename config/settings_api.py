@@ -0,0 +1,49 @@
+"""
+Perfil para los workers que solo sirven la API.
+
+El trafico de la API se autentica con JWT, asi que no necesita sesiones,
+mensajes, CSRF ni el admin. Este perfil quita esas apps y middlewares para
+reducir el trabajo por peticion y el tiempo de arranque del worker.
+
+Uso: DJANGO_SETTINGS_MODULE=config.settings_api
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'corsheaders',
+    'app',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'app.middleware.CompresionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'config.urls_api'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+        },
+    },
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.OrjsonRenderer',
+    ],
+}
@@ -0,0 +1,17 @@
+"""
+Perfil para los workers ASGI de la API.
+
+Parte de ``config.settings_api`` y enruta las lecturas de sedes, citas y
+notificaciones a vistas async, de modo que una consulta lenta no retiene un
+hilo y un solo worker atiende muchos clientes concurrentes.
+
+No es el default de ``config.asgi`` (ese sigue siendo ``config.settings``,
+con /admin/ y todas las rutas); se elige al desplegar:
+
+    DJANGO_SETTINGS_MODULE=config.settings_asgi \\
+        gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+from .settings_api import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'config.urls_asgi'
@@ -0,0 +1,11 @@
+from django.urls import path, include
+from app import async_views
+
+# Las rutas de lectura con mas trafico se sirven con vistas async; el resto
+# cae en las vistas sincronas de app.urls.
+urlpatterns = [
+    path('usuario/sedes/', async_views.sedes, name='usuario-sedes'),
+    path('usuario/citas/', async_views.citas, name='usuario-citas'),
+    path('usuario/notificaciones/', async_views.notificaciones, name='usuario-notificaciones'),
+    path('', include('app.urls')),
+]
@@ -0,0 +1,40 @@
+"""
+Configuracion de gunicorn.
+
+Con ``preload_app`` el master importa Django, el URLconf, las vistas y los
+serializers una sola vez antes de hacer fork; los workers comparten esas
+paginas de memoria (copy-on-write) y arrancan sin repetir las importaciones.
+"""
+
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'config.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+# Igual que TIMEOUT_PETICION_SEGUNDOS en settings: la reserva de Idempotency-Key
+# de una peticion en curso dura un poco mas que esto
+timeout = int(os.environ.get('TIMEOUT_PETICION', 30))
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Django carga el URLconf de forma perezosa en la primera peticion;
+    # forzarlo aqui deja vistas y serializers en la memoria compartida.
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    # Congela los objetos del master para que el GC de los workers no
+    # escriba en sus cabeceras y rompa el copy-on-write.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Las conexiones abiertas en el master no se pueden compartir entre procesos
+    from django.db import connections
+    connections.close_all()
@@ -0,0 +1,93 @@
+"""
+Compara la concurrencia de la API servida por WSGI y por ASGI.
+
+Lanza N clientes concurrentes contra la misma ruta en dos servidores y
+reporta throughput, errores y percentiles de latencia de cada uno.
+
+    # WSGI: workers sincronos, un hilo por peticion en curso
+    DJANGO_SETTINGS_MODULE=config.settings_api gunicorn config.wsgi:application -w 2 -b 127.0.0.1:8001
+    # ASGI: las lecturas de sedes/citas/notificaciones son async
+    DJANGO_SETTINGS_MODULE=config.settings_asgi gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker -w 2 -b 127.0.0.1:8002
+
+    python loadtests/concurrencia.py --ruta /usuario/sedes/ \\
+        --servidor wsgi=http://127.0.0.1:8001 --servidor asgi=http://127.0.0.1:8002 \\
+        --concurrencia 10 50 200 --duracion 15
+
+Para citas y notificaciones pase ``--token "Bearer ..."``.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def cliente(url, headers, hasta, latencias, errores, lock):
+    while time.perf_counter() < hasta:
+        peticion = urllib.request.Request(url, headers=headers)
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+                respuesta.read()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            ok = False
+        transcurrido = time.perf_counter() - inicio
+        with lock:
+            if ok:
+                latencias.append(transcurrido)
+            else:
+                errores.append(transcurrido)
+
+
+def medir(url, headers, concurrencia, duracion):
+    latencias, errores, lock = [], [], threading.Lock()
+    hasta = time.perf_counter() + duracion
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        for _ in range(concurrencia):
+            pool.submit(cliente, url, headers, hasta, latencias, errores, lock)
+    total = len(latencias) + len(errores)
+    return {
+        'rps': total / duracion,
+        'errores': len(errores) / total if total else 0.0,
+        'p50': percentil(latencias, 50) * 1000,
+        'p95': percentil(latencias, 95) * 1000,
+        'p99': percentil(latencias, 99) * 1000,
+        'media': statistics.fmean(latencias) * 1000 if latencias else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servidor', action='append', required=True, help='nombre=url_base')
+    parser.add_argument('--ruta', default='/usuario/sedes/')
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--duracion', type=float, default=10.0)
+    parser.add_argument('--token', default='')
+    args = parser.parse_args()
+
+    headers = {'Authorization': args.token} if args.token else {}
+    print(f"{'servidor':<10}{'clientes':>9}{'req/s':>10}{'errores':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for servidor in args.servidor:
+        nombre, base = servidor.split('=', 1)
+        for concurrencia in args.concurrencia:
+            r = medir(base.rstrip('/') + args.ruta, headers, concurrencia, args.duracion)
+            print(
+                f"{nombre:<10}{concurrencia:>9}{r['rps']:>10.1f}{r['errores']:>8.1%}"
+                f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
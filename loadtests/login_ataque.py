@@ -0,0 +1,119 @@
+"""
+Latencia del trafico legitimo durante un ataque de credential stuffing.
+
+Mide primero el trafico legitimo solo (lecturas de ``--ruta`` y un login
+correcto cada ``--cada-login`` peticiones) y luego el mismo trafico mientras
+``--atacantes`` hilos prueban contraseñas contra /usuario/login/. Sin throttling
+cada intento del ataque calcula un PBKDF2 y ocupa un worker; con throttling se
+rechaza con 429 antes de tocar la base o el hash.
+
+Cada cliente manda su propia IP en X-Forwarded-For, asi que el servidor debe
+correr con NUM_PROXIES=1. ``--email`` acepta ``{n}`` para que cada cliente
+legitimo use su propia cuenta y no comparta el limite por correo:
+
+    NUM_PROXIES=1 gunicorn config.wsgi:application -w 2 -b 127.0.0.1:8001
+    python loadtests/login_ataque.py --base http://127.0.0.1:8001 \\
+        --email cliente{n}@example.com --password clave
+
+Para comparar, repita con el throttling desactivado, por ejemplo
+THROTTLE_LOGIN_IP=100000/min THROTTLE_LOGIN_EMAIL=100000/min.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from concurrencia import percentil
+
+
+def peticion(url, ip, datos=None):
+    headers = {'X-Forwarded-For': ip}
+    cuerpo = None
+    if datos is not None:
+        headers['Content-Type'] = 'application/json'
+        cuerpo = json.dumps(datos).encode()
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=cuerpo, headers=headers), timeout=30) as respuesta:
+            respuesta.read()
+            codigo = respuesta.status
+    except urllib.error.HTTPError as error:
+        codigo = error.code
+    except (urllib.error.URLError, OSError):
+        codigo = 0
+    return codigo, time.perf_counter() - inicio
+
+
+def legitimo(numero, args, hasta, latencias, codigos, lock):
+    ip = f'10.1.{numero // 250}.{numero % 250 + 1}'
+    email = args.email.format(n=numero)
+    n = 0
+    while time.perf_counter() < hasta:
+        n += 1
+        if n % args.cada_login == 0:
+            codigo, transcurrido = peticion(
+                args.base + '/usuario/login/', ip, {'email': email, 'password': args.password}
+            )
+        else:
+            codigo, transcurrido = peticion(args.base + args.ruta, ip)
+        with lock:
+            latencias.append(transcurrido)
+            codigos[codigo] += 1
+
+
+def atacante(numero, args, hasta, codigos, lock):
+    # Unas pocas IPs probando muchos correos, como una botnet chica
+    ip = f'10.2.0.{numero % args.ips_atacantes + 1}'
+    n = 0
+    while time.perf_counter() < hasta:
+        n += 1
+        codigo, _ = peticion(
+            args.base + '/usuario/login/', ip,
+            {'email': f'victima{numero}-{n % 50}@example.com', 'password': f'intento{n}'},
+        )
+        with lock:
+            codigos[codigo] += 1
+
+
+def fase(args, atacantes):
+    latencias, legitimos, ataque, lock = [], Counter(), Counter(), threading.Lock()
+    hasta = time.perf_counter() + args.duracion
+    with ThreadPoolExecutor(max_workers=args.legitimos + atacantes) as pool:
+        for numero in range(args.legitimos):
+            pool.submit(legitimo, numero, args, hasta, latencias, legitimos, lock)
+        for numero in range(atacantes):
+            pool.submit(atacante, numero, args, hasta, ataque, lock)
+    return latencias, legitimos, ataque
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base', required=True)
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--ruta', default='/usuario/sedes/')
+    parser.add_argument('--legitimos', type=int, default=10)
+    parser.add_argument('--cada-login', type=int, default=10)
+    parser.add_argument('--atacantes', type=int, default=50)
+    parser.add_argument('--ips-atacantes', type=int, default=5)
+    parser.add_argument('--duracion', type=float, default=15.0)
+    args = parser.parse_args()
+    args.base = args.base.rstrip('/')
+
+    print(f"{'fase':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  legitimos / ataque")
+    for nombre, atacantes in (('sin ataque', 0), ('con ataque', args.atacantes)):
+        latencias, legitimos, ataque = fase(args, atacantes)
+        print(
+            f"{nombre:<12}{len(latencias) / args.duracion:>9.1f}{percentil(latencias, 50) * 1000:>9.1f}"
+            f"{percentil(latencias, 95) * 1000:>9.1f}{percentil(latencias, 99) * 1000:>9.1f}"
+            f"  {dict(legitimos)} / {dict(ataque)}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Costo por peticion del stack de middlewares completo contra el del perfil de
+la API (config.settings_api).
+
+Arma un cliente de pruebas de Django con cada lista de middlewares y mide
+rondas intercaladas de GET a ``--ruta`` en el mismo proceso; el minimo de las
+rondas descarta las pausas del entorno. Usa la base de datos configurada, asi
+que la ruta debe ser de solo lectura:
+
+    python loadtests/perfil_middleware.py --ruta /usuario/sedes/ --rondas 10 --repeticiones 50
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+from config import settings_api  # noqa: E402
+
+
+def cliente_con(middleware, ruta):
+    # El cliente arma la cadena de middlewares en su primera peticion y la reutiliza
+    with override_settings(MIDDLEWARE=middleware):
+        client = Client(SERVER_NAME='localhost')
+        for _ in range(20):
+            client.get(ruta)
+    return client
+
+
+def medir(client, ruta, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        response = client.get(ruta)
+        if response.status_code != 200:
+            sys.exit(f'{ruta} respondio {response.status_code}')
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ruta', default='/usuario/sedes/')
+    parser.add_argument('--rondas', type=int, default=10)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    perfiles = {
+        'completo': cliente_con(settings.MIDDLEWARE, args.ruta),
+        'api': cliente_con(settings_api.MIDDLEWARE, args.ruta),
+    }
+    tiempos = {nombre: [] for nombre in perfiles}
+    for _ in range(args.rondas):
+        for nombre, client in perfiles.items():
+            tiempos[nombre].append(medir(client, args.ruta, args.repeticiones))
+
+    print(f"{'perfil':<10}{'middlewares':>12}{'min ms':>9}{'mediana ms':>12}")
+    for nombre, middleware in (('completo', settings.MIDDLEWARE), ('api', settings_api.MIDDLEWARE)):
+        ordenados = sorted(tiempos[nombre])
+        print(
+            f'{nombre:<10}{len(middleware):>12}{ordenados[0] * 1000:>9.3f}'
+            f'{ordenados[len(ordenados) // 2] * 1000:>12.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
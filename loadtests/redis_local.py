@@ -0,0 +1,221 @@
+"""
+Servidor compatible con Redis, en memoria y de un solo proceso, para probar
+los contadores y caches compartidos entre workers sin instalar Redis:
+
+    python loadtests/redis_local.py --puerto 6379
+    export CONTADORES_REDIS_URL=redis://127.0.0.1:6379/0
+    gunicorn config.wsgi:application -w 4 -b 127.0.0.1:8001
+
+Implementa solo los comandos que usa el RedisCache de Django (GET, SET con
+EX/PX/NX/XX, MGET, MSET, DEL, EXISTS, INCRBY, EXPIRE, PERSIST, FLUSHDB, MULTI/EXEC).
+No persiste nada ni sirve para produccion. Con ``--puerto 0`` elige un puerto
+libre; la primera linea de la salida dice en cual escucha.
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class Error(Exception):
+    pass
+
+
+class Datos:
+    def __init__(self):
+        self.valores = {}
+        self.lock = threading.Lock()
+
+    def _vigente(self, clave):
+        entrada = self.valores.get(clave)
+        if entrada is not None and entrada[1] is not None and entrada[1] <= time.monotonic():
+            del self.valores[clave]
+            return None
+        return entrada
+
+    def ejecutar(self, comando, args):
+        with self.lock:
+            metodo = getattr(self, f'cmd_{comando.decode().lower()}', None)
+            if metodo is None:
+                raise Error(f"ERR unknown command '{comando.decode()}'")
+            return metodo(*args)
+
+    def cmd_ping(self, *args):
+        return args[0] if args else 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_client(self, *args):
+        return 'OK'
+
+    def cmd_get(self, clave):
+        entrada = self._vigente(clave)
+        return entrada[0] if entrada else None
+
+    def cmd_mget(self, *claves):
+        return [self.cmd_get(clave) for clave in claves]
+
+    def cmd_set(self, clave, valor, *opciones):
+        vence, condicion = None, None
+        opciones = list(opciones)
+        while opciones:
+            opcion = opciones.pop(0).upper()
+            if opcion in (b'EX', b'PX'):
+                cantidad = int(opciones.pop(0))
+                vence = time.monotonic() + (cantidad if opcion == b'EX' else cantidad / 1000)
+            elif opcion in (b'NX', b'XX'):
+                condicion = opcion
+            else:
+                raise Error('ERR syntax error')
+        existe = self._vigente(clave) is not None
+        if (condicion == b'NX' and existe) or (condicion == b'XX' and not existe):
+            return None
+        self.valores[clave] = (valor, vence)
+        return 'OK'
+
+    def cmd_mset(self, *pares):
+        for clave, valor in zip(pares[::2], pares[1::2]):
+            self.valores[clave] = (valor, None)
+        return 'OK'
+
+    def cmd_del(self, *claves):
+        borradas = 0
+        for clave in claves:
+            if self._vigente(clave) is not None:
+                del self.valores[clave]
+                borradas += 1
+        return borradas
+
+    def cmd_exists(self, *claves):
+        return sum(self._vigente(clave) is not None for clave in claves)
+
+    def cmd_incrby(self, clave, delta):
+        valor, vence = self._vigente(clave) or (b'0', None)
+        try:
+            nuevo = int(valor) + int(delta)
+        except ValueError:
+            raise Error('ERR value is not an integer or out of range')
+        self.valores[clave] = (str(nuevo).encode(), vence)
+        return nuevo
+
+    def cmd_incr(self, clave):
+        return self.cmd_incrby(clave, b'1')
+
+    def cmd_decrby(self, clave, delta):
+        return self.cmd_incrby(clave, str(-int(delta)).encode())
+
+    def _vencer(self, clave, segundos):
+        entrada = self._vigente(clave)
+        if entrada is None:
+            return 0
+        self.valores[clave] = (entrada[0], time.monotonic() + segundos)
+        return 1
+
+    def cmd_expire(self, clave, segundos):
+        return self._vencer(clave, int(segundos))
+
+    def cmd_pexpire(self, clave, milisegundos):
+        return self._vencer(clave, int(milisegundos) / 1000)
+
+    def cmd_persist(self, clave):
+        entrada = self._vigente(clave)
+        if entrada is None or entrada[1] is None:
+            return 0
+        self.valores[clave] = (entrada[0], None)
+        return 1
+
+    def cmd_flushdb(self, *args):
+        self.valores.clear()
+        return 'OK'
+
+    cmd_flushall = cmd_flushdb
+
+
+class Manejador(socketserver.StreamRequestHandler):
+    def leer(self):
+        linea = self.rfile.readline()
+        if not linea:
+            return None
+        if linea[:1] != b'*':
+            # Comando en linea, como los que manda redis-cli a mano
+            return linea.split()
+        partes = []
+        for _ in range(int(linea[1:])):
+            largo = int(self.rfile.readline()[1:])
+            partes.append(self.rfile.read(largo + 2)[:-2])
+        return partes
+
+    def responder(self, valor):
+        if valor is None:
+            self.wfile.write(b'$-1\r\n')
+        elif isinstance(valor, Error):
+            self.wfile.write(f'-{valor}\r\n'.encode())
+        elif isinstance(valor, str):
+            self.wfile.write(f'+{valor}\r\n'.encode())
+        elif isinstance(valor, int):
+            self.wfile.write(f':{valor}\r\n'.encode())
+        elif isinstance(valor, bytes):
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(valor), valor))
+        else:
+            self.wfile.write(b'*%d\r\n' % len(valor))
+            for item in valor:
+                self.responder(item)
+
+    def ejecutar(self, comando, args):
+        try:
+            return self.server.datos.ejecutar(comando, args)
+        except Error as error:
+            return error
+        except (TypeError, ValueError) as error:
+            return Error(f'ERR {error}')
+
+    def handle(self):
+        en_cola = None
+        while True:
+            partes = self.leer()
+            if partes is None:
+                return
+            if not partes:
+                continue
+            comando, args = partes[0].upper(), partes[1:]
+            if comando == b'MULTI':
+                en_cola = []
+                self.responder('OK')
+            elif comando in (b'EXEC', b'DISCARD') and en_cola is not None:
+                if comando == b'EXEC':
+                    self.responder([self.ejecutar(*pendiente) for pendiente in en_cola])
+                else:
+                    self.responder('OK')
+                en_cola = None
+            elif en_cola is not None:
+                en_cola.append((comando, args))
+                self.responder('QUEUED')
+            else:
+                self.responder(self.ejecutar(comando, args))
+            self.wfile.flush()
+
+class Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, direccion):
+        super().__init__(direccion, Manejador)
+        self.datos = Datos()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=6379)
+    args = parser.parse_args()
+
+    with Servidor((args.host, args.puerto)) as servidor:
+        host, puerto = servidor.server_address
+        print(f'escuchando en {host}:{puerto}', flush=True)
+        servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    main()